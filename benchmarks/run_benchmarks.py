@@ -0,0 +1,377 @@
+"""
+run_benchmarks.py
+
+Throughput benchmarks for the tokenize -> embed -> index -> search pipeline:
+- tokens:  count_tokens (a1_tokens) and the per-token decode loop
+- embed:   a4 get_embedding against a local stub of the OpenAI API
+- index:   a4 create_faiss_index and chunked index.add
+- search:  a4 search_faiss at 10k / 100k / 1M stored vectors
+- persist: a5 and a6 save + load round trips
+- extract: docs/archived/a1 extract_info (single scan) vs the multipass
+           reference on 10 KB and 1 MB messages
+
+Every result records ops/sec, p50/p95/p99 latency and the peak RSS of its
+suite (each suite runs in a fresh process), and the whole run is written as
+JSON so two commits can be compared with --compare.
+
+Usage:
+    python benchmarks/run_benchmarks.py --output bench.json
+    python benchmarks/run_benchmarks.py --quick --suites index,search
+    python benchmarks/run_benchmarks.py --output new.json --compare bench.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+for folder in ("a1_tokens", "a4_embeddings"):
+    sys.path.insert(0, str(REPO_ROOT / "src" / folder))
+sys.path.insert(0, str(REPO_ROOT / "docs" / "archived" / "a1"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+SUITES = ("tokens", "embed", "index", "search", "persist", "extract")
+REGRESSION_THRESHOLD = 0.10  # flag results more than 10% slower than the baseline
+
+SAMPLE_PARAGRAPH = (
+    "Tokenization splits text into subword units before a model ever sees it. "
+    "Embeddings then map those units into vectors where distance tracks meaning, "
+    "and a vector index answers nearest-neighbour queries over millions of rows. "
+)
+SAMPLE_EMAIL_BODY = (
+    "Following up on last week's call about the renewal. The team reviewed the proposal, "
+    "and we would like to walk through pricing with finance before the end of the quarter. "
+)
+
+
+# ==============================
+#  Measurement Helpers
+# ==============================
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far (one suite: see run_suite)."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:  # Windows
+        import psutil
+        return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+
+
+def measure(name: str, fn: Callable[[], object], repeat: int, warmup: int = 1,
+            ops_per_call: int = 1, **params) -> Dict:
+    """
+    Time `repeat` calls of fn and summarize them as one result row.
+    The scripts' own [Info]/[Saved] prints are swallowed so they don't skew timings.
+    """
+    latencies = np.empty(repeat, dtype="float64")
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(warmup):
+            fn()
+        for i in range(repeat):
+            start = time.perf_counter()
+            fn()
+            latencies[i] = time.perf_counter() - start
+
+    total = float(latencies.sum())
+    p50, p95, p99 = np.percentile(latencies * 1000.0, [50, 95, 99])
+    result = {
+        "name": name,
+        "params": params,
+        "iterations": repeat,
+        "ops_per_sec": (repeat * ops_per_call) / total if total > 0 else float("inf"),
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "suite_peak_rss_mb": peak_rss_mb(),
+    }
+    label = ", ".join(f"{k}={v}" for k, v in params.items())
+    print(f"[Bench] {name:<28} {label:<32} {result['ops_per_sec']:>14,.1f} ops/s"
+          f" | p50 {result['p50_ms']:.3f} ms | p99 {result['p99_ms']:.3f} ms")
+    return result
+
+
+def random_vectors(count: int, dim: int, seed: int = 0, chunk: int = 65_536):
+    """Yield float32 batches so large stores never need a second full-size copy."""
+    rng = np.random.default_rng(seed)
+    for start in range(0, count, chunk):
+        yield rng.standard_normal((min(chunk, count - start), dim), dtype="float32")
+
+
+def build_flat_index(count: int, dim: int):
+    import faiss
+    index = faiss.IndexFlatL2(dim)
+    for batch in random_vectors(count, dim):
+        index.add(batch)
+    return index
+
+
+# ==============================
+#  Benchmark Suites
+# ==============================
+def bench_tokens(args) -> List[Dict]:
+    import tiktoken
+    from a1_countingtokens import count_tokens
+
+    encoding = tiktoken.get_encoding("cl100k_base")
+    results = []
+    for repeat_count in (1, 16):
+        text = SAMPLE_PARAGRAPH * repeat_count
+        token_ids = encoding.encode(text)
+        results.append(measure(
+            "count_tokens", lambda: count_tokens(text, "cl100k_base"),
+            repeat=args.repeat, ops_per_call=1, tokens=len(token_ids)))
+        results.append(measure(
+            "decode_per_token_loop", lambda: [encoding.decode([t]) for t in token_ids],
+            repeat=args.repeat, ops_per_call=len(token_ids), tokens=len(token_ids)))
+    return results
+
+
+def bench_embed(args) -> List[Dict]:
+    from stub_openai_server import start_stub_server
+
+    server, base_url = start_stub_server()
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+    try:
+        from a4_embeddings import get_embedding
+        from embedding_backends import get_backend
+
+        text = SAMPLE_PARAGRAPH
+        results = [measure(
+            "get_embedding_stub", lambda: get_embedding(text, backend="openai"),
+            repeat=args.repeat, transport="http-stub")]
+
+        batch = [f"{SAMPLE_PARAGRAPH} #{i}" for i in range(args.embed_batch)]
+        backend = get_backend("openai")
+        results.append(measure(
+            "embed_batch_stub", lambda: backend.embed_batch(batch),
+            repeat=max(args.repeat // 10, 3), ops_per_call=len(batch),
+            batch=len(batch), transport="http-stub"))
+
+        hashing = get_backend("hashing")
+        results.append(measure(
+            "embed_batch_hashing", lambda: hashing.embed_batch(batch),
+            repeat=max(args.repeat // 10, 3), ops_per_call=len(batch),
+            batch=len(batch)))
+    finally:
+        server.shutdown()
+    return results
+
+
+def bench_index(args) -> List[Dict]:
+    import faiss
+    from a4_embeddings import create_faiss_index
+
+    vectors = next(random_vectors(args.index_size, args.dim, chunk=args.index_size))
+    rows = list(vectors)  # a4 callers hand over one vector per text
+    results = [measure(
+        "create_faiss_index", lambda: create_faiss_index(rows),
+        repeat=max(args.repeat // 10, 3), ops_per_call=args.index_size,
+        vectors=args.index_size, dim=args.dim)]
+
+    def chunked_add():
+        index = faiss.IndexFlatL2(args.dim)
+        for start in range(0, len(vectors), 8192):
+            index.add(vectors[start:start + 8192])
+
+    results.append(measure(
+        "index_add_chunked", chunked_add,
+        repeat=max(args.repeat // 10, 3), ops_per_call=args.index_size,
+        vectors=args.index_size, dim=args.dim))
+    return results
+
+
+def bench_search(args) -> List[Dict]:
+    from a4_embeddings import search_faiss
+
+    results = []
+    queries = next(random_vectors(args.repeat, args.dim, seed=1, chunk=args.repeat))
+    for size in args.search_sizes:
+        index = build_flat_index(size, args.dim)
+        query_iter = iter(queries)
+        results.append(measure(
+            "search_faiss", lambda: search_faiss(index, next(query_iter), k=args.top_k),
+            repeat=args.repeat - 1, vectors=size, dim=args.dim, k=args.top_k))
+        index = None  # release the store before building the next size
+    return results
+
+
+def bench_persist(args) -> List[Dict]:
+    import a5_embeddings
+    import a6_embeddings
+
+    index = build_flat_index(args.persist_size, args.dim)
+    texts = [f"{SAMPLE_PARAGRAPH} #{i}" for i in range(args.persist_size)]
+    metadata = [{"doc_id": str(i), "title": f"Doc {i}", "category": "bench",
+                 "content": text} for i, text in enumerate(texts)]
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        a5_embeddings.INDEX_FILE = os.path.join(workdir, "a5_index.bin")
+        a5_embeddings.META_FILE = os.path.join(workdir, "a5_texts.pkl")
+        a6_embeddings.INDEX_FILE = os.path.join(workdir, "a6_index.bin")
+        a6_embeddings.META_FILE = os.path.join(workdir, "a6_metadata.json")
+
+        repeat = max(args.repeat // 20, 3)
+        params = {"entries": args.persist_size, "dim": args.dim}
+        results.append(measure("a5_save", lambda: a5_embeddings.save_faiss_index(index, texts),
+                               repeat=repeat, **params))
+        results.append(measure("a5_load", a5_embeddings.load_faiss_index,
+                               repeat=repeat, **params))
+        results.append(measure("a6_save", lambda: a6_embeddings.save_index_and_metadata(index, metadata),
+                               repeat=repeat, **params))
+        results.append(measure("a6_load", a6_embeddings.load_index_and_metadata,
+                               repeat=repeat, **params))
+    return results
+
+
+def bench_extract(args) -> List[Dict]:
+    from extract_contact_info import SAMPLE_TEXT, extract_info, extract_info_multipass
+
+    results = []
+    for size in args.message_sizes:
+        # Contact details at the end: neither extractor can stop early
+        filler = SAMPLE_EMAIL_BODY * (max(size - len(SAMPLE_TEXT), 0) // len(SAMPLE_EMAIL_BODY) + 1)
+        message = filler[:max(size - len(SAMPLE_TEXT), 0)] + SAMPLE_TEXT
+        assert extract_info(message) == extract_info_multipass(message)
+        repeat = args.repeat if size <= 100_000 else max(args.repeat // 20, 3)
+        for name, fn in (("extract_info_multipass", extract_info_multipass),
+                         ("extract_info", extract_info)):
+            results.append(measure(name, lambda: fn(message), repeat=repeat, bytes=len(message)))
+    return results
+
+
+SUITE_RUNNERS = {
+    "tokens": bench_tokens,
+    "embed": bench_embed,
+    "index": bench_index,
+    "search": bench_search,
+    "persist": bench_persist,
+    "extract": bench_extract,
+}
+
+
+# ==============================
+#  Reporting
+# ==============================
+def run_suite(suite: str, args) -> List[Dict]:
+    """
+    Run one suite in a freshly spawned process: the process-wide RSS peak
+    then covers this suite only, not whatever an earlier suite allocated.
+    """
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(SUITE_RUNNERS[suite], args).result()
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def result_key(result: Dict) -> str:
+    return result["name"] + json.dumps(result["params"], sort_keys=True)
+
+
+def compare_runs(current: List[Dict], baseline_path: str):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {result_key(r): r for r in json.load(f)["results"]}
+
+    print(f"\n[Compare] against {baseline_path}")
+    for result in current:
+        before = baseline.get(result_key(result))
+        if before is None:
+            continue
+        ratio = result["ops_per_sec"] / before["ops_per_sec"]
+        flag = "REGRESSION" if ratio < 1 - REGRESSION_THRESHOLD else ""
+        print(f"   {result['name']:<28} {json.dumps(result['params']):<48} x{ratio:.2f} {flag}")
+
+
+# ==============================
+#  Main Script
+# ==============================
+def parse_sizes(value: str) -> List[int]:
+    return [int(size) for size in value.split(",") if size]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embeddings pipeline benchmarks.")
+    parser.add_argument("--suites", type=str, default=",".join(SUITES),
+                        help=f"Comma-separated subset of: {', '.join(SUITES)}.")
+    parser.add_argument("--output", type=str, default="bench_results.json",
+                        help="Where to write the JSON results.")
+    parser.add_argument("--compare", type=str,
+                        help="Earlier results JSON to compare ops/sec against.")
+    parser.add_argument("--repeat", type=int, default=200,
+                        help="Timed iterations for per-call benchmarks.")
+    parser.add_argument("--dim", type=int, default=1536,
+                        help="Vector dimensionality for index/search/persist.")
+    parser.add_argument("--search_sizes", type=parse_sizes, default=[10_000, 100_000, 1_000_000],
+                        help="Stored vector counts for search_faiss.")
+    parser.add_argument("--index_size", type=int, default=50_000,
+                        help="Vectors per index build.")
+    parser.add_argument("--persist_size", type=int, default=10_000,
+                        help="Entries per a5/a6 save and load.")
+    parser.add_argument("--embed_batch", type=int, default=256,
+                        help="Texts per batched embedding request.")
+    parser.add_argument("--message_sizes", type=parse_sizes, default=[10_000, 1_000_000],
+                        help="Message sizes in bytes for extract_info.")
+    parser.add_argument("--top_k", type=int, default=3,
+                        help="Neighbours per search.")
+    parser.add_argument("--quick", action="store_true",
+                        help="Small sizes for a fast smoke run.")
+    args = parser.parse_args()
+
+    if args.quick:
+        args.repeat, args.dim = min(args.repeat, 50), 256
+        args.search_sizes, args.index_size, args.persist_size = [1_000, 10_000], 5_000, 1_000
+        args.message_sizes = [10_000, 100_000]
+
+    suites = [s for s in args.suites.split(",") if s]
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        parser.error(f"unknown suites: {', '.join(sorted(unknown))}")
+
+    results = []
+    for suite in suites:
+        print(f"\n=== {suite} ===")
+        results.extend(run_suite(suite, args))
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "args": {k: v for k, v in vars(args).items()},
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n[Saved] {len(results)} results -> {args.output}")
+
+    if args.compare:
+        compare_runs(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
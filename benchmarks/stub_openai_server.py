@@ -0,0 +1,118 @@
+"""
+stub_openai_server.py
+
+Local stand-in for the OpenAI API, used by the benchmarks:
+- Serves POST /v1/embeddings with the same JSON shape as the real API
+- Vectors come from the offline hashing backend (deterministic, no network)
+- Honors encoding_format "float" and "base64"
+- Serves POST /v1/chat/completions for the contact extraction scripts: the
+  reply is a JSON object built by the regex extractor from the text after
+  "Text:" in the last user message
+- server.request_counts counts requests per endpoint
+
+Point any OpenAI client at it with:
+    OPENAI_BASE_URL=http://127.0.0.1:<port>/v1  OPENAI_API_KEY=stub
+"""
+
+import argparse
+import base64
+import json
+import sys
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src" / "a4_embeddings"))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "docs" / "archived" / "a1"))
+from embedding_backends import HashingEmbeddingBackend  # noqa: E402
+from extract_contact_info import extract_info  # noqa: E402
+
+BACKEND = HashingEmbeddingBackend()
+
+
+class StubOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        endpoint = self.path.rstrip("/").rsplit("/", 1)[-1]
+        self.server.request_counts[endpoint] += 1
+        if endpoint == "completions":
+            self._chat_completion(request)
+            return
+        if endpoint != "embeddings":
+            self._send(404, {"error": {"message": f"unknown path {self.path}"}})
+            return
+
+        texts = request.get("input", [])
+        if isinstance(texts, str):
+            texts = [texts]
+        matrix = BACKEND.embed_batch(texts)
+        use_base64 = request.get("encoding_format") == "base64"
+        data = [{
+            "object": "embedding",
+            "index": i,
+            "embedding": (base64.b64encode(row.astype("<f4").tobytes()).decode("ascii")
+                          if use_base64 else row.tolist()),
+        } for i, row in enumerate(matrix)]
+        token_total = sum(len(t.split()) for t in texts)
+        self._send(200, {
+            "object": "list",
+            "data": data,
+            "model": request.get("model", "stub"),
+            "usage": {"prompt_tokens": token_total, "total_tokens": token_total},
+        })
+
+    def _chat_completion(self, request: dict):
+        prompt = next((m["content"] for m in reversed(request.get("messages", []))
+                       if m.get("role") == "user"), "")
+        text = prompt.split("Text:", 1)[-1].strip()
+        content = json.dumps(extract_info(text))
+        prompt_tokens, completion_tokens = len(prompt.split()), len(content.split())
+        self._send(200, {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": 0,
+            "model": request.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        })
+
+    def _send(self, status: int, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # keep benchmark output clean
+
+
+def start_stub_server(host: str = "127.0.0.1", port: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """Start the stub in a daemon thread; returns (server, base_url)."""
+    server = ThreadingHTTPServer((host, port), StubOpenAIHandler)
+    server.request_counts = Counter()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stub of the OpenAI embeddings and chat APIs.")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+    server, base_url = start_stub_server(port=args.port)
+    print(f"[Serving] {base_url}  (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -10,52 +10,98 @@ Fields extracted:
 Usage (PowerShell):
     py .\src\day2\extract_contact_info.py               # runs on built-in sample
     py .\src\day2\extract_contact_info.py .\path\to\file.txt
+
+Bulk mode streams a directory of message files, an mbox file or a JSONL file
+(one {"id": ..., "text": ...} object per line) through a process pool and
+writes one JSON result per message to the output as it goes:
+    py .\src\day2\extract_contact_info.py --bulk .\inbox.mbox --output .\contacts.jsonl
+    py .\src\day2\extract_contact_info.py --bulk .\messages\ --output .\contacts.jsonl --workers 8
 """
 
 from __future__ import annotations
 
+import argparse
+import email
+import email.policy
+import html
 import json
+import os
 import re
 import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+BULK_BATCH_SIZE = 256  # messages per worker task
+Message = Union[str, bytes]  # plain text, or a raw RFC 822 message
 
 
 EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
 PHONE_RE = re.compile(r"\(?\d{3}\)?[\s\-.]?\d{3}[\s\-.]?\d{4}")
 
+# First-name strategies, in priority order
+NAME_IS_RE = re.compile(r"\bmy name is\s+([A-Z][a-z]+)\b", re.I)
+SIGN_OFF_RE = re.compile(r"\b(?:thanks|regards|best|sincerely)[,\s]+([A-Z][a-z]+)\b", re.I)
+I_AM_RE = re.compile(r"\b(?:i am|i'm)\s+([A-Z][a-z]+)\b", re.I)
+CALLING_FROM_RE = re.compile(r"\bcalling from\s+([^\.,\n]+)(?:,\s*([^\.\n]+))?", re.I)
+CITY_STATE_RE = re.compile(r"\b([A-Z][a-zA-Z .'-]+,\s*[A-Z]{2})\b")
+
+_NAME_RES = {"name_is": NAME_IS_RE, "sign_off": SIGN_OFF_RE, "i_am": I_AM_RE}
+_EMAIL_LOCAL_CHARS = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789._%+-")
+_CITY_CHARS = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz .'-")
+_STATE_RE = re.compile(r"\s*[A-Z]{2}\b")
+
+# Single-pass scanner. Every field starts either at a word start or at a
+# non-letter character (digit, "(", "@", ","), so the scan consumes one
+# non-letter character and tests the alternatives right after it; the
+# leading character class lets the engine skip runs of letters without
+# trying any alternative. Matches only locate candidates: values are read
+# with the per-field patterns above, so results equal the per-field search.
+_SCAN_RE = re.compile(
+    r"[^A-Za-z](?:"
+    # Phrases start with b(est), c(alling from), i( am), m(y name is), r(egards), s(incerely), t(hanks)
+    + r"(?=(?i:[bcimrst]))(?:"
+    + "|".join(f"(?=(?P<{name}>(?i:{regex.pattern})))" for name, regex in _NAME_RES.items())
+    + f"|(?=(?P<calling_from>(?i:{CALLING_FROM_RE.pattern})))"
+    + r")|(?<=[\d(@,])(?:"
+    # Tails of PHONE_RE when the consumed character was its "(" or first digit
+    + r"(?<=\()(?=\d{3}\)?[\s\-.]?\d{3}[\s\-.]?\d{4})"
+    + r"|(?<=\d)(?=\d{2}\)?[\s\-.]?\d{3}[\s\-.]?\d{4})"
+    # Domain after "@" (the local part is found by walking back)
+    + r"|(?<=@)(?=[A-Za-z0-9.-]+\.[A-Za-z]{2,})"
+    # ", ST" ending a City, ST location
+    + r"|(?<=,)(?=\s*[A-Z]{2}\b)"
+    + r"))"
+)
+
 
 def _extract_first_name(text: str) -> Optional[str]:
     # Strategy 1: "My name is Amit Bahree" -> Amit
-    m = re.search(r"\bmy name is\s+([A-Z][a-z]+)\b", text, flags=re.I)
-    if m:
-        return m.group(1)
-
     # Strategy 2: sign-offs like "Thanks, Amit" / "Regards Amit"
-    m = re.search(
-        r"\b(?:thanks|regards|best|sincerely)[,\s]+([A-Z][a-z]+)\b", text, flags=re.I)
-    if m:
-        return m.group(1)
-
     # Strategy 3: "I am Amit Bahree" / "I'm Amit ..."
-    m = re.search(r"\b(?:i am|i'm)\s+([A-Z][a-z]+)\b", text, flags=re.I)
-    if m:
-        return m.group(1)
-
+    for regex in _NAME_RES.values():
+        m = regex.search(text)
+        if m:
+            return m.group(1)
     return None
 
 
+def _company_and_location(m: re.Match) -> Tuple[Optional[str], Optional[str]]:
+    company = m.group(1).strip()
+    location = m.group(2).strip() if m.lastindex and m.group(2) else None
+    return company or None, location or None
+
+
 def _extract_company_and_location(text: str) -> Tuple[Optional[str], Optional[str]]:
     # Common phrasing: "calling from Acme Insurance, Seattle, WA."
-    m = re.search(
-        r"\bcalling from\s+([^\.,\n]+)(?:,\s*([^\.\n]+))?", text, flags=re.I)
+    m = CALLING_FROM_RE.search(text)
     if m:
-        company = m.group(1).strip()
-        location = m.group(2).strip() if m.lastindex and m.group(2) else None
-        return company or None, location or None
+        return _company_and_location(m)
 
     # Fallback: capture a City, ST pattern anywhere as location
-    loc_m = re.search(r"\b([A-Z][a-zA-Z .'-]+,\s*[A-Z]{2})\b", text)
+    loc_m = CITY_STATE_RE.search(text)
     location = loc_m.group(1).strip() if loc_m else None
     return None, location
 
@@ -70,7 +116,8 @@ def _extract_phone(text: str) -> Optional[str]:
     return m.group(0) if m else None
 
 
-def extract_info(text: str) -> Dict[str, Optional[str]]:
+def extract_info_multipass(text: str) -> Dict[str, Optional[str]]:
+    """Reference extractor: one regex search per field strategy (up to seven passes)."""
     first_name = _extract_first_name(text)
     company, location = _extract_company_and_location(text)
     email = _extract_email(text)
@@ -85,6 +132,108 @@ def extract_info(text: str) -> Dict[str, Optional[str]]:
     }
 
 
+def _scan(text: str, all_matches: bool) -> Tuple[Dict[str, Optional[str]], Dict[str, List[str]]]:
+    """
+    One pass of _SCAN_RE. Returns extract_info()'s result and the candidates
+    seen per field; unless all_matches is set, only the first candidate of
+    each kind is kept and the scan stops once the result is settled.
+    """
+    text = " " + text  # every candidate then follows one scanned character
+    names: Dict[str, List[str]] = {kind: [] for kind in _NAME_RES}
+    callings: List[re.Match] = []
+    cities: List[str] = []
+    emails: List[str] = []
+    phones: List[str] = []
+
+    for m in _SCAN_RE.finditer(text):
+        delimiter, at = m.group(), m.start()
+        kind = m.lastgroup
+        if kind in _NAME_RES and (all_matches or not names[kind]):
+            names[kind].append(_NAME_RES[kind].match(text, at + 1).group(1))
+        elif kind == "calling_from" and (all_matches or not callings):
+            callings.append(CALLING_FROM_RE.match(text, at + 1))
+
+        # Anchors are re-checked on the character itself: a name can match at
+        # the same position and hide the anchor alternative
+        if delimiter == "@" and (all_matches or not emails):
+            start = at
+            while text[start - 1] in _EMAIL_LOCAL_CHARS:
+                start -= 1
+            email_m = EMAIL_RE.match(text, start) if start < at else None
+            if email_m:
+                emails.append(email_m.group(0))
+        elif delimiter == "," and (all_matches or not (cities or callings)):
+            state = _STATE_RE.match(text, at + 1)
+            if state:
+                start = at
+                while text[start - 1] in _CITY_CHARS:
+                    start -= 1
+                city_m = CITY_STATE_RE.search(text, start, state.end())
+                if city_m and city_m.end() == state.end():
+                    cities.append(city_m.group(1).strip())
+        elif (delimiter == "(" or delimiter.isdigit()) and (all_matches or not phones):
+            phone_m = PHONE_RE.match(text, at)
+            if phone_m:
+                phones.append(phone_m.group(0))
+
+        if not all_matches and names["name_is"] and callings and emails and phones:
+            break
+
+    first_names = [name for kind in _NAME_RES for name in names[kind]]
+    companies, locations = [], []
+    for calling in callings:
+        company, location = _company_and_location(calling)
+        companies.append(company)
+        locations.append(location)
+    company, location = (companies[0], locations[0]) if callings else (None, None)
+    if not callings and cities:
+        location = cities[0]
+
+    result = {
+        "first_name": first_names[0] if first_names else None,
+        "company": company,
+        "location": location,
+        "email": emails[0] if emails else None,
+        "phone": phones[0] if phones else None,
+    }
+    # re.I also lets "I'm available" through: only capitalized later names count as rivals
+    rival_names = [name for name in first_names[1:] if name[0].isupper()]
+    candidates = {
+        "first_name": _distinct(first_names[:1] + rival_names, str.lower),
+        "company": _distinct(companies, str.lower),
+        "location": _distinct(locations + cities, str.lower),
+        "email": _distinct(emails, str.lower),
+        "phone": _distinct(phones, lambda phone: re.sub(r"\D", "", phone)),
+    }
+    return result, candidates
+
+
+def _distinct(values: List[Optional[str]], key) -> List[str]:
+    seen, distinct = set(), []
+    for value in values:
+        if value and key(value) not in seen:
+            seen.add(key(value))
+            distinct.append(value)
+    return distinct
+
+
+def extract_info(text: str) -> Dict[str, Optional[str]]:
+    """
+    Same result as extract_info_multipass(), from one scan of the text.
+    The scan stops early once every field has its highest-priority match.
+    """
+    return _scan(text, all_matches=False)[0]
+
+
+def extract_info_with_candidates(text: str) -> Tuple[Dict[str, Optional[str]], Dict[str, List[str]]]:
+    """
+    extract_info() plus every distinct candidate per field (emails compared
+    case-insensitively, phones by digits), from one full scan. A field with
+    more than one candidate is ambiguous: extract_info() just took the first.
+    """
+    return _scan(text, all_matches=True)
+
+
 SAMPLE_TEXT = (
     "Hi there. I'm Priya Sharma from Contoso Health, Austin, TX. "
     "I heard you're exploring our employee wellness packages. "
@@ -99,15 +248,189 @@ def _load_text_from_file(path: Path) -> str:
     return path.read_text(encoding="utf-8", errors="ignore")
 
 
+# ---------------------------------------------------------------------------
+# Bulk mode
+# ---------------------------------------------------------------------------
+_TAG_RE = re.compile(r"<[^>]*>")
+
+
+def _decode_part(part) -> str:
+    payload = part.get_payload(decode=True)
+    if payload is None:
+        return ""
+    charset = part.get_content_charset() or "utf-8"
+    try:
+        text = payload.decode(charset, errors="replace")
+    except LookupError:  # charset name Python does not know
+        text = payload.decode("latin-1")
+    if part.get_content_subtype() == "html":
+        text = html.unescape(_TAG_RE.sub(" ", text))
+    return text
+
+
+def _message_body(raw: bytes) -> str:
+    """
+    Text body of an RFC 822 message: its text/plain parts, else any other
+    text parts (HTML with tags stripped), else "". Bad charsets and transfer
+    encodings are decoded leniently rather than raised.
+    """
+    message = email.message_from_bytes(raw, policy=email.policy.default)
+    parts = [part for part in message.walk()
+             if part.get_content_maintype() == "text" and not part.is_attachment()]
+    plain = [part for part in parts if part.get_content_subtype() == "plain"]
+    return "\n".join(_decode_part(part) for part in plain or parts)
+
+
+def _message_text(payload: Message) -> str:
+    return _message_body(payload) if isinstance(payload, bytes) else payload
+
+
+def _iter_mbox(path: Path) -> Iterator[Tuple[str, Message]]:
+    # Split on "From " separator lines ourselves: mailbox.mbox indexes the whole
+    # file up front, this keeps only the current message in memory
+    with open(path, "rb") as f:
+        lines: List[bytes] = []
+        number = 0
+        for line in f:
+            if line.startswith(b"From ") and lines:
+                yield f"{path.name}#{number}", b"".join(lines[1:])
+                number += 1
+                lines = []
+            lines.append(line)
+        if lines:
+            yield f"{path.name}#{number}", b"".join(lines[1:])
+
+
+def _iter_jsonl(path: Path, text_field: str) -> Iterator[Tuple[str, Message]]:
+    with open(path, "r", encoding="utf-8") as f:
+        for number, line in enumerate(f):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            yield str(record.get("id", number)), record.get(text_field) or ""
+
+
+def _iter_directory(path: Path) -> Iterator[Tuple[str, Message]]:
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            file_path = Path(root) / name
+            if file_path.suffix.lower() == ".eml":
+                payload = file_path.read_bytes()
+            else:
+                payload = _load_text_from_file(file_path)
+            yield str(file_path.relative_to(path)), payload
+
+
+def iter_raw_messages(path: Path, text_field: str = "text") -> Iterator[Tuple[str, Message]]:
+    """
+    Yield (message id, payload) from a directory, .mbox or .jsonl/.ndjson
+    file. Payloads are text, or the unparsed bytes of an RFC 822 message
+    (.mbox entries, .eml files) so MIME parsing can happen in a worker.
+    """
+    if path.is_dir():
+        return _iter_directory(path)
+    suffix = path.suffix.lower()
+    if suffix in (".jsonl", ".ndjson"):
+        return _iter_jsonl(path, text_field)
+    if suffix == ".mbox":
+        return _iter_mbox(path)
+    raise ValueError(f"Unsupported bulk input: {path} (use a directory, .mbox or .jsonl)")
+
+
+def iter_messages(path: Path, text_field: str = "text") -> Iterator[Tuple[str, str]]:
+    """Yield (message id, text) from a directory, .mbox or .jsonl/.ndjson file."""
+    for message_id, payload in iter_raw_messages(path, text_field):
+        yield message_id, _message_text(payload)
+
+
+def _extract_batch(batch: List[Tuple[str, Message]]) -> List[Dict[str, Optional[str]]]:
+    results = []
+    for message_id, payload in batch:
+        try:
+            results.append({"id": message_id, **extract_info(_message_text(payload))})
+        except Exception as e:  # one malformed message must not sink its batch
+            results.append({"id": message_id, "error": f"{type(e).__name__}: {e}"})
+    return results
+
+
+def _iter_batches(messages: Iterator[Tuple[str, Message]],
+                  size: int) -> Iterator[List[Tuple[str, Message]]]:
+    batch = []
+    for message in messages:
+        batch.append(message)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def run_bulk(source: Path, output: Path, workers: int, batch_size: int = BULK_BATCH_SIZE,
+             text_field: str = "text") -> Dict[str, float]:
+    """
+    Extract every message in source and write JSONL results in input order.
+    At most 2 * workers batches are in flight, so memory stays bounded no
+    matter how large the input is. Workers parse the MIME structure; a
+    message that fails becomes an {"id", "error"} row.
+    """
+    start = time.perf_counter()
+    count = 0
+    batches = _iter_batches(iter_raw_messages(source, text_field), batch_size)
+    with open(output, "w", encoding="utf-8") as out:
+        def write(results: List[Dict[str, Optional[str]]]):
+            nonlocal count
+            out.writelines(json.dumps(r, ensure_ascii=False) + "\n" for r in results)
+            count += len(results)
+
+        if workers <= 1:
+            for batch in batches:
+                write(_extract_batch(batch))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                in_flight = deque()
+                for batch in batches:
+                    in_flight.append(pool.submit(_extract_batch, batch))
+                    if len(in_flight) >= workers * 2:
+                        write(in_flight.popleft().result())
+                while in_flight:
+                    write(in_flight.popleft().result())
+
+    elapsed = time.perf_counter() - start
+    return {"messages": count, "seconds": elapsed,
+            "messages_per_second": count / elapsed if elapsed > 0 else 0.0}
+
+
 def main(argv: list[str]) -> int:
-    if len(argv) > 1:
-        path = Path(argv[1])
-        if not path.exists():
-            print(f"Input file not found: {path}", file=sys.stderr)
-            return 2
-        text = _load_text_from_file(path)
-    else:
-        text = SAMPLE_TEXT
+    parser = argparse.ArgumentParser(description="Extract contact details from free-form text.")
+    parser.add_argument("path", nargs="?",
+                        help="Text file to extract from (bulk mode: directory, .mbox or .jsonl).")
+    parser.add_argument("--bulk", action="store_true",
+                        help="Process every message in path and write JSONL results.")
+    parser.add_argument("--output", default="contacts.jsonl",
+                        help="Bulk mode: JSONL output file.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Bulk mode: worker processes (1 = run in-process).")
+    parser.add_argument("--batch_size", type=int, default=BULK_BATCH_SIZE,
+                        help="Bulk mode: messages per worker task.")
+    parser.add_argument("--text_field", default="text",
+                        help="Bulk mode: JSONL field holding the message text.")
+    args = parser.parse_args(argv[1:])
+
+    if args.path and not Path(args.path).exists():
+        print(f"Input not found: {args.path}", file=sys.stderr)
+        return 2
+
+    if args.bulk:
+        if not args.path:
+            parser.error("--bulk needs an input path")
+        stats = run_bulk(Path(args.path), Path(args.output), args.workers,
+                         args.batch_size, args.text_field)
+        print(f"Extracted {stats['messages']:,} messages in {stats['seconds']:.2f}s "
+              f"({stats['messages_per_second']:,.0f} msg/s) -> {args.output}", file=sys.stderr)
+        return 0
+
+    text = _load_text_from_file(Path(args.path)) if args.path else SAMPLE_TEXT
 
     result = extract_info(text)
     print(json.dumps(result, indent=2))
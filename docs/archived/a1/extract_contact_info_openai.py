@@ -18,18 +18,39 @@ Usage (PowerShell):
   # with a text file
   py .\src\day2\extract_contact_info_openai.py .\path\to\file.txt
 
+  # regex first; only messages missing a required field, or with conflicting
+  # candidates for one, go to the model
+  py .\src\day2\extract_contact_info_openai.py --tiered .\path\to\file.txt
+  py .\src\day2\extract_contact_info_openai.py --tiered --bulk .\inbox.mbox --output .\contacts.jsonl
+
+Testing without the API: start benchmarks/stub_openai_server.py and set
+OPENAI_BASE_URL=http://127.0.0.1:8080/v1 and OPENAI_API_KEY=stub.
+
 Optional environment variables:
-- OPENAI_MODEL   (default: gpt-3.5-turbo)
+- OPENAI_MODEL            (default: gpt-3.5-turbo)
+- OPENAI_MAX_CONNECTIONS  (default: 100) size of the shared connection pool
+- OPENAI_MAX_KEEPALIVE    (default: 20) idle connections kept open
+- OPENAI_CONNECT_TIMEOUT  (default: 5) seconds
+- OPENAI_READ_TIMEOUT     (default: 60) seconds
+- OPENAI_MAX_RETRIES      (default: 3) SDK retries per request
+- OPENAI_HTTP2            (default: 1) HTTP/2 when the h2 package is installed
+These are the pool settings src/a4_embeddings/embedding_client.py reads, with
+the same defaults.
 """
 
 from __future__ import annotations
 
+import argparse
 import json
 import os
 import sys
 import importlib
+import importlib.util
+from collections import Counter
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Optional, Sequence
+
+from extract_contact_info import extract_info_with_candidates, iter_messages
 
 # Optional .env support if python-dotenv is available
 try:
@@ -39,7 +60,40 @@ except Exception:
     pass
 
 
+_CLIENT = None
+
+
+def _env_number(name: str, default, cast=float):
+    value = os.getenv(name)
+    return cast(value) if value else default
+
+
+def _make_http_client():
+    """Pooled httpx client: keep-alive reuse, bounded sockets, HTTP/2 when available."""
+    import httpx
+
+    max_connections = _env_number("OPENAI_MAX_CONNECTIONS", 100, int)
+    http2 = os.getenv("OPENAI_HTTP2", "1") != "0"
+    if http2 and importlib.util.find_spec("h2") is None:
+        print("HTTP/2 requested but the h2 package is not installed; using HTTP/1.1 "
+              "(pip install \"httpx[http2]\" or set OPENAI_HTTP2=0).", file=sys.stderr)
+        http2 = False
+    return httpx.Client(
+        http2=http2,
+        limits=httpx.Limits(max_connections=max_connections,
+                            max_keepalive_connections=_env_number("OPENAI_MAX_KEEPALIVE", 20, int),
+                            keepalive_expiry=30.0),
+        timeout=httpx.Timeout(_env_number("OPENAI_READ_TIMEOUT", 60.0),
+                              connect=_env_number("OPENAI_CONNECT_TIMEOUT", 5.0)),
+    )
+
+
 def get_openai_client():
+    """Return the process-wide client so repeated extractions reuse connections."""
+    global _CLIENT
+    if _CLIENT is not None:
+        return _CLIENT
+
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         print(
@@ -60,7 +114,9 @@ def get_openai_client():
         )
         raise SystemExit(1)
 
-    return OpenAI(api_key=api_key)
+    _CLIENT = OpenAI(api_key=api_key, max_retries=_env_number("OPENAI_MAX_RETRIES", 3, int),
+                     http_client=_make_http_client())
+    return _CLIENT
 
 
 SYSTEM_PROMPT = (
@@ -156,25 +212,129 @@ def call_openai_extract(client: Any, text: str, model: str) -> Dict[str, Any]:
     return result
 
 
+FIELDS = ("first_name", "company", "location", "email", "phone")
+DEFAULT_REQUIRED_FIELDS = ("first_name", "email", "phone")
+
+
+class TieredExtractor:
+    """Regex tier first; the model only sees messages the regex can't settle.
+
+    A message escalates when a required field is missing from the regex
+    result or ambiguous (more than one distinct candidate in the text). For
+    escalated fields the model's answer wins when it gives one (a null keeps
+    the regex value); other fields keep the regex value and only fall back
+    to the model's when the regex found nothing.
+    The client is created on the first escalation, so regex-only runs need
+    no API key.
+    """
+
+    def __init__(self, model: str, required: Sequence[str] = DEFAULT_REQUIRED_FIELDS,
+                 client: Any = None):
+        unknown = set(required) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown required fields: {', '.join(sorted(unknown))}")
+        self.model = model
+        self.required = tuple(required)
+        self._client = client
+        self.stats = {"messages": 0, "regex": 0, "model": 0, "model_resolved": 0, "model_errors": 0}
+        self.escalations: Counter = Counter()  # "missing phone", "ambiguous email", ...
+
+    @property
+    def client(self) -> Any:
+        if self._client is None:
+            self._client = get_openai_client()
+        return self._client
+
+    def extract(self, text: str) -> Dict[str, Any]:
+        self.stats["messages"] += 1
+        result, candidates = extract_info_with_candidates(text)
+        missing = [field for field in self.required if not result[field]]
+        ambiguous = [field for field in self.required if len(candidates[field]) > 1]
+        if not missing and not ambiguous:
+            self.stats["regex"] += 1
+            return result
+
+        self.stats["model"] += 1
+        self.escalations.update([f"missing {field}" for field in missing]
+                                + [f"ambiguous {field}" for field in ambiguous])
+        try:
+            answer = call_openai_extract(self.client, text, self.model)
+        except Exception as e:
+            self.stats["model_errors"] += 1
+            print(f"Model call failed, keeping the regex result: {e}", file=sys.stderr)
+            return result
+
+        escalated = set(missing) | set(ambiguous)
+        merged = {field: answer[field] or result[field] if field in escalated
+                  else result[field] or answer[field]
+                  for field in FIELDS}
+        # Resolved only if the model itself answered every escalated field
+        if all(answer[field] for field in escalated) and all(merged[field] for field in self.required):
+            self.stats["model_resolved"] += 1
+        return merged
+
+    def hit_rates(self) -> Dict[str, float]:
+        """Share of messages settled by each tier, and how often the model filled the gaps."""
+        messages, escalated = self.stats["messages"], self.stats["model"]
+        return {
+            "regex": self.stats["regex"] / messages if messages else 0.0,
+            "model": escalated / messages if messages else 0.0,
+            "model_resolved": self.stats["model_resolved"] / escalated if escalated else 0.0,
+        }
+
+    def report(self) -> str:
+        rates = self.hit_rates()
+        reasons = ", ".join(f"{reason} {count}" for reason, count in self.escalations.most_common())
+        return (f"{self.stats['messages']} messages: {self.stats['regex']} regex ({rates['regex']:.1%}), "
+                f"{self.stats['model']} model ({rates['model']:.1%}; "
+                f"{self.stats['model_resolved']} resolved, {self.stats['model_errors']} errors)"
+                + (f"; escalated for: {reasons}" if reasons else ""))
+
+
 def _load_text_from_file(path: Path) -> str:
     return path.read_text(encoding="utf-8", errors="ignore")
 
 
 def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description="Extract contact details with the OpenAI API.")
+    parser.add_argument("path", nargs="?",
+                        help="Text file to extract from (with --bulk: directory, .mbox or .jsonl).")
+    parser.add_argument("--tiered", action="store_true",
+                        help="Run the regex extractor first and call the model only when needed.")
+    parser.add_argument("--required", default=",".join(DEFAULT_REQUIRED_FIELDS),
+                        help="--tiered: comma-separated fields that must be found unambiguously.")
+    parser.add_argument("--bulk", action="store_true",
+                        help="Process every message in path and write JSONL results.")
+    parser.add_argument("--output", default="contacts.jsonl",
+                        help="--bulk: JSONL output file.")
+    args = parser.parse_args(argv[1:])
+
+    if args.path and not Path(args.path).exists():
+        print(f"Input not found: {args.path}", file=sys.stderr)
+        return 2
+    if args.bulk and not args.path:
+        parser.error("--bulk needs an input path")
+
     model = os.getenv("OPENAI_MODEL", "gpt-4")
-    client = get_openai_client()
-
-    if len(argv) > 1:
-        path = Path(argv[1])
-        if not path.exists():
-            print(f"Input file not found: {path}", file=sys.stderr)
-            return 2
-        text = _load_text_from_file(path)
+    tiered: Optional[TieredExtractor] = None
+    if args.tiered:
+        tiered = TieredExtractor(model, [field for field in args.required.split(",") if field])
+        extract = tiered.extract
+    else:
+        client = get_openai_client()
+        extract = lambda text: call_openai_extract(client, text, model)  # noqa: E731
+
+    if args.bulk:
+        with open(args.output, "w", encoding="utf-8") as out:
+            for message_id, text in iter_messages(Path(args.path)):
+                out.write(json.dumps({"id": message_id, **extract(text)}, ensure_ascii=False) + "\n")
+        print(f"Results -> {args.output}", file=sys.stderr)
     else:
-        text = SAMPLE_TEXT
+        text = _load_text_from_file(Path(args.path)) if args.path else SAMPLE_TEXT
+        print(json.dumps(extract(text), indent=2))
 
-    result = call_openai_extract(client, text, model)
-    print(json.dumps(result, indent=2))
+    if tiered:
+        print(tiered.report(), file=sys.stderr)
     return 0
 
 
@@ -24,6 +24,9 @@ through tokenization - the fundamental bridge between human language and machine
 
 import tiktoken
 
+import shared_paths  # noqa: F401  (makes ../a3_encoding importable)
+from token_table import get_token_table
+
 
 def count_tokens(text: str, encoding_name: str) -> tuple:
     """  
@@ -42,8 +45,8 @@ def count_tokens(text: str, encoding_name: str) -> tuple:
     # Encode text to tokens
     token_ids = encoding.encode(text)
 
-    # Decode each token ID back to text for clarity
-    decoded_tokens = [encoding.decode([token]) for token in token_ids]
+    # Look up each token ID's text in the precomputed table (no decode calls)
+    decoded_tokens = get_token_table(encoding).strings(token_ids)
 
     return len(token_ids), token_ids, decoded_tokens
 
@@ -73,7 +76,7 @@ def discover_tokenization_patterns():
         print(f"📋 Text: '{text}'")
 
         tokens = encoding.encode(text)
-        decoded = [encoding.decode([t]) for t in tokens]
+        decoded = get_token_table(encoding).strings(tokens)
 
         print(f"🔢 Token count: {len(tokens)}")
         print(f"📊 Efficiency: {len(text)/len(tokens):.2f} chars/token")
@@ -108,7 +111,7 @@ def interactive_tokenization_explorer():
 
         # Perform tokenization analysis
         token_ids = encoding.encode(user_text)
-        decoded_tokens = [encoding.decode([token]) for token in token_ids]
+        decoded_tokens = get_token_table(encoding).strings(token_ids)
 
         print(f"\n📊 ANALYSIS RESULTS")
         print(f"📝 Original text: '{user_text}'")
@@ -10,6 +10,9 @@ User inputs text and sees:
 
 import tiktoken
 
+import shared_paths  # noqa: F401  (makes ../a3_encoding importable)
+from token_table import get_token_table
+
 # === Configuration ===
 MODEL = "gpt-3.5-turbo"  # Change as needed
 # USD per 1K tokens (example for gpt-3.5-turbo input)
@@ -22,6 +25,7 @@ def main():
     print("=" * 40)
 
     encoding = tiktoken.encoding_for_model(MODEL)
+    token_table = get_token_table(encoding)
 
     while True:
         text = input("\nEnter text (or 'quit' to exit): ").strip()
@@ -29,7 +33,7 @@ def main():
             break
 
         tokens = encoding.encode(text)
-        token_strings = [encoding.decode([t]) for t in tokens]
+        token_strings = token_table.strings(tokens)
         token_count = len(tokens)
         cost_estimate = (token_count / 1000) * COST_PER_1K_TOKENS
 
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+📈 Tokenizer Efficiency Profiler for Large Multilingual Corpora
+
+Streams a labeled dataset (JSONL, CSV or TSV with a text column plus label
+columns such as language and domain), tokenizes it in parallel under several
+encodings and reports, per label and encoding:
+    - chars/token, bytes/token and tokens/word distributions
+      (p10 / p50 / p90 / p99 percentiles and histograms); in scripts written
+      without spaces (CJK, kana, Thai, Lao, Khmer, Myanmar) every character
+      counts as a word
+    - total tokens and tokens per 1K characters, for context-window and
+      API-cost forecasts of non-English traffic
+
+Memory stays bounded: rows are read in chunks, at most a few chunks are in
+flight across the worker pool, and distributions are kept as fixed-bin
+histograms rather than per-row lists.
+
+📋 Prerequisites:
+    pip install tiktoken numpy
+
+Usage:
+    python a3_corpus_profiler.py --input corpus.jsonl --label_fields language domain
+    python a3_corpus_profiler.py --input corpus.csv --encodings cl100k_base r50k_base --output profile.json
+"""
+
+import os
+import csv
+import json
+import argparse
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Tuple
+import numpy as np
+import tiktoken
+
+# ==============================
+#  Configuration
+# ==============================
+DEFAULT_ENCODINGS = ["cl100k_base", "p50k_base", "r50k_base"]
+CHUNK_ROWS = 2_000
+PERCENTILES = (10, 50, 90, 99)
+
+# Fixed histogram bins per metric: (upper bound, bin width); larger values land in the last bin
+METRIC_BINS = {
+    "chars_per_token": (16.0, 0.05),
+    "bytes_per_token": (16.0, 0.05),
+    "tokens_per_word": (64.0, 0.02),
+}
+REPORT_BIN_WIDTH = {"chars_per_token": 1.0, "bytes_per_token": 1.0, "tokens_per_word": 0.5}
+
+# Scripts written without spaces between words: each character counts as one word
+_UNSPACED = ("\u0E00-\u0EFF\u1000-\u109F\u1780-\u17FF\u3040-\u30FF"
+             "\u3400-\u4DBF\u4E00-\u9FFF\uF900-\uFAFF")
+WORD_RE = re.compile(f"[{_UNSPACED}]|[^\\s{_UNSPACED}]+")
+
+_worker_encodings: List[tiktoken.Encoding] = []
+
+
+# ==============================
+#  Corpus Reading
+# ==============================
+def iter_rows(path: str, text_field: str, label_fields: List[str]) -> Iterator[Tuple[str, str]]:
+    """Yield (label, text); label joins the label fields with '/'."""
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if extension in (".jsonl", ".ndjson"):
+            records = (json.loads(line) for line in f if line.strip())
+        else:
+            records = csv.DictReader(f, delimiter="\t" if extension == ".tsv" else ",")
+        for record in records:
+            text = record.get(text_field)
+            if not text:
+                continue
+            label = "/".join(str(record.get(field) or "unknown") for field in label_fields) or "all"
+            yield label, text
+
+
+def iter_chunks(rows: Iterator[Tuple[str, str]], size: int) -> Iterator[List[Tuple[str, str]]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# ==============================
+#  Worker
+# ==============================
+def _init_worker(encoding_names: List[str]):
+    global _worker_encodings
+    _worker_encodings = [tiktoken.get_encoding(name) for name in encoding_names]
+
+
+def count_words(text: str) -> int:
+    """Whitespace-separated words, plus one per character of an unspaced script."""
+    return sum(1 for _ in WORD_RE.finditer(text))
+
+
+def _measure_chunk(texts: List[str]) -> Dict[str, np.ndarray]:
+    """Per-row char, byte, word counts and token counts under every encoding."""
+    tokens = np.empty((len(texts), len(_worker_encodings)), dtype="int64")
+    for column, encoding in enumerate(_worker_encodings):
+        tokens[:, column] = [len(encoding.encode_ordinary(text)) for text in texts]
+    return {
+        "chars": np.fromiter(map(len, texts), dtype="int64", count=len(texts)),
+        "bytes": np.fromiter((len(t.encode("utf-8")) for t in texts), dtype="int64", count=len(texts)),
+        "words": np.fromiter((count_words(t) for t in texts), dtype="int64", count=len(texts)),
+        "tokens": tokens,
+    }
+
+
+# ==============================
+#  Streaming Aggregation
+# ==============================
+class LabelProfile:
+    """Fixed-bin histograms and totals for one (label, encoding) pair."""
+
+    def __init__(self):
+        self.histograms = {metric: np.zeros(int(round(upper / width)) + 1, dtype="int64")
+                           for metric, (upper, width) in METRIC_BINS.items()}
+        self.rows = 0
+        self.chars = 0
+        self.bytes = 0
+        self.words = 0
+        self.tokens = 0
+
+    def add(self, chars: np.ndarray, nbytes: np.ndarray, words: np.ndarray, tokens: np.ndarray):
+        self.rows += len(chars)
+        self.chars += int(chars.sum())
+        self.bytes += int(nbytes.sum())
+        self.words += int(words.sum())
+        self.tokens += int(tokens.sum())
+        has_tokens = tokens > 0
+        has_words = words > 0
+        values = {
+            "chars_per_token": chars[has_tokens] / tokens[has_tokens],
+            "bytes_per_token": nbytes[has_tokens] / tokens[has_tokens],
+            "tokens_per_word": tokens[has_words] / words[has_words],
+        }
+        for metric, metric_values in values.items():
+            upper, width = METRIC_BINS[metric]
+            histogram = self.histograms[metric]
+            bins = np.minimum((metric_values / width).astype("int64"), len(histogram) - 1)
+            histogram += np.bincount(bins, minlength=len(histogram))
+
+    def summary(self) -> Dict:
+        report = {
+            "rows": self.rows,
+            "chars": self.chars,
+            "bytes": self.bytes,
+            "words": self.words,
+            "tokens": self.tokens,
+            "tokens_per_1k_chars": 1000.0 * self.tokens / self.chars if self.chars else 0.0,
+            "chars_per_token": self.chars / self.tokens if self.tokens else 0.0,
+            "bytes_per_token": self.bytes / self.tokens if self.tokens else 0.0,
+            "tokens_per_word": self.tokens / self.words if self.words else 0.0,
+            "distributions": {},
+        }
+        for metric, histogram in self.histograms.items():
+            report["distributions"][metric] = {
+                "percentiles": _histogram_percentiles(histogram, *METRIC_BINS[metric]),
+                "histogram": _coarse_histogram(histogram, *METRIC_BINS[metric],
+                                               REPORT_BIN_WIDTH[metric]),
+            }
+        return report
+
+
+def _histogram_percentiles(histogram: np.ndarray, upper: float, width: float) -> Dict[str, float]:
+    """Percentiles read off cumulative bin counts (resolution = bin width, capped at upper)."""
+    total = histogram.sum()
+    if total == 0:
+        return {f"p{p}": 0.0 for p in PERCENTILES}
+    cumulative = np.cumsum(histogram)
+    return {f"p{p}": float(min((np.searchsorted(cumulative, total * p / 100.0) + 0.5) * width, upper))
+            for p in PERCENTILES}
+
+
+def _coarse_histogram(histogram: np.ndarray, upper: float, width: float,
+                      report_width: float) -> Dict[str, int]:
+    """Re-bin the fine histogram into readable ranges like '2.0-3.0'."""
+    factor = int(round(report_width / width))
+    coarse = {}
+    for start in range(0, len(histogram) - 1, factor):
+        count = int(histogram[start:start + factor].sum())
+        if count:
+            low = start * width
+            coarse[f"{low:.1f}-{low + report_width:.1f}"] = count
+    if histogram[-1]:
+        coarse[f"{upper:.1f}+"] = int(histogram[-1])
+    return coarse
+
+
+def profile_corpus(rows: Iterator[Tuple[str, str]], encoding_names: List[str],
+                   workers: int, chunk_rows: int = CHUNK_ROWS) -> Dict[str, Dict[str, LabelProfile]]:
+    """Return profiles[label][encoding] aggregated over the whole stream."""
+    profiles: Dict[str, Dict[str, LabelProfile]] = {}
+
+    def absorb(labels: List[str], measured: Dict[str, np.ndarray]):
+        label_array = np.array(labels, dtype=object)
+        for label in dict.fromkeys(labels):
+            selected = label_array == label
+            per_encoding = profiles.setdefault(
+                label, {name: LabelProfile() for name in encoding_names})
+            for column, name in enumerate(encoding_names):
+                per_encoding[name].add(measured["chars"][selected], measured["bytes"][selected],
+                                       measured["words"][selected], measured["tokens"][selected, column])
+
+    chunks = iter_chunks(rows, chunk_rows)
+    if workers <= 1:
+        _init_worker(encoding_names)
+        for chunk in chunks:
+            labels, texts = zip(*chunk)
+            absorb(list(labels), _measure_chunk(list(texts)))
+        return profiles
+
+    # Keep only a few chunks in flight so huge inputs never sit in memory at once
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(encoding_names,)) as pool:
+        in_flight = deque()
+        for chunk in chunks:
+            labels, texts = zip(*chunk)
+            in_flight.append((list(labels), pool.submit(_measure_chunk, list(texts))))
+            if len(in_flight) >= workers * 2:
+                labels, future = in_flight.popleft()
+                absorb(labels, future.result())
+        while in_flight:
+            labels, future = in_flight.popleft()
+            absorb(labels, future.result())
+    return profiles
+
+
+# ==============================
+#  Reporting
+# ==============================
+def build_report(profiles: Dict[str, Dict[str, LabelProfile]], baseline: str) -> Dict:
+    report = {label: {name: profile.summary() for name, profile in per_encoding.items()}
+              for label, per_encoding in sorted(profiles.items())}
+    # Token inflation versus the baseline value of the first label field in the
+    # same remaining labels (fr/news is compared with en/news) and encoding
+    for label, per_encoding in report.items():
+        baseline_label = "/".join([baseline] + label.split("/")[1:])
+        if baseline_label not in report:
+            continue
+        for name, summary in per_encoding.items():
+            base_rate = report[baseline_label][name]["tokens_per_1k_chars"]
+            summary["relative_to_baseline"] = (
+                summary["tokens_per_1k_chars"] / base_rate if base_rate else 0.0)
+    return report
+
+
+def print_report(report: Dict):
+    print("\n📊 TOKENIZER EFFICIENCY PROFILE")
+    print("=" * 100)
+    print(f"{'Label':<24} | {'Encoding':<12} | {'Rows':>8} | {'Tok/1K ch':>9} | "
+          f"{'ch/tok p50':>10} | {'B/tok p50':>9} | {'tok/word p50':>12} | {'tok/word p90':>12}")
+    print("-" * 100)
+    for label, per_encoding in report.items():
+        for name, summary in per_encoding.items():
+            dist = summary["distributions"]
+            print(f"{label:<24} | {name:<12} | {summary['rows']:>8,} | "
+                  f"{summary['tokens_per_1k_chars']:>9.1f} | "
+                  f"{dist['chars_per_token']['percentiles']['p50']:>10.2f} | "
+                  f"{dist['bytes_per_token']['percentiles']['p50']:>9.2f} | "
+                  f"{dist['tokens_per_word']['percentiles']['p50']:>12.2f} | "
+                  f"{dist['tokens_per_word']['percentiles']['p90']:>12.2f}")
+
+
+# ==============================
+#  Main Script
+# ==============================
+def main():
+    parser = argparse.ArgumentParser(
+        description="Profile tokenizer efficiency over a labeled multilingual corpus.")
+    parser.add_argument("--input", type=str, required=True,
+                        help="Corpus file (.jsonl/.ndjson, .csv or .tsv).")
+    parser.add_argument("--text_field", type=str, default="text",
+                        help="Column holding the text.")
+    parser.add_argument("--label_fields", nargs="*", default=["language", "domain"],
+                        help="Columns combined into the grouping label.")
+    parser.add_argument("--encodings", nargs="+", default=DEFAULT_ENCODINGS,
+                        help="Encodings to profile.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Worker processes (1 = run in-process).")
+    parser.add_argument("--chunk_rows", type=int, default=CHUNK_ROWS,
+                        help="Rows per worker task.")
+    parser.add_argument("--baseline", type=str, default="en",
+                        help="First-label value used as the 1.0x reference for token inflation.")
+    parser.add_argument("--output", type=str,
+                        help="Write the full report (percentiles + histograms) as JSON.")
+    args = parser.parse_args()
+
+    rows = iter_rows(args.input, args.text_field, args.label_fields)
+    profiles = profile_corpus(rows, args.encodings, args.workers, args.chunk_rows)
+    report = build_report(profiles, args.baseline)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n[Saved] Profile -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,16 +16,154 @@ the intelligent pattern recognition capabilities of Byte-Pair Encoding.
     - Prefix/suffix pattern detection and visualization
     - Cross-domain vocabulary comparison
     - Efficiency metrics with morphological insights
+    - Quiet result objects with a separate terminal renderer
+    - Corpus mode: parallel lexicon-wide audit written to CSV tables
+    - Automatic affix discovery with prefix/suffix tries
 
 📋 Prerequisites:
-    pip install tiktoken
+    pip install tiktoken numpy
 
 💡 Educational Focus: Original implementation demonstrating BPE's linguistic intelligence
 """
 
+import csv
+import os
 import tiktoken
+import numpy as np
 from collections import defaultdict
-from typing import Dict, List, Tuple
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import shared_paths  # noqa: F401  (makes ../a3_encoding importable)
+from token_table import ALPHABETIC, get_token_table
+
+# Corpus mode: words per worker task and the affixes audited by default
+CORPUS_CHUNK_SIZE = 20_000
+DEFAULT_PREFIXES = ["un", "pre", "re", "dis", "multi", "hyper", "non", "over", "sub", "inter"]
+DEFAULT_SUFFIXES = ["ing", "tion", "ly", "ness", "ed", "er", "ment", "able", "ity", "less"]
+
+_worker_encoding = None
+
+
+def _init_corpus_worker(encoding_name: str):
+    """Load the encoding once per worker process."""
+    global _worker_encoding
+    _worker_encoding = tiktoken.get_encoding(encoding_name)
+
+
+def _encode_word_chunk(words: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Token counts and flattened token IDs for a chunk of words (compact to pickle)."""
+    # Plain loop: encode_ordinary_batch submits one thread-pool task per word
+    encoded = [_worker_encoding.encode_ordinary(word) for word in words]
+    counts = np.fromiter((len(ids) for ids in encoded), dtype="int32", count=len(encoded))
+    flat_ids = np.fromiter((t for ids in encoded for t in ids), dtype="int32",
+                           count=int(counts.sum()))
+    return counts, flat_ids
+
+
+class AffixTrie:
+    """
+    Character trie for affix discovery. Every node counts the words passing
+    through it and the words whose token boundary falls exactly at that
+    depth, so one insertion pass (O(total chars)) scores every candidate affix.
+    Suffixes use a trie over reversed words.
+    """
+
+    def __init__(self):
+        self.children: List[Dict[str, int]] = [{}]
+        self.word_counts: List[int] = [0]
+        self.boundary_counts: List[int] = [0]
+        self.labels: List[str] = [""]
+
+    def add(self, text: str, boundary_depth: int, max_depth: int):
+        node = 0
+        for depth, char in enumerate(text[:max_depth], 1):
+            child = self.children[node].get(char)
+            if child is None:
+                child = len(self.children)
+                self.children[node][char] = child
+                self.children.append({})
+                self.word_counts.append(0)
+                self.boundary_counts.append(0)
+                self.labels.append(self.labels[node] + char)
+            node = child
+            self.word_counts[node] += 1
+            if depth == boundary_depth:
+                self.boundary_counts[node] += 1
+
+    def candidates(self, min_length: int, min_words: int):
+        """(affix, words, boundary words) for nodes deep and frequent enough."""
+        for node in range(1, len(self.children)):
+            if len(self.labels[node]) >= min_length and self.word_counts[node] >= min_words:
+                yield self.labels[node], self.word_counts[node], self.boundary_counts[node]
+
+
+def load_wordlist(path: str) -> List[str]:
+    """One word per line; blank lines and duplicates are dropped, order kept."""
+    with open(path, "r", encoding="utf-8") as f:
+        return list(dict.fromkeys(line.strip() for line in f if line.strip()))
+
+
+# ==============================
+#  Result Objects
+# ==============================
+@dataclass
+class WordTokenization:
+    __slots__ = ("word", "tokens", "token_ids")
+    word: str
+    tokens: List[str]
+    token_ids: List[int]
+
+    @property
+    def count(self) -> int:
+        return len(self.token_ids)
+
+    @property
+    def efficiency(self) -> float:
+        """Characters per token."""
+        return len(self.word) / len(self.token_ids) if self.token_ids else 0.0
+
+
+@dataclass
+class WordFamilyResult:
+    __slots__ = ("encoding", "words", "shared_components")
+    encoding: str
+    words: List[WordTokenization]
+    shared_components: Dict[str, int]
+
+
+@dataclass
+class AffixPatternResult:
+    __slots__ = ("affix", "kind", "words", "consistent")
+    affix: str
+    kind: str  # "prefix" or "suffix"
+    words: List[WordTokenization]
+    consistent: int
+
+    @property
+    def consistency(self) -> float:
+        """Percent of words whose edge token preserves the affix."""
+        return 100.0 * self.consistent / len(self.words) if self.words else 0.0
+
+
+@dataclass
+class EfficiencyGroupResult:
+    __slots__ = ("name", "words")
+    name: str
+    words: List[WordTokenization]
+
+    @property
+    def efficiencies(self) -> np.ndarray:
+        return np.array([entry.efficiency for entry in self.words])
+
+    @property
+    def average_efficiency(self) -> float:
+        return float(self.efficiencies.mean()) if self.words else 0.0
+
+    @property
+    def average_tokens(self) -> float:
+        return float(np.mean([entry.count for entry in self.words])) if self.words else 0.0
 
 
 class MorphologicalAnalyzer:
@@ -38,203 +176,299 @@ class MorphologicalAnalyzer:
         """Initialize with specified tokenization encoding."""
         self.encoding = tiktoken.get_encoding(encoding_name)
         self.encoding_name = encoding_name
+        self.token_table = get_token_table(self.encoding)
+
+    def tokenize_words(self, words: List[str]) -> List[WordTokenization]:
+        """Encode each word once; token strings come from the token table."""
+        tokenized = []
+        for word in words:
+            token_ids = self.encoding.encode(word)
+            tokenized.append(WordTokenization(word, self.token_table.strings(token_ids), token_ids))
+        return tokenized
 
-    def analyze_word_family(self, word_family: List[str]) -> Dict:
+    def analyze_word_family(self, word_family: List[str]) -> WordFamilyResult:
         """
         Analyze how BPE tokenizes related words (same root, different forms).
         Educational insight: Reveals morphological consistency patterns.
         """
-        analysis = {
-            'family_pattern': {},
-            'common_tokens': set(),
-            'morphological_boundaries': {},
-            'efficiency_metrics': {}
-        }
-
-        print(f"🧬 MORPHOLOGICAL FAMILY ANALYSIS")
-        print(f"📊 Encoding: {self.encoding_name}")
-        print("=" * 50)
-
-        all_tokens = []
-
-        for word in word_family:
-            tokens = self.encoding.encode(word)
-            decoded = [self.encoding.decode([t]) for t in tokens]
-
-            analysis['family_pattern'][word] = {
-                'tokens': decoded,
-                'token_ids': tokens,
-                'count': len(tokens),
-                'efficiency': len(word) / len(tokens)
-            }
-
-            all_tokens.extend(decoded)
-
-            print(f"📝 '{word}' → {decoded}")
-            print(
-                f"   🔢 {len(tokens)} tokens | ⚡ {len(word)/len(tokens):.2f} chars/token")
+        tokenized = self.tokenize_words(word_family)
 
         # Find common morphological components
         token_frequency = defaultdict(int)
-        for token in all_tokens:
-            token_frequency[token] += 1
+        for entry in tokenized:
+            for token in entry.tokens:
+                token_frequency[token] += 1
 
         # Identify shared morphological components
         shared_components = {token: freq for token, freq in token_frequency.items()
                              if freq > 1 and len(token.strip()) > 1}
+        return WordFamilyResult(self.encoding_name, tokenized, shared_components)
 
-        if shared_components:
-            print(f"\n🧩 SHARED MORPHOLOGICAL COMPONENTS:")
-            for component, frequency in sorted(shared_components.items(),
-                                               key=lambda x: x[1], reverse=True):
-                print(f"   '{component}' appears in {frequency} words")
-
-        analysis['common_tokens'] = shared_components
-        return analysis
-
-    def analyze_prefix_patterns(self, prefix_examples: Dict[str, List[str]]) -> Dict:
+    def analyze_prefix_patterns(self, prefix_examples: Dict[str, List[str]]) -> List[AffixPatternResult]:
         """
         Analyze how BPE handles different prefixes across various root words.
         Educational focus: Prefix consistency and boundary detection.
         """
-        print(f"\n🔍 PREFIX PATTERN ANALYSIS")
-        print("=" * 40)
-
-        prefix_analysis = {}
-
-        for prefix, words in prefix_examples.items():
-            print(f"\n📌 Prefix: '{prefix}'")
-
-            prefix_tokens = []
-            consistency_score = 0
-
-            for word in words:
-                tokens = self.encoding.encode(word)
-                decoded = [self.encoding.decode([t]) for t in tokens]
-
-                print(f"   '{word}' → {decoded}")
-
-                # Check if prefix is preserved as a token
-                first_token = decoded[0] if decoded else ""
-                if prefix in first_token or first_token.strip() == prefix:
-                    consistency_score += 1
-
-                prefix_tokens.append(decoded)
-
-            consistency_percentage = (consistency_score / len(words)) * 100
-            prefix_analysis[prefix] = {
-                'words': words,
-                'tokenizations': prefix_tokens,
-                'consistency': consistency_percentage
-            }
-
-            print(f"   🎯 Prefix consistency: {consistency_percentage:.1f}%")
-
-            if consistency_percentage > 70:
-                print(f"   ✅ Strong morphological recognition!")
-            elif consistency_percentage > 40:
-                print(f"   ⚠️ Moderate morphological recognition")
-            else:
-                print(f"   ❌ Weak morphological recognition")
+        return [self._affix_pattern(prefix, words, "prefix")
+                for prefix, words in prefix_examples.items()]
 
-        return prefix_analysis
-
-    def analyze_suffix_patterns(self, suffix_examples: Dict[str, List[str]]) -> Dict:
+    def analyze_suffix_patterns(self, suffix_examples: Dict[str, List[str]]) -> List[AffixPatternResult]:
         """
         Analyze how BPE handles different suffixes across various root words.
         Educational focus: Suffix consistency and productive morphology.
         """
-        print(f"\n🔍 SUFFIX PATTERN ANALYSIS")
-        print("=" * 40)
-
-        suffix_analysis = {}
+        return [self._affix_pattern(suffix, words, "suffix")
+                for suffix, words in suffix_examples.items()]
+
+    def _affix_pattern(self, affix: str, words: List[str], kind: str) -> AffixPatternResult:
+        tokenized = self.tokenize_words(words)
+        consistent = 0
+        for entry in tokenized:
+            # Check if the affix is preserved in the first (prefix) or last (suffix) token
+            edge_token = (entry.tokens[0] if kind == "prefix" else entry.tokens[-1]) if entry.tokens else ""
+            if affix in edge_token or edge_token.strip() == affix:
+                consistent += 1
+        return AffixPatternResult(affix, kind, tokenized, consistent)
+
+    def compare_morphological_efficiency(self, word_groups: Dict[str, List[str]]) -> List[EfficiencyGroupResult]:
+        """
+        Compare tokenization efficiency across different morphological complexity levels.
+        Educational insight: How morphological structure affects compression.
+        Groups are returned most efficient first.
+        """
+        results = [EfficiencyGroupResult(group_name, self.tokenize_words(words))
+                   for group_name, words in word_groups.items()]
+        return sorted(results, key=lambda group: group.average_efficiency, reverse=True)
+
+    # ==============================
+    #  Corpus Mode
+    # ==============================
+    def encode_corpus(self, words: List[str], workers: Optional[int] = None,
+                      chunk_size: int = CORPUS_CHUNK_SIZE) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Encode a whole wordlist across a process pool.
+        Returns (offsets, token_ids): the tokens of words[i] are
+        token_ids[offsets[i]:offsets[i + 1]].
+        """
+        chunks = [words[i:i + chunk_size] for i in range(0, len(words), chunk_size)]
+        workers = workers or os.cpu_count() or 1
+        if len(chunks) <= 1 or workers == 1:
+            _init_corpus_worker(self.encoding_name)
+            parts = [_encode_word_chunk(chunk) for chunk in chunks]
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_corpus_worker,
+                                     initargs=(self.encoding_name,)) as pool:
+                parts = list(pool.map(_encode_word_chunk, chunks))
+
+        counts = np.concatenate([p[0] for p in parts]) if parts else np.zeros(0, "int32")
+        token_ids = np.concatenate([p[1] for p in parts]) if parts else np.zeros(0, "int32")
+        offsets = np.zeros(len(counts) + 1, dtype="int64")
+        np.cumsum(counts, out=offsets[1:])
+        return offsets, token_ids
+
+    def analyze_corpus(self, words: List[str], prefixes: Optional[List[str]] = None,
+                       suffixes: Optional[List[str]] = None,
+                       workers: Optional[int] = None, min_shared: int = 2) -> Dict:
+        """
+        Quiet, lexicon-wide version of the word family / prefix / suffix analyses.
+        Returns three tables (dicts of equal-length columns):
+        - 'words': token count and chars/token per word
+        - 'affixes': per-affix word count and consistency (same rule as the
+          single-list analyses: the affix sits in the first/last token)
+        - 'shared_components': tokens that occur in at least min_shared words
+        """
+        prefixes = [p.strip("-") for p in (prefixes or DEFAULT_PREFIXES)]
+        suffixes = [s.strip("-") for s in (suffixes or DEFAULT_SUFFIXES)]
+        offsets, token_ids = self.encode_corpus(words, workers=workers)
+        counts = np.diff(offsets)
+        has_tokens = counts > 0
+        lengths = np.fromiter(map(len, words), dtype="int64", count=len(words))
+
+        word_table = {
+            'word': list(words),
+            'token_count': counts,
+            'chars_per_token': np.divide(lengths, counts, out=np.zeros(len(words)),
+                                         where=has_tokens),
+        }
 
-        for suffix, words in suffix_examples.items():
-            print(f"\n📌 Suffix: '{suffix}'")
+        # Boundary token strings come from the precomputed token table
+        first_ids = np.full(len(words), -1, dtype="int64")
+        last_ids = np.full(len(words), -1, dtype="int64")
+        first_ids[has_tokens] = token_ids[offsets[:-1][has_tokens]]
+        last_ids[has_tokens] = token_ids[offsets[1:][has_tokens] - 1]
+        boundary_ids, boundary_index = np.unique(
+            np.concatenate([first_ids, last_ids]), return_inverse=True)
+        boundary_strings = np.array(
+            [self.token_table.string(t) if t >= 0 else "" for t in boundary_ids.tolist()], dtype=object)
+        first_tokens = boundary_strings[boundary_index[:len(words)]].astype(str)
+        last_tokens = boundary_strings[boundary_index[len(words):]].astype(str)
+        word_array = np.array(words, dtype=str)
+
+        affix_table = {'affix': [], 'kind': [], 'words': [], 'consistent': [], 'consistency': []}
+        for kind, affixes, boundary, matches in (
+                ('prefix', prefixes, first_tokens, np.char.startswith),
+                ('suffix', suffixes, last_tokens, np.char.endswith)):
+            stripped = np.char.strip(boundary)
+            for affix in affixes:
+                selected = matches(word_array, affix)
+                kept = (np.char.find(boundary[selected], affix) >= 0) | (stripped[selected] == affix)
+                total = int(selected.sum())
+                affix_table['affix'].append(affix)
+                affix_table['kind'].append(kind)
+                affix_table['words'].append(total)
+                affix_table['consistent'].append(int(kept.sum()))
+                affix_table['consistency'].append(100.0 * int(kept.sum()) / total if total else 0.0)
+
+        # Shared components: number of distinct words each token occurs in
+        vocab_size = self.encoding.n_vocab
+        word_of_token = np.repeat(np.arange(len(words), dtype="int64"), counts)
+        word_token_pairs = np.unique(word_of_token * vocab_size + token_ids)
+        shared_ids, shared_counts = np.unique(word_token_pairs % vocab_size, return_counts=True)
+        frequent = shared_counts >= min_shared
+        shared_ids, shared_counts = shared_ids[frequent], shared_counts[frequent]
+        shared_strings = self.token_table.strings(shared_ids.tolist())
+        keep = np.array([len(t.strip()) > 1 for t in shared_strings], dtype=bool)
+        order = np.argsort(-shared_counts[keep], kind="stable")
+        shared_table = {
+            'token_id': shared_ids[keep][order],
+            'token': [shared_strings[i] for i in np.flatnonzero(keep)[order]],
+            'word_count': shared_counts[keep][order],
+        }
 
-            suffix_tokens = []
-            consistency_score = 0
+        return {
+            'encoding': self.encoding_name,
+            'words': word_table,
+            'affixes': affix_table,
+            'shared_components': shared_table,
+        }
 
-            for word in words:
-                tokens = self.encoding.encode(word)
-                decoded = [self.encoding.decode([t]) for t in tokens]
+    def vocabulary_words(self, min_length: int = 4) -> List[str]:
+        """Alphabetic token strings of the encoding's own vocabulary (leading space removed)."""
+        candidates = np.flatnonzero(self.token_table.has_flag(ALPHABETIC))
+        words = {}
+        for text in self.token_table.strings(candidates.tolist()):
+            text = text.strip()
+            if len(text) >= min_length:
+                words[text] = None
+        return list(words)
+
+    def discover_affixes(self, words: Optional[List[str]] = None, min_words: int = 20,
+                         min_length: int = 2, max_length: int = 6, min_stem: int = 3,
+                         top_n: int = 30, workers: Optional[int] = None) -> Dict:
+        """
+        Rank productive prefixes and suffixes without naming them up front.
+        words defaults to the tokenizer's vocabulary strings. Each word is
+        encoded once; a prefix trie and a reversed suffix trie then count, for
+        every affix candidate, how many words carry it and how many of those
+        have a token boundary exactly at the affix edge (its consistency).
+        Candidates are ranked by boundary words, i.e. frequency x consistency.
+        """
+        words = words if words is not None else self.vocabulary_words()
+        offsets, token_ids = self.encode_corpus(words, workers=workers)
+        counts = np.diff(offsets)
+        has_tokens = counts > 0
+
+        token_length = self.token_table.char_lengths
+
+        prefix_trie, suffix_trie = AffixTrie(), AffixTrie()
+        for i, word in enumerate(words):
+            if not has_tokens[i] or len(word) - min_stem < min_length:
+                continue
+            max_depth = min(max_length, len(word) - min_stem)
+            prefix_trie.add(word, int(token_length[token_ids[offsets[i]]]), max_depth)
+            suffix_trie.add(word[::-1], int(token_length[token_ids[offsets[i + 1] - 1]]), max_depth)
+
+        report = {'encoding': self.encoding_name, 'vocabulary_size': len(words)}
+        for kind, trie in (('prefixes', prefix_trie), ('suffixes', suffix_trie)):
+            ranked = sorted((c for c in trie.candidates(min_length, min_words) if c[2] > 0),
+                            key=lambda c: (c[2], c[2] / c[1]), reverse=True)[:top_n]
+            report[kind] = {
+                'affix': [a if kind == 'prefixes' else a[::-1] for a, _, _ in ranked],
+                'words': [w for _, w, _ in ranked],
+                'boundary_words': [b for _, _, b in ranked],
+                'consistency': [100.0 * b / w for _, w, b in ranked],
+            }
+        return report
+
+    @staticmethod
+    def save_corpus_tables(report: Dict, path_prefix: str) -> List[str]:
+        """Write each table of an analyze_corpus() / discover_affixes() report to <path_prefix>_<table>.csv."""
+        written = []
+        for table_name, table in report.items():
+            if not isinstance(table, dict):
+                continue
+            path = f"{path_prefix}_{table_name}.csv"
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(table.keys())
+                writer.writerows(zip(*table.values()))
+            written.append(path)
+        return written
+
+
+class MorphologyRenderer:
+    """Formats analyzer results for the terminal; the analyzer itself never prints."""
+
+    def word_family(self, result: WordFamilyResult):
+        print(f"🧬 MORPHOLOGICAL FAMILY ANALYSIS")
+        print(f"📊 Encoding: {result.encoding}")
+        print("=" * 50)
 
-                print(f"   '{word}' → {decoded}")
+        for entry in result.words:
+            print(f"📝 '{entry.word}' → {entry.tokens}")
+            print(
+                f"   🔢 {entry.count} tokens | ⚡ {entry.efficiency:.2f} chars/token")
 
-                # Check if suffix is preserved as a token
-                last_token = decoded[-1] if decoded else ""
-                if suffix in last_token or last_token.strip() == suffix:
-                    consistency_score += 1
+        if result.shared_components:
+            print(f"\n🧩 SHARED MORPHOLOGICAL COMPONENTS:")
+            for component, frequency in sorted(result.shared_components.items(),
+                                               key=lambda x: x[1], reverse=True):
+                print(f"   '{component}' appears in {frequency} words")
 
-                suffix_tokens.append(decoded)
+    def affix_patterns(self, results: List[AffixPatternResult]):
+        kind = results[0].kind if results else "prefix"
+        print(f"\n🔍 {kind.upper()} PATTERN ANALYSIS")
+        print("=" * 40)
 
-            consistency_percentage = (consistency_score / len(words)) * 100
-            suffix_analysis[suffix] = {
-                'words': words,
-                'tokenizations': suffix_tokens,
-                'consistency': consistency_percentage
-            }
+        for result in results:
+            print(f"\n📌 {result.kind.capitalize()}: '{result.affix}'")
+            for entry in result.words:
+                print(f"   '{entry.word}' → {entry.tokens}")
 
-            print(f"   🎯 Suffix consistency: {consistency_percentage:.1f}%")
+            print(f"   🎯 {result.kind.capitalize()} consistency: {result.consistency:.1f}%")
 
             # Educational insights based on consistency
-            if consistency_percentage > 70:
-                print(f"   ✅ Productive morphological pattern recognized!")
-            elif consistency_percentage > 40:
-                print(f"   ⚠️ Partially recognized morphological pattern")
+            if result.kind == "prefix":
+                verdicts = ("✅ Strong morphological recognition!",
+                            "⚠️ Moderate morphological recognition",
+                            "❌ Weak morphological recognition")
             else:
-                print(f"   ❌ Morphological pattern not consistently recognized")
-
-        return suffix_analysis
+                verdicts = ("✅ Productive morphological pattern recognized!",
+                            "⚠️ Partially recognized morphological pattern",
+                            "❌ Morphological pattern not consistently recognized")
+            if result.consistency > 70:
+                print(f"   {verdicts[0]}")
+            elif result.consistency > 40:
+                print(f"   {verdicts[1]}")
+            else:
+                print(f"   {verdicts[2]}")
 
-    def compare_morphological_efficiency(self, word_groups: Dict[str, List[str]]) -> Dict:
-        """
-        Compare tokenization efficiency across different morphological complexity levels.
-        Educational insight: How morphological structure affects compression.
-        """
+    def efficiency_comparison(self, results: List[EfficiencyGroupResult]):
         print(f"\n📊 MORPHOLOGICAL EFFICIENCY COMPARISON")
         print("=" * 50)
 
-        efficiency_results = {}
-
-        for group_name, words in word_groups.items():
-            efficiencies = []
-            token_counts = []
-
-            print(f"\n🏷️ {group_name.upper()}")
-
-            for word in words:
-                tokens = self.encoding.encode(word)
-                efficiency = len(word) / len(tokens)
-                efficiencies.append(efficiency)
-                token_counts.append(len(tokens))
-
-                decoded = [self.encoding.decode([t]) for t in tokens]
-                print(f"   '{word}' → {decoded} | {efficiency:.2f} chars/token")
-
-            avg_efficiency = sum(efficiencies) / len(efficiencies)
-            avg_tokens = sum(token_counts) / len(token_counts)
-
-            efficiency_results[group_name] = {
-                'average_efficiency': avg_efficiency,
-                'average_tokens': avg_tokens,
-                'words': words,
-                'individual_efficiencies': efficiencies
-            }
-
-            print(f"   📈 Average efficiency: {avg_efficiency:.2f} chars/token")
-            print(f"   🔢 Average tokens: {avg_tokens:.1f}")
+        for group in results:
+            print(f"\n🏷️ {group.name.upper()}")
+            for entry in group.words:
+                print(f"   '{entry.word}' → {entry.tokens} | {entry.efficiency:.2f} chars/token")
+            print(f"   📈 Average efficiency: {group.average_efficiency:.2f} chars/token")
+            print(f"   🔢 Average tokens: {group.average_tokens:.1f}")
 
         # Identify most efficient morphological patterns
         print(f"\n🏆 EFFICIENCY RANKINGS:")
-        sorted_groups = sorted(efficiency_results.items(),
-                               key=lambda x: x[1]['average_efficiency'], reverse=True)
-
-        for rank, (group, stats) in enumerate(sorted_groups, 1):
+        for rank, group in enumerate(results, 1):
             print(
-                f"   {rank}. {group}: {stats['average_efficiency']:.2f} chars/token")
-
-        return efficiency_results
+                f"   {rank}. {group.name}: {group.average_efficiency:.2f} chars/token")
 
 
 def demonstrate_morphological_intelligence():
@@ -244,6 +478,7 @@ def demonstrate_morphological_intelligence():
     """
 
     analyzer = MorphologicalAnalyzer()
+    renderer = MorphologyRenderer()
 
     print("🧬 BPE MORPHOLOGICAL INTELLIGENCE LABORATORY")
     print("Educational exploration of linguistic pattern recognition in tokenization")
@@ -253,7 +488,7 @@ def demonstrate_morphological_intelligence():
     print("\n🎯 EXPERIMENT 1: WORD FAMILY MORPHOLOGY")
     gerund_family = ["swimming", "running",
                      "debugging", "preprocessing", "tokenizing"]
-    analyzer.analyze_word_family(gerund_family)
+    renderer.word_family(analyzer.analyze_word_family(gerund_family))
 
     # Demonstrate prefix pattern recognition
     print(f"\n🎯 EXPERIMENT 2: PREFIX PATTERN RECOGNITION")
@@ -263,7 +498,7 @@ def demonstrate_morphological_intelligence():
         "multi-": ["multimodal", "multilingual", "multiply", "multitask"],
         "hyper-": ["hyperparameter", "hyperlink", "hyperbole", "hyperactive"]
     }
-    analyzer.analyze_prefix_patterns(prefix_examples)
+    renderer.affix_patterns(analyzer.analyze_prefix_patterns(prefix_examples))
 
     # Demonstrate suffix pattern recognition
     print(f"\n🎯 EXPERIMENT 3: SUFFIX PATTERN RECOGNITION")
@@ -273,7 +508,7 @@ def demonstrate_morphological_intelligence():
         "-ly": ["efficiently", "automatically", "systematically", "linguistically"],
         "-ness": ["happiness", "darkness", "usefulness", "effectiveness"]
     }
-    analyzer.analyze_suffix_patterns(suffix_examples)
+    renderer.affix_patterns(analyzer.analyze_suffix_patterns(suffix_examples))
 
     # Demonstrate efficiency comparison
     print(f"\n🎯 EXPERIMENT 4: MORPHOLOGICAL COMPLEXITY vs EFFICIENCY")
@@ -284,7 +519,7 @@ def demonstrate_morphological_intelligence():
         "Suffixed words": ["running", "happiness", "systematic", "tokenization"],
         "Complex technical": ["preprocessing", "tokenization", "hyperparameter", "optimization"]
     }
-    analyzer.compare_morphological_efficiency(complexity_groups)
+    renderer.efficiency_comparison(analyzer.compare_morphological_efficiency(complexity_groups))
 
 
 if __name__ == "__main__":
@@ -292,10 +527,13 @@ if __name__ == "__main__":
     print("1. 🧬 Full Demonstration - Complete morphological intelligence exploration")
     print("2. 🎯 Custom Analysis - Analyze your own word patterns")
     print("3. 🔍 Single Family - Focus on one morphological family")
+    print("4. 📚 Corpus Mode - Audit a whole wordlist file (one word per line)")
+    print("5. 🌳 Affix Discovery - Rank productive prefixes/suffixes automatically")
 
-    choice = input("\nSelect option (1, 2, or 3): ").strip()
+    choice = input("\nSelect option (1, 2, 3, 4, or 5): ").strip()
 
     analyzer = MorphologicalAnalyzer()
+    renderer = MorphologyRenderer()
 
     if choice == "1":
         demonstrate_morphological_intelligence()
@@ -307,7 +545,7 @@ if __name__ == "__main__":
         user_input = input("Words to analyze: ").strip()
         if user_input:
             words = [word.strip() for word in user_input.split(",")]
-            analyzer.analyze_word_family(words)
+            renderer.word_family(analyzer.analyze_word_family(words))
 
     elif choice == "3":
         print("\n🔍 SINGLE FAMILY ANALYSIS")
@@ -317,16 +555,38 @@ if __name__ == "__main__":
         if family_input:
             family = [word.strip() for word in family_input.split(",")]
             result = analyzer.analyze_word_family(family)
+            renderer.word_family(result)
 
             # Provide educational summary
             print(f"\n💡 EDUCATIONAL INSIGHTS:")
-            if result['common_tokens']:
+            if result.shared_components:
                 print("   ✅ BPE recognized morphological relationships!")
                 print("   📚 This demonstrates BPE's linguistic intelligence")
             else:
                 print("   🤔 No shared morphological components detected")
                 print("   📚 This might indicate diverse word structures")
 
+    elif choice == "4":
+        print("\n📚 CORPUS MORPHOLOGY AUDIT")
+        wordlist_path = input("Wordlist file: ").strip()
+        if wordlist_path:
+            words = load_wordlist(wordlist_path)
+            report = analyzer.analyze_corpus(words)
+            saved = analyzer.save_corpus_tables(report, "morphology_corpus")
+            print(f"   📦 {len(words):,} words analyzed with {report['encoding']}")
+            print(f"   📁 Tables saved: {', '.join(saved)}")
+
+    elif choice == "5":
+        print("\n🌳 AFFIX DISCOVERY")
+        wordlist_path = input("Wordlist file (blank = tokenizer vocabulary): ").strip()
+        words = load_wordlist(wordlist_path) if wordlist_path else None
+        report = analyzer.discover_affixes(words)
+        for kind in ('prefixes', 'suffixes'):
+            table = report[kind]
+            print(f"\n   {kind.upper()} (affix | words | consistency)")
+            for affix, count, consistency in zip(table['affix'], table['words'], table['consistency']):
+                print(f"   '{affix}' | {count} | {consistency:.1f}%")
+
     else:
         print("🤔 Invalid choice. Running full demonstration...")
         demonstrate_morphological_intelligence()
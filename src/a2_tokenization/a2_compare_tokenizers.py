@@ -9,6 +9,9 @@ Given a text input, show how different models tokenize it:
 
 import tiktoken
 
+import shared_paths  # noqa: F401  (makes ../a3_encoding importable)
+from token_table import get_token_table
+
 MODELS = [
     "gpt-3.5-turbo",
     "gpt-4",
@@ -29,7 +32,7 @@ def compare_tokenizers(text: str):
             continue
 
         tokens = encoding.encode(text)
-        token_strings = [encoding.decode([t]) for t in tokens]
+        token_strings = get_token_table(encoding).strings(tokens)
 
         print(f"\nModel: {model}")
         print(f"Token count: {len(tokens)}")
@@ -0,0 +1,17 @@
+"""
+shared_paths.py
+
+Puts src/a3_encoding on sys.path so the scripts in this folder can import
+its shared modules (token_table) when run directly:
+
+    import shared_paths  # noqa: F401
+    from token_table import get_token_table
+"""
+
+import os
+import sys
+
+ENCODING_DIR = os.path.normpath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "a3_encoding"))
+if ENCODING_DIR not in sys.path:
+    sys.path.insert(0, ENCODING_DIR)
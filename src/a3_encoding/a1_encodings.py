@@ -12,6 +12,7 @@ Description:
 """
 
 import tiktoken as tk
+from token_table import get_token_table
 
 
 def get_tokens(text: str, encoding_name: str) -> list:
@@ -54,7 +55,7 @@ if __name__ == "__main__":
     # Optional: show token-to-ID mapping for cl100k_base
     print("\n--- Token to ID Mapping (cl100k_base) ---")
     encoding = tk.get_encoding("cl100k_base")
-    decoded_tokens = [encoding.decode([t]) for t in sample_tokens]
+    decoded_tokens = get_token_table(encoding).strings(sample_tokens)
     print(f"{'Token':<20} | {'Token ID'}")
     print("-" * 35)
     for token_str, token_id in zip(decoded_tokens, sample_tokens):
@@ -17,6 +17,7 @@ Usage:
 """
 
 import tiktoken
+from token_table import get_token_table
 
 
 def get_encoding_for_model(model_name: str) -> tiktoken.Encoding:
@@ -85,7 +86,7 @@ if __name__ == "__main__":
     print("\n--- Token to ID Mapping ---")
     print(f"{'Token':<20} | {'Token ID'}")
     print("-" * 35)
-    for token_str, token_id in zip([encoding.decode([t]) for t in tokens], tokens):
+    for token_str, token_id in zip(get_token_table(encoding).strings(tokens), tokens):
         print(f"{repr(token_str):<20} | {token_id}")
 
 ##### Examples #####
@@ -18,6 +18,7 @@ Usage:
 """
 
 import tiktoken
+from token_table import get_token_table
 
 
 def get_encoding_for_model(model_name: str) -> tiktoken.Encoding:
@@ -58,7 +59,7 @@ def display_tokenization(encoding: tiktoken.Encoding, model_label: str, text: st
     print("\n--- Token to ID Mapping ---")
     print(f"{'Token':<20} | {'Token ID'}")
     print("-" * 35)
-    for token_str, token_id in zip([encoding.decode([t]) for t in tokens], tokens):
+    for token_str, token_id in zip(get_token_table(encoding).strings(tokens), tokens):
         print(f"{repr(token_str):<20} | {token_id}")
 
 
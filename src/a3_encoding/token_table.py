@@ -0,0 +1,213 @@
+"""
+token_table.py
+
+Precomputed token-string table for a tiktoken encoding:
+- Maps every token ID to its raw bytes, display string, byte length and flags
+  (leading space, alphabetic, numeric, special, partial UTF-8, unused ID)
+- Built once per encoding and cached on disk as .npy files that are
+  memory-mapped on later runs
+- Token mapping displays do O(1) array lookups instead of encoding.decode([t])
+
+Usage:
+    from token_table import get_token_table
+
+    table = get_token_table(encoding)
+    token_strings = table.strings(encoding.encode("Hello world!"))
+
+    python token_table.py --encodings cl100k_base p50k_base r50k_base
+"""
+
+import os
+import argparse
+import time
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+import tiktoken
+
+# ==============================
+#  Configuration
+# ==============================
+CACHE_ENV_VAR = "TOKEN_TABLE_CACHE"
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "token_tables")
+TABLE_FIELDS = ("byte_offsets", "token_bytes", "char_offsets", "token_text", "flags")
+
+# Flag bits stored per token ID
+LEADING_SPACE = 1
+ALPHABETIC = 2
+NUMERIC = 4
+SPECIAL = 8
+PARTIAL_UTF8 = 16  # bytes are not valid UTF-8 on their own (display uses U+FFFD)
+UNUSED = 32        # no token has this ID
+
+_tables: Dict[str, "TokenTable"] = {}
+
+
+# ==============================
+#  Token Table
+# ==============================
+class TokenTable:
+    """Columnar per-token arrays; token i spans offsets[i]:offsets[i + 1]."""
+
+    def __init__(self, name: str, arrays: Dict[str, np.ndarray]):
+        self.name = name
+        self.byte_offsets = arrays["byte_offsets"]
+        self.token_bytes = arrays["token_bytes"]
+        self.char_offsets = arrays["char_offsets"]
+        self.token_text = arrays["token_text"]
+        self.flags = arrays["flags"]
+        self.byte_lengths = np.diff(self.byte_offsets)
+        self.char_lengths = np.diff(self.char_offsets)
+        self._strings: Optional[List[str]] = None
+
+    def __len__(self) -> int:
+        return len(self.flags)
+
+    @classmethod
+    def build(cls, encoding: tiktoken.Encoding) -> "TokenTable":
+        special_ids = {encoding.encode_single_token(token) for token in encoding.special_tokens_set}
+        raw_tokens: List[bytes] = []
+        texts: List[str] = []
+        flags = np.zeros(encoding.n_vocab, dtype="uint8")
+
+        for token_id in range(encoding.n_vocab):
+            try:
+                raw = encoding.decode_single_token_bytes(token_id)
+            except KeyError:
+                raw, flags[token_id] = b"", UNUSED
+            try:
+                text = raw.decode("utf-8")
+            except UnicodeDecodeError:
+                text = raw.decode("utf-8", errors="replace")
+                flags[token_id] |= PARTIAL_UTF8
+            stripped = text.strip()
+            if raw.startswith(b" "):
+                flags[token_id] |= LEADING_SPACE
+            if stripped.isalpha():
+                flags[token_id] |= ALPHABETIC
+            if stripped.isnumeric():
+                flags[token_id] |= NUMERIC
+            if token_id in special_ids:
+                flags[token_id] |= SPECIAL
+            raw_tokens.append(raw)
+            texts.append(text)
+
+        arrays = {
+            "byte_offsets": _offsets(len(raw) for raw in raw_tokens),
+            "token_bytes": np.frombuffer(b"".join(raw_tokens), dtype="uint8"),
+            "char_offsets": _offsets(len(text) for text in texts),
+            "token_text": np.frombuffer("".join(texts).encode("utf-8"), dtype="uint8"),
+            "flags": flags,
+        }
+        table = cls(encoding.name, arrays)
+        table._strings = texts
+        return table
+
+    @classmethod
+    def load(cls, directory: str, name: str) -> "TokenTable":
+        arrays = {field: np.load(os.path.join(directory, f"{field}.npy"), mmap_mode="r")
+                  for field in TABLE_FIELDS}
+        return cls(name, arrays)
+
+    def save(self, directory: str):
+        # Write into a temporary directory first so readers never see half a table
+        temp_dir = f"{directory}.tmp-{os.getpid()}"
+        os.makedirs(temp_dir, exist_ok=True)
+        for field in TABLE_FIELDS:
+            np.save(os.path.join(temp_dir, f"{field}.npy"), np.asarray(getattr(self, field)))
+        try:
+            os.replace(temp_dir, directory)
+        except OSError:
+            # Another process saved the same table first; keep theirs
+            for field in TABLE_FIELDS:
+                os.remove(os.path.join(temp_dir, f"{field}.npy"))
+            os.rmdir(temp_dir)
+
+    def string(self, token_id: int) -> str:
+        if self._strings is not None:
+            return self._strings[token_id]
+        # Same decode build() used for the display text; only this token's bytes are read
+        return self.bytes_of(token_id).decode("utf-8", errors="replace")
+
+    def strings(self, token_ids: Iterable[int]) -> List[str]:
+        """Display strings for token IDs (same text as encoding.decode([t]))."""
+        if self._strings is not None:
+            return [self._strings[t] for t in token_ids]
+        return [self.string(t) for t in token_ids]
+
+    def bytes_of(self, token_id: int) -> bytes:
+        return self.token_bytes[self.byte_offsets[token_id]:self.byte_offsets[token_id + 1]].tobytes()
+
+    def all_strings(self) -> List[str]:
+        """Every token string, materialized once from the text blob (whole-vocabulary scans only)."""
+        if self._strings is None:
+            text = self.token_text.tobytes().decode("utf-8")
+            offsets = self.char_offsets.tolist()
+            self._strings = [text[offsets[i]:offsets[i + 1]] for i in range(len(self))]
+        return self._strings
+
+    def has_flag(self, flag: int) -> np.ndarray:
+        """Boolean mask over all token IDs, e.g. table.has_flag(ALPHABETIC)."""
+        return (self.flags & flag) != 0
+
+
+def _offsets(lengths: Iterable[int]) -> np.ndarray:
+    lengths = np.fromiter(lengths, dtype="int64")
+    offsets = np.zeros(len(lengths) + 1, dtype="int64")
+    np.cumsum(lengths, out=offsets[1:])
+    return offsets
+
+
+# ==============================
+#  Cached Access
+# ==============================
+def table_directory(encoding: tiktoken.Encoding, cache_dir: Optional[str] = None) -> str:
+    cache_dir = cache_dir or os.getenv(CACHE_ENV_VAR, DEFAULT_CACHE_DIR)
+    return os.path.join(cache_dir, f"{encoding.name}-{encoding.n_vocab}")
+
+
+def get_token_table(encoding: tiktoken.Encoding, cache_dir: Optional[str] = None) -> TokenTable:
+    """Return the table for encoding: in-process cache, then disk, else build and save."""
+    directory = table_directory(encoding, cache_dir)
+    table = _tables.get(directory)
+    if table is not None:
+        return table
+
+    if all(os.path.exists(os.path.join(directory, f"{field}.npy")) for field in TABLE_FIELDS):
+        table = TokenTable.load(directory, encoding.name)
+    else:
+        table = TokenTable.build(encoding)
+        try:
+            os.makedirs(os.path.dirname(directory), exist_ok=True)
+            table.save(directory)
+        except OSError as e:
+            print(f"[Warning] Could not cache token table for {encoding.name}: {e}")
+    _tables[directory] = table
+    return table
+
+
+# ==============================
+#  Main Script
+# ==============================
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build and cache token-string tables for tiktoken encodings.")
+    parser.add_argument("--encodings", nargs="+",
+                        default=["cl100k_base", "p50k_base", "r50k_base"],
+                        help="Encodings to build tables for.")
+    parser.add_argument("--cache_dir", type=str,
+                        help=f"Cache directory (default: ${CACHE_ENV_VAR} or {DEFAULT_CACHE_DIR}).")
+    args = parser.parse_args()
+
+    for name in args.encodings:
+        encoding = tiktoken.get_encoding(name)
+        start = time.perf_counter()
+        table = get_token_table(encoding, args.cache_dir)
+        elapsed = time.perf_counter() - start
+        print(f"[Info] {name}: {len(table):,} tokens | "
+              f"{int(table.has_flag(ALPHABETIC).sum()):,} alphabetic | "
+              f"{int(table.has_flag(LEADING_SPACE).sum()):,} with leading space | "
+              f"{elapsed * 1000:.1f} ms -> {table_directory(encoding, args.cache_dir)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,19 +5,11 @@ This script securely connects to the OpenAI API, generates embeddings for a give
 and prints the embedding length and first few values for inspection.  
 """
 
-import os
-from openai import OpenAI
 from typing import List
+from embedding_backends import get_backend
 
-# Load API key from environment variable for security
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    raise ValueError(
-        "Missing OpenAI API key. Please set the environment variable 'OPENAI_API_KEY'."
-    )
-
-# Initialize OpenAI client
-client = OpenAI(api_key=OPENAI_API_KEY)
+# The backend (OpenAI by default, EMBEDDING_BACKEND=hashing for offline runs)
+# reads OPENAI_API_KEY from the environment when it makes its first request.
 
 
 def get_embedding(
@@ -40,11 +32,7 @@ def get_embedding(
         >>> print(len(embedding))  
         1536  
     """
-    response = client.embeddings.create(
-        model=model,
-        input=text
-    )
-    return response.data[0].embedding
+    return get_backend(model=model).embed(text).tolist()
 
 
 if __name__ == "__main__":
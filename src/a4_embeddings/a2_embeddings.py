@@ -5,25 +5,12 @@ Embedding Utility Script:
 - Loads OpenAI API key securely from environment  
 - Determines correct tokenizer for a given model  
 - Counts tokens before embedding  
-- Generates embeddings using OpenAI API  
+- Generates embeddings using OpenAI API (or an offline backend via EMBEDDING_BACKEND)  
 """
 
-import os
 from typing import List
 import tiktoken
-from openai import OpenAI
-
-# ==============================
-#  API Key Setup
-# ==============================
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    raise ValueError(
-        "Missing OpenAI API key. Please set the environment variable 'OPENAI_API_KEY'."
-    )
-
-# Initialize OpenAI client
-client = OpenAI(api_key=OPENAI_API_KEY)
+from embedding_backends import get_backend
 
 
 # ==============================
@@ -66,11 +53,7 @@ def get_embedding(
     token_count = count_tokens(text, model)
     print(f"[Info] Token count for input: {token_count}")
 
-    response = client.embeddings.create(
-        model=model,
-        input=text
-    )
-    return response.data[0].embedding
+    return get_backend(model=model).embed(text).tolist()
 
 
 # ==============================
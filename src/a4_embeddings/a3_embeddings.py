@@ -7,26 +7,16 @@ Enhanced Embedding Utility:
 - Count tokens before embedding  
 - Accepts text from command line or file  
 - Saves embeddings to CSV  
+- Embeds exact and near-duplicate lines once and reuses the embedding  
 """
 
 import os
 import csv
 import argparse
-from typing import List
+from typing import List, Optional
 import tiktoken
-from openai import OpenAI
-
-# ==============================
-#  API Key Setup
-# ==============================
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    raise ValueError(
-        "Missing OpenAI API key. Please set the environment variable 'OPENAI_API_KEY'."
-    )
-
-# Initialize OpenAI client
-client = OpenAI(api_key=OPENAI_API_KEY)
+from embedding_backends import BACKENDS, default_backend_name, get_backend
+from dedup import NEAR_DUPLICATE_THRESHOLD, Deduplicator
 
 
 # ==============================
@@ -53,12 +43,12 @@ def count_tokens(text: str, model_name: str) -> int:
 # ==============================
 #  Embedding Helper
 # ==============================
-def get_embedding(text: str, model: str = "text-embedding-3-small") -> List[float]:
+def get_embedding(text: str, model: str = "text-embedding-3-small",
+                  backend: Optional[str] = None) -> List[float]:
     """Generate an embedding vector for the given text."""
     token_count = count_tokens(text, model)
     print(f"[Info] Token count for input: {token_count}")
-    response = client.embeddings.create(model=model, input=text)
-    return response.data[0].embedding
+    return get_backend(backend, model).embed(text).tolist()
 
 
 # ==============================
@@ -72,8 +62,15 @@ def main():
                         help="Path to a file with one text per line.")
     parser.add_argument("--model", type=str, default="text-embedding-3-small",
                         help="Embedding model to use.")
+    parser.add_argument("--backend", type=str, choices=sorted(BACKENDS),
+                        default=default_backend_name(),
+                        help="Embedding backend (default: $EMBEDDING_BACKEND or openai).")
     parser.add_argument("--output", type=str, default="embeddings.csv",
                         help="Output CSV file to save embeddings.")
+    parser.add_argument("--no_dedup", action="store_true",
+                        help="Embed every line, even exact or near duplicates.")
+    parser.add_argument("--dedup_threshold", type=float, default=NEAR_DUPLICATE_THRESHOLD,
+                        help="Estimated Jaccard similarity at which lines count as near duplicates.")
     args = parser.parse_args()
 
     # Collect inputs
@@ -94,11 +91,25 @@ def main():
         ]
         print("[Info] No input provided. Using default sample texts.")
 
+    # Duplicates share the embedding of the first equivalent line
+    canonical = list(range(len(texts)))
+    if not args.no_dedup:
+        dedup = Deduplicator(get_encoding_for_model(args.model), threshold=args.dedup_threshold)
+        canonical = dedup.deduplicate(texts)
+        print(f"[Info] Dedup: {dedup.report()}")
+
     # Generate embeddings
     results = []
-    for text in texts:
+    for i, text in enumerate(texts):
+        if canonical[i] != i:
+            print(f"\n[Duplicate] {text} -> reusing embedding of: {texts[canonical[i]]}")
+            results.append({
+                "text": text,
+                "embedding": results[canonical[i]]["embedding"]
+            })
+            continue
         print(f"\n[Processing] {text}")
-        embedding_vector = get_embedding(text, model=args.model)
+        embedding_vector = get_embedding(text, model=args.model, backend=args.backend)
         results.append({
             "text": text,
             "embedding": embedding_vector
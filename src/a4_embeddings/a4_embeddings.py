@@ -7,26 +7,26 @@ Embedding + FAISS Search Utility:
 - Accepts text from arguments or file  
 - Stores embeddings in FAISS vector database  
 - Allows semantic search queries  
+- Indexes each exact or near-duplicate text once  
 """
 
-import os
+from __future__ import annotations
+
 import argparse
-from typing import List
+from typing import TYPE_CHECKING, List, Optional
 import tiktoken
-import faiss
 import numpy as np
-from openai import OpenAI
+from embedding_backends import BACKENDS, default_backend_name, get_backend
+from query_cache import QueryEmbeddingCache
+from dedup import NEAR_DUPLICATE_THRESHOLD, Deduplicator, split_duplicates
+
+if TYPE_CHECKING:
+    import faiss
 
 # ==============================
-#  API Key Setup
+#  Configuration
 # ==============================
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    raise ValueError(
-        "Missing OpenAI API key. Please set the environment variable 'OPENAI_API_KEY'."
-    )
-
-client = OpenAI(api_key=OPENAI_API_KEY)
+QUERY_CACHE_FILE = "query_cache.pkl"
 
 
 # ==============================
@@ -52,29 +52,31 @@ def count_tokens(text: str, model_name: str) -> int:
 # ==============================
 #  Embedding Helper
 # ==============================
-def get_embedding(text: str, model: str = "text-embedding-3-small") -> List[float]:
+def get_embedding(text: str, model: str = "text-embedding-3-small",
+                  backend: Optional[str] = None) -> np.ndarray:
     """Generate an embedding vector for the given text."""
     token_count = count_tokens(text, model)
     print(f"[Info] Token count: {token_count}")
-    response = client.embeddings.create(model=model, input=text)
-    return response.data[0].embedding
+    return get_backend(backend, model).embed(text)
 
 
 # ==============================
 #  FAISS Helper Functions
 # ==============================
-def create_faiss_index(embeddings: List[List[float]]) -> faiss.IndexFlatL2:
+def create_faiss_index(embeddings: List[np.ndarray]) -> faiss.IndexFlatL2:
     """Create a FAISS index from embeddings."""
+    import faiss  # deferred: only paid when an index is actually built
+
     dim = len(embeddings[0])
     index = faiss.IndexFlatL2(dim)  # L2 distance
-    vectors = np.array(embeddings).astype("float32")
+    vectors = np.asarray(embeddings, dtype="float32")
     index.add(vectors)
     return index
 
 
-def search_faiss(index: faiss.IndexFlatL2, query_embedding: List[float], k: int = 3):
+def search_faiss(index: faiss.IndexFlatL2, query_embedding: np.ndarray, k: int = 3):
     """Search FAISS index for the k most similar embeddings."""
-    query_vector = np.array([query_embedding]).astype("float32")
+    query_vector = np.asarray(query_embedding, dtype="float32").reshape(1, -1)
     distances, indices = index.search(query_vector, k)
     return distances[0], indices[0]
 
@@ -90,10 +92,22 @@ def main():
                         help="Path to file with one text per line.")
     parser.add_argument("--model", type=str, default="text-embedding-3-small",
                         help="Embedding model to use.")
+    parser.add_argument("--backend", type=str, choices=sorted(BACKENDS),
+                        default=default_backend_name(),
+                        help="Embedding backend (default: $EMBEDDING_BACKEND or openai).")
     parser.add_argument("--query", type=str,
                         help="Search query for semantic search.")
+    parser.add_argument("--cache_file", type=str, nargs="?", const=QUERY_CACHE_FILE,
+                        help=f"Persist query embeddings so repeat queries skip the API "
+                             f"(bare flag: {QUERY_CACHE_FILE}; off by default).")
+    parser.add_argument("--no_cache", action="store_true",
+                        help="Ignore --cache_file: neither read nor write cached query embeddings.")
     parser.add_argument("--top_k", type=int, default=3,
                         help="Number of search results to return.")
+    parser.add_argument("--no_dedup", action="store_true",
+                        help="Index every text, even exact or near duplicates.")
+    parser.add_argument("--dedup_threshold", type=float, default=NEAR_DUPLICATE_THRESHOLD,
+                        help="Estimated Jaccard similarity at which texts count as near duplicates.")
     args = parser.parse_args()
 
     # Collect input texts
@@ -112,8 +126,19 @@ def main():
         ]
         print("[Info] No input provided. Using default sample texts.")
 
+    # Only one text per duplicate group is embedded; the rest are listed with it
+    duplicates = {}
+    if not args.no_dedup:
+        dedup = Deduplicator(get_encoding_for_model(args.model), threshold=args.dedup_threshold)
+        unique, duplicate_positions = split_duplicates(dedup.deduplicate(texts))
+        print(f"[Info] Dedup: {dedup.report()}")
+        duplicates = {row: [texts[i] for i in duplicate_positions.get(position, [])]
+                      for row, position in enumerate(unique)}
+        texts = [texts[position] for position in unique]
+
     # Generate embeddings for dataset
-    embeddings = [get_embedding(t, model=args.model) for t in texts]
+    embeddings = [get_embedding(t, model=args.model, backend=args.backend)
+                  for t in texts]
 
     # Create FAISS index
     index = create_faiss_index(embeddings)
@@ -122,11 +147,18 @@ def main():
     # If query is provided, perform search
     if args.query:
         print(f"\n[Query] {args.query}")
-        query_embedding = get_embedding(args.query, model=args.model)
+        query_cache = QueryEmbeddingCache(
+            path=None if args.no_cache else args.cache_file, namespace=args.backend)
+        query_embedding = query_cache.get_or_embed(
+            args.query, args.model,
+            lambda text, model: get_embedding(text, model=model, backend=args.backend))
+        query_cache.save()
         distances, indices = search_faiss(index, query_embedding, k=args.top_k)
         print("\n[Results]")
         for rank, idx in enumerate(indices):
             print(f"{rank+1}. {texts[idx]} (distance: {distances[rank]:.4f})")
+            if duplicates.get(idx):
+                print(f"    + {len(duplicates[idx])} duplicate(s): {duplicates[idx]}")
 
 
 if __name__ == "__main__":
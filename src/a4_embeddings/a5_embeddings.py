@@ -6,31 +6,39 @@ Persistent FAISS Embedding Search Tool:
 - Token counting per model  
 - Stores FAISS index & metadata to disk  
 - Can add new text data without losing previous embeddings  
+- Skips texts that exactly or nearly duplicate one already in the index  
+- --compression fp16/int8/pq shrinks the stored index; results are re-ranked exactly  
 - Allows semantic search queries  
 """
 
+from __future__ import annotations
+
 import os
 import argparse
 import pickle
-from typing import List
+from typing import TYPE_CHECKING, Iterator, List, Optional
 import numpy as np
 import tiktoken
-import faiss
-from openai import OpenAI
+from embedding_backends import BACKENDS, default_backend_name, get_backend
+from query_cache import QueryEmbeddingCache
+from dedup import NEAR_DUPLICATE_THRESHOLD, Deduplicator
+from index_builder import CHUNK_ROWS, IndexBuilder
+from vector_quantization import (COMPRESSION_MODES, RERANK_FACTOR, convert_index, search_index,
+                                 sync_vectors)
+
+if TYPE_CHECKING:
+    import faiss
 
 # ==============================
 #  Configuration
 # ==============================
 INDEX_FILE = "faiss_index.bin"
 META_FILE = "faiss_texts.pkl"
-
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    raise ValueError(
-        "Missing OpenAI API key. Please set the environment variable 'OPENAI_API_KEY'."
-    )
-
-client = OpenAI(api_key=OPENAI_API_KEY)
+VECTORS_FILE = "faiss_vectors.f32"  # float32 originals of a compressed index
+QUERY_CACHE_FILE = "query_cache.pkl"
+DEDUP_FILE = "dedup_texts.pkl"
+EMBED_BATCH_SIZE = 256
+MAX_REQUEST_TOKENS = 300_000  # OpenAI limit on total input tokens per embeddings request
 
 # ==============================
 #  Tokenizer Helper
@@ -56,18 +64,47 @@ def count_tokens(text: str, model_name: str) -> int:
 # ==============================
 
 
-def get_embedding(text: str, model: str = "text-embedding-3-small") -> List[float]:
+def get_embedding(text: str, model: str = "text-embedding-3-small",
+                  backend: Optional[str] = None) -> np.ndarray:
     token_count = count_tokens(text, model)
     print(f"[Info] Token count: {token_count}")
-    response = client.embeddings.create(model=model, input=text)
-    return response.data[0].embedding
+    return get_backend(backend, model).embed(text)
+
+
+def get_embeddings(texts: List[str], model: str = "text-embedding-3-small",
+                   backend: Optional[str] = None) -> np.ndarray:
+    """Embed several texts with a single backend request (rows keep input order)."""
+    return get_backend(backend, model).embed_batch(texts)
+
+
+def iter_embedding_batches(texts: List[str], model: str = "text-embedding-3-small",
+                           backend: Optional[str] = None,
+                           batch_size: int = EMBED_BATCH_SIZE) -> Iterator[np.ndarray]:
+    """
+    Yield float32 embedding matrices for consecutive batches of texts, keeping
+    each request under the API's per-request input and token limits.
+    """
+    encoding = get_encoding_for_model(model)
+    batch: List[str] = []
+    batch_tokens = 0
+    for text in texts:
+        tokens = len(encoding.encode(text))
+        if batch and (len(batch) >= batch_size or batch_tokens + tokens > MAX_REQUEST_TOKENS):
+            yield get_embeddings(batch, model, backend)
+            batch, batch_tokens = [], 0
+        batch.append(text)
+        batch_tokens += tokens
+    if batch:
+        yield get_embeddings(batch, model, backend)
 
 # ==============================
 #  FAISS Persistence Helpers
 # ==============================
 
 
-def save_faiss_index(index: faiss.IndexFlatL2, texts: List[str]):
+def save_faiss_index(index: faiss.Index, texts: List[str]):
+    import faiss
+
     faiss.write_index(index, INDEX_FILE)
     with open(META_FILE, "wb") as f:
         pickle.dump(texts, f)
@@ -77,20 +114,38 @@ def save_faiss_index(index: faiss.IndexFlatL2, texts: List[str]):
 def load_faiss_index():
     if not os.path.exists(INDEX_FILE) or not os.path.exists(META_FILE):
         return None, []
+    import faiss  # deferred: only paid when there is an index to load
+
     index = faiss.read_index(INDEX_FILE)
+    sync_vectors(index, VECTORS_FILE)
     with open(META_FILE, "rb") as f:
         texts = pickle.load(f)
     print(f"[Loaded] Index with {len(texts)} entries.")
     return index, texts
 
+
+def load_deduplicator(texts: List[str], model: str,
+                      threshold: float = NEAR_DUPLICATE_THRESHOLD) -> Deduplicator:
+    """Saved dedup state (keyed by text position) plus any texts stored since it was saved."""
+    encoding = get_encoding_for_model(model)
+    dedup = Deduplicator.load(DEDUP_FILE, encoding, threshold=threshold)
+    if dedup is None or len(dedup.keys) > len(texts):
+        dedup = Deduplicator(encoding, threshold=threshold)
+    for position in range(len(dedup.keys), len(texts)):
+        dedup.add(texts[position], position)
+        dedup.keys.append(position)
+    dedup.reset_stats()
+    return dedup
+
 # ==============================
 #  Search Helper
 # ==============================
 
 
-def search_faiss(index: faiss.IndexFlatL2, query_embedding: List[float], k: int = 3):
-    query_vector = np.array([query_embedding]).astype("float32")
-    distances, indices = index.search(query_vector, k)
+def search_faiss(index: faiss.Index, query_embedding: np.ndarray, k: int = 3,
+                 rerank_factor: int = RERANK_FACTOR):
+    query_vector = np.asarray(query_embedding, dtype="float32").reshape(1, -1)
+    distances, indices = search_index(index, query_vector, k, VECTORS_FILE, rerank_factor)
     return distances[0], indices[0]
 
 # ==============================
@@ -108,13 +163,33 @@ def main():
                         help="Search query for semantic search.")
     parser.add_argument("--model", type=str, default="text-embedding-3-small",
                         help="Embedding model to use.")
+    parser.add_argument("--backend", type=str, choices=sorted(BACKENDS),
+                        default=default_backend_name(),
+                        help="Embedding backend (default: $EMBEDDING_BACKEND or openai).")
+    parser.add_argument("--cache_file", type=str, nargs="?", const=QUERY_CACHE_FILE,
+                        help=f"Persist query embeddings so repeat queries skip the API "
+                             f"(bare flag: {QUERY_CACHE_FILE}; off by default).")
+    parser.add_argument("--no_cache", action="store_true",
+                        help="Ignore --cache_file: neither read nor write cached query embeddings.")
     parser.add_argument("--top_k", type=int, default=3,
                         help="Number of search results.")
+    parser.add_argument("--compression", type=str, choices=COMPRESSION_MODES,
+                        help="Convert the stored index: none (float32), fp16, int8 or pq.")
+    parser.add_argument("--rerank_factor", type=int, default=RERANK_FACTOR,
+                        help="Candidates per result re-ranked exactly on compressed indexes.")
+    parser.add_argument("--threads", type=int,
+                        help="FAISS threads for index add/train (default: all cores).")
+    parser.add_argument("--no_dedup", action="store_true",
+                        help="Add every text, even exact or near duplicates.")
+    parser.add_argument("--dedup_threshold", type=float, default=NEAR_DUPLICATE_THRESHOLD,
+                        help="Estimated Jaccard similarity at which texts count as near duplicates.")
     args = parser.parse_args()
 
     # Load existing index or start new
     index, texts = load_faiss_index()
     if index is None:
+        import faiss
+
         index = faiss.IndexFlatL2(1536)
         print("[Info] Created new FAISS index.")
 
@@ -126,14 +201,38 @@ def main():
         with open(args.file, "r", encoding="utf-8") as f:
             new_texts = [line.strip() for line in f if line.strip()]
 
+    dedup = None
+    if new_texts and not args.no_dedup:
+        # Stored texts come from the saved state; only new ones are hashed here
+        dedup = load_deduplicator(texts, args.model, args.dedup_threshold)
+        kept = []
+        for text in new_texts:
+            # Key = the position the text will be stored at
+            canonical = dedup.add(text, len(texts) + len(kept))
+            if canonical is None:
+                dedup.keys.append(len(texts) + len(kept))
+                kept.append(text)
+            elif canonical < len(texts):
+                print(f"[Duplicate] {text} -> already indexed as: {texts[canonical]}")
+        print(f"[Info] Dedup: {dedup.report()}")
+        new_texts = kept
+
     if new_texts:
         print(f"[Adding] {len(new_texts)} new texts to index...")
-        new_embeddings = [get_embedding(t, model=args.model)
-                          for t in new_texts]
-        new_vectors = np.array(new_embeddings).astype("float32")
-        index.add(new_vectors)
+        builder = IndexBuilder(index, chunk_rows=min(CHUNK_ROWS, len(new_texts)),
+                               threads=args.threads, vectors_path=VECTORS_FILE)
+        builder.add_batches(iter_embedding_batches(new_texts, args.model, args.backend))
         texts.extend(new_texts)
         save_faiss_index(index, texts)
+    if dedup is not None:
+        dedup.save(DEDUP_FILE)
+        print(f"[Saved] Dedup state -> {DEDUP_FILE}")
+
+    if args.compression:
+        converted = convert_index(index, args.compression, VECTORS_FILE)
+        if converted is not index:
+            index = converted
+            save_faiss_index(index, texts)
 
     # Search
     if args.query:
@@ -141,8 +240,14 @@ def main():
             print("[Error] No data in index to search.")
             return
         print(f"[Query] {args.query}")
-        query_embedding = get_embedding(args.query, model=args.model)
-        distances, indices = search_faiss(index, query_embedding, k=args.top_k)
+        query_cache = QueryEmbeddingCache(
+            path=None if args.no_cache else args.cache_file, namespace=args.backend)
+        query_embedding = query_cache.get_or_embed(
+            args.query, args.model,
+            lambda text, model: get_embedding(text, model=model, backend=args.backend))
+        query_cache.save()
+        distances, indices = search_faiss(index, query_embedding, k=args.top_k,
+                                          rerank_factor=args.rerank_factor)
         print("\n[Results]")
         for rank, idx in enumerate(indices):
             print(f"{rank+1}. {texts[idx]} (distance: {distances[rank]:.4f})")
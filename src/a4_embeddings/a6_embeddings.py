@@ -6,32 +6,53 @@ Persistent FAISS Semantic Search with Metadata Filtering
 - Stores FAISS index + metadata to disk  
 - Supports adding new entries without losing old ones  
 - Allows filtering search results by category or doc_id  
+- Long content is split into token-bounded chunks; each chunk keeps its parent_doc_id  
+- Exact/near-duplicate content is embedded once; duplicates are listed on the kept entry  
+- Optional BM25 keyword index next to the FAISS index; --search_mode vector (the  
+  default), lexical (no embedding call) or hybrid (reciprocal-rank fusion of both)  
+- --compression fp16/int8/pq shrinks the stored index; results are re-ranked exactly  
+- --profile prints a per-stage timing breakdown (imports, load, embed, search, filter)  
 """
 
+from __future__ import annotations
+
+import time
+from tracing import tracer
+
+_IMPORT_START = time.perf_counter()
 import os
 import argparse
 import pickle
 import json
 import uuid
-from typing import List, Dict
+from typing import TYPE_CHECKING, Iterator, List, Dict, Optional
 import numpy as np
 import tiktoken
-import faiss
-from openai import OpenAI
+from embedding_backends import BACKENDS, default_backend_name, get_backend
+from query_cache import QueryEmbeddingCache
+from dedup import NEAR_DUPLICATE_THRESHOLD, Deduplicator
+from lexical_index import BM25Index, reciprocal_rank_fusion
+from index_builder import CHUNK_ROWS, IndexBuilder
+from vector_quantization import (COMPRESSION_MODES, RERANK_FACTOR, convert_index, search_index,
+                                 sync_vectors)
+from text_chunking import EMBEDDING_TOKEN_LIMIT, chunk_text, iter_file_blocks
+tracer.record("imports", _IMPORT_START, time.perf_counter())
+
+if TYPE_CHECKING:
+    import faiss
 
 # ==============================
 #  Configuration
 # ==============================
 INDEX_FILE = "faiss_index.bin"
 META_FILE = "faiss_metadata.json"
-
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    raise ValueError(
-        "Missing OpenAI API key. Please set the environment variable 'OPENAI_API_KEY'."
-    )
-
-client = OpenAI(api_key=OPENAI_API_KEY)
+VECTORS_FILE = "faiss_vectors.f32"  # float32 originals of a compressed index
+QUERY_CACHE_FILE = "query_cache.pkl"
+LEXICAL_INDEX_FILE = "bm25_index.pkl"
+DEDUP_FILE = "dedup_index.pkl"
+SEARCH_MODES = ("hybrid", "vector", "lexical")
+EMBED_BATCH_SIZE = 256
+MAX_REQUEST_TOKENS = 300_000  # OpenAI limit on total input tokens per embeddings request
 
 # ==============================
 #  Tokenizer Helper
@@ -57,18 +78,129 @@ def count_tokens(text: str, model_name: str) -> int:
 # ==============================
 
 
-def get_embedding(text: str, model: str = "text-embedding-3-small") -> List[float]:
-    token_count = count_tokens(text, model)
+def get_embedding(text: str, model: str = "text-embedding-3-small",
+                  backend: Optional[str] = None) -> np.ndarray:
+    with tracer.span("tokenize"):
+        token_count = count_tokens(text, model)
     print(f"[Info] Token count: {token_count}")
-    response = client.embeddings.create(model=model, input=text)
-    return response.data[0].embedding
+    with tracer.span("embedding_request"):
+        return get_backend(backend, model).embed(text)
+
+
+def get_embeddings(texts: List[str], model: str = "text-embedding-3-small",
+                   backend: Optional[str] = None) -> np.ndarray:
+    """Embed several texts with a single backend request (rows keep input order)."""
+    return get_backend(backend, model).embed_batch(texts)
+
+
+def iter_embedding_batches(texts: List[str], model: str = "text-embedding-3-small",
+                           backend: Optional[str] = None,
+                           batch_size: int = EMBED_BATCH_SIZE) -> Iterator[np.ndarray]:
+    """
+    Yield float32 embedding matrices for consecutive batches of texts, keeping
+    each request under the API's per-request input and token limits.
+    """
+    encoding = get_encoding_for_model(model)
+    batch: List[str] = []
+    batch_tokens = 0
+    for text in texts:
+        with tracer.span("tokenize"):
+            tokens = len(encoding.encode(text))
+        if batch and (len(batch) >= batch_size or batch_tokens + tokens > MAX_REQUEST_TOKENS):
+            with tracer.span("embedding_request", texts=len(batch)):
+                yield get_embeddings(batch, model, backend)
+            batch, batch_tokens = [], 0
+        batch.append(text)
+        batch_tokens += tokens
+    if batch:
+        with tracer.span("embedding_request", texts=len(batch)):
+            yield get_embeddings(batch, model, backend)
+
+
+def chunk_entries(entries: List[Dict], model: str, max_tokens: int = EMBEDDING_TOKEN_LIMIT,
+                  overlap: int = 0) -> List[Dict]:
+    """
+    Split entries whose content exceeds max_tokens into chunk entries.
+
+    Each chunk gets its own doc_id plus parent_doc_id and chunk_index, so
+    results can be mapped back to the original document. Entries that fit
+    are returned unchanged.
+    """
+    encoding = get_encoding_for_model(model)
+    chunked = []
+    for entry in entries:
+        if "parent_doc_id" in entry:  # already a chunk
+            chunked.append(entry)
+            continue
+        chunks = chunk_text(entry["content"], encoding, max_tokens, overlap)
+        first = next(chunks, None)
+        second = next(chunks, None)
+        if second is None:
+            chunked.append(entry)
+            continue
+        for chunk in (first, second, *chunks):
+            chunked.append({
+                **entry,
+                "doc_id": str(uuid.uuid4()),
+                "parent_doc_id": entry["doc_id"],
+                "chunk_index": chunk["chunk_index"],
+                "content": chunk["text"],
+            })
+        print(f"[Info] '{entry['title']}' split into {chunked[-1]['chunk_index'] + 1} chunks.")
+    return chunked
+
+
+def load_deduplicator(metadata: List[Dict], model: str,
+                      threshold: float = NEAR_DUPLICATE_THRESHOLD) -> Deduplicator:
+    """
+    Load the saved dedup state and bring it in line with metadata, like
+    load_lexical_index(): only entries stored since the last save are hashed;
+    if the stored doc_ids no longer match (e.g. after a delete), it is rebuilt.
+    """
+    encoding = get_encoding_for_model(model)
+    dedup = Deduplicator.load(DEDUP_FILE, encoding, threshold=threshold)
+    doc_ids = [entry["doc_id"] for entry in metadata]
+    if dedup is None or dedup.keys != doc_ids[:len(dedup.keys)]:
+        dedup = Deduplicator(encoding, threshold=threshold)
+    for entry in metadata[len(dedup.keys):]:
+        dedup.add(entry["content"], entry["doc_id"])
+        dedup.keys.append(entry["doc_id"])
+    dedup.reset_stats()
+    return dedup
+
+
+def deduplicate_entries(dedup: Deduplicator, metadata: List[Dict],
+                        new_entries: List[Dict]) -> List[Dict]:
+    """
+    Drop new entries whose content duplicates a stored or earlier new entry.
+
+    A dropped entry is recorded in the "duplicates" list of the entry it
+    matched, so it shares that entry's embedding and stays findable by doc_id.
+    Kept entries are added to dedup.keys; save dedup once they are stored.
+    """
+    by_id = {entry["doc_id"]: entry for entry in metadata}
+    unique = []
+    for entry in new_entries:
+        canonical = dedup.add(entry["content"], entry["doc_id"])
+        if canonical is None:
+            unique.append(entry)
+            dedup.keys.append(entry["doc_id"])
+            by_id[entry["doc_id"]] = entry
+            continue
+        reference = {key: entry[key] for key in
+                     ("doc_id", "title", "category", "parent_doc_id", "chunk_index") if key in entry}
+        by_id[canonical].setdefault("duplicates", []).append(reference)
+    print(f"[Info] Dedup: {dedup.report()}")
+    return unique
 
 # ==============================
 #  Persistence Helpers
 # ==============================
 
 
-def save_index_and_metadata(index: faiss.IndexFlatL2, metadata: List[Dict]):
+def save_index_and_metadata(index: faiss.Index, metadata: List[Dict]):
+    import faiss
+
     faiss.write_index(index, INDEX_FILE)
     with open(META_FILE, "w", encoding="utf-8") as f:
         json.dump(metadata, f, ensure_ascii=False, indent=2)
@@ -78,22 +210,69 @@ def save_index_and_metadata(index: faiss.IndexFlatL2, metadata: List[Dict]):
 def load_index_and_metadata():
     if not os.path.exists(INDEX_FILE) or not os.path.exists(META_FILE):
         return None, []
+    with tracer.span("import_faiss"):
+        import faiss  # deferred: only paid when there is an index to load
+
     index = faiss.read_index(INDEX_FILE)
+    sync_vectors(index, VECTORS_FILE)
     with open(META_FILE, "r", encoding="utf-8") as f:
         metadata = json.load(f)
     print(f"[Loaded] Index with {len(metadata)} entries.")
     return index, metadata
 
+
+def load_metadata() -> List[Dict]:
+    """Metadata only, for lexical searches that never touch FAISS."""
+    if not os.path.exists(META_FILE):
+        return []
+    with open(META_FILE, "r", encoding="utf-8") as f:
+        metadata = json.load(f)
+    print(f"[Loaded] Metadata with {len(metadata)} entries.")
+    return metadata
+
+
+def load_lexical_index(metadata: List[Dict], model: str) -> BM25Index:
+    """
+    Load the BM25 index and bring it in line with metadata: entries appended
+    since the last save are indexed incrementally; if the stored doc_ids no
+    longer match (e.g. after a delete), the index is rebuilt.
+    """
+    encoding = get_encoding_for_model(model)
+    lexical = BM25Index.load(LEXICAL_INDEX_FILE, encoding)
+    doc_ids = [entry["doc_id"] for entry in metadata]
+    if lexical is None or lexical.doc_ids != doc_ids[:len(lexical)]:
+        lexical = BM25Index(encoding)
+    if len(lexical) < len(metadata):
+        lexical.add([entry["content"] for entry in metadata[len(lexical):]],
+                    doc_ids[len(lexical):])
+        lexical.save(LEXICAL_INDEX_FILE)
+        print(f"[Saved] Lexical index -> {LEXICAL_INDEX_FILE}")
+    return lexical
+
 # ==============================
 #  Search Helper
 # ==============================
 
 
-def search_faiss(index: faiss.IndexFlatL2, query_embedding: List[float], k: int = 3):
-    query_vector = np.array([query_embedding]).astype("float32")
-    distances, indices = index.search(query_vector, k)
+def search_faiss(index: faiss.Index, query_embedding: np.ndarray, k: int = 3,
+                 rerank_factor: int = RERANK_FACTOR):
+    query_vector = np.asarray(query_embedding, dtype="float32").reshape(1, -1)
+    with tracer.span("index_search", k=k):
+        distances, indices = search_index(index, query_vector, k, VECTORS_FILE, rerank_factor)
     return distances[0], indices[0]
 
+
+def matches_filters(entry: Dict, filter_category: Optional[str],
+                    filter_doc_id: Optional[str]) -> bool:
+    if filter_category and entry["category"] != filter_category:
+        return False
+    if filter_doc_id and filter_doc_id not in (
+            entry["doc_id"], entry.get("parent_doc_id"),
+            *(d["doc_id"] for d in entry.get("duplicates", [])),
+            *(d.get("parent_doc_id") for d in entry.get("duplicates", []))):
+        return False
+    return True
+
 # ==============================
 #  Main Script
 # ==============================
@@ -111,28 +290,94 @@ def main():
                         help="Content text of the document.")
     parser.add_argument("--file", type=str,
                         help="File with JSON list of metadata+content to add.")
+    parser.add_argument("--content_file", type=str,
+                        help="Plain-text file used as the content of a single --title/--category entry.")
+    parser.add_argument("--chunk_tokens", type=int, default=EMBEDDING_TOKEN_LIMIT,
+                        help="Maximum tokens per embedded chunk (longer content is split).")
+    parser.add_argument("--chunk_overlap", type=int, default=0,
+                        help="Tokens repeated between consecutive chunks.")
     parser.add_argument("--query", type=str,
                         help="Search query for semantic search.")
     parser.add_argument("--filter_category", type=str,
                         help="Filter search results by category.")
     parser.add_argument("--filter_doc_id", type=str,
                         help="Filter search results by doc_id.")
+    parser.add_argument("--compression", type=str, choices=COMPRESSION_MODES,
+                        help="Convert the stored index: none (float32), fp16, int8 or pq.")
+    parser.add_argument("--rerank_factor", type=int, default=RERANK_FACTOR,
+                        help="Candidates per result re-ranked exactly on compressed indexes.")
+    parser.add_argument("--threads", type=int,
+                        help="FAISS threads for index add/train (default: all cores).")
+    parser.add_argument("--no_dedup", action="store_true",
+                        help="Embed every entry, even exact or near duplicates.")
+    parser.add_argument("--dedup_threshold", type=float, default=NEAR_DUPLICATE_THRESHOLD,
+                        help="Estimated Jaccard similarity at which content counts as a near duplicate.")
     parser.add_argument("--model", type=str, default="text-embedding-3-small",
                         help="Embedding model to use.")
+    parser.add_argument("--backend", type=str, choices=sorted(BACKENDS),
+                        default=default_backend_name(),
+                        help="Embedding backend (default: $EMBEDDING_BACKEND or openai).")
+    parser.add_argument("--cache_file", type=str, nargs="?", const=QUERY_CACHE_FILE,
+                        help=f"Persist query embeddings so repeat queries skip the API "
+                             f"(bare flag: {QUERY_CACHE_FILE}; off by default).")
+    parser.add_argument("--no_cache", action="store_true",
+                        help="Ignore --cache_file: neither read nor write cached query embeddings.")
     parser.add_argument("--top_k", type=int, default=3,
                         help="Number of search results.")
+    parser.add_argument("--search_mode", type=str, choices=SEARCH_MODES, default="vector",
+                        help="vector, lexical (BM25 only, no embedding call) or hybrid (RRF of both).")
+    parser.add_argument("--profile", action="store_true",
+                        help="Print a per-stage timing breakdown at exit.")
+    parser.add_argument("--trace_json", type=str,
+                        help="Write the timing spans as a Chrome trace JSON file.")
+    parser.add_argument("--prometheus_file", type=str,
+                        help="Write stage latency histograms in Prometheus text format.")
     args = parser.parse_args()
 
-    # Load or create index
-    index, metadata = load_index_and_metadata()
-    if index is None:
+    try:
+        run(args)
+    finally:
+        if args.profile:
+            tracer.print_profile()
+        if args.trace_json:
+            tracer.export_json(args.trace_json)
+        if args.prometheus_file:
+            tracer.export_prometheus(args.prometheus_file)
+
+
+def run(args):
+    # Lexical-only searches answer from metadata + BM25 without loading FAISS
+    lexical_only = args.search_mode == "lexical" and not args.add and not args.compression
+    with tracer.span("load_index_and_metadata"):
+        if lexical_only:
+            index, metadata = None, load_metadata()
+        else:
+            index, metadata = load_index_and_metadata()
+    lexical = None
+    if index is None and not lexical_only:
+        import faiss
+
         index = faiss.IndexFlatL2(1536)
         print("[Info] Created new FAISS index.")
 
     # Add new entries
     if args.add:
         new_entries = []
-        if args.content and args.title and args.category:
+        if args.content_file and args.title and args.category:
+            # Streamed straight into the chunker; the file is never read whole
+            parent_id = str(uuid.uuid4())
+            encoding = get_encoding_for_model(args.model)
+            for chunk in chunk_text(iter_file_blocks(args.content_file), encoding,
+                                    args.chunk_tokens, args.chunk_overlap):
+                new_entries.append({
+                    "doc_id": str(uuid.uuid4()),
+                    "parent_doc_id": parent_id,
+                    "chunk_index": chunk["chunk_index"],
+                    "title": args.title,
+                    "category": args.category,
+                    "content": chunk["text"]
+                })
+        elif args.content and args.title and args.category:
             new_entries.append({
                 "doc_id": str(uuid.uuid4()),
                 "title": args.title,
@@ -147,16 +392,44 @@ def main():
                         entry["doc_id"] = str(uuid.uuid4())
                         new_entries.append(entry)
         else:
-            print("[Error] To add, provide --title --category --content OR --file")
+            print("[Error] To add, provide --title --category --content (or --content_file) OR --file")
             return
 
+        with tracer.span("chunk_entries"):
+            new_entries = chunk_entries(new_entries, args.model,
+                                        args.chunk_tokens, args.chunk_overlap)
+        dedup = None
+        if not args.no_dedup:
+            with tracer.span("dedup"):
+                dedup = load_deduplicator(metadata, args.model, args.dedup_threshold)
+                new_entries = deduplicate_entries(dedup, metadata, new_entries)
+
         print(f"[Adding] {len(new_entries)} new entries...")
-        embeddings = [get_embedding(e["content"], model=args.model)
-                      for e in new_entries]
-        vectors = np.array(embeddings).astype("float32")
-        index.add(vectors)
-        metadata.extend(new_entries)
-        save_index_and_metadata(index, metadata)
+        if new_entries:
+            # Batches stream from the API into the index; no list of all vectors is built
+            builder = IndexBuilder(index, chunk_rows=min(CHUNK_ROWS, len(new_entries)),
+                                   threads=args.threads, vectors_path=VECTORS_FILE)
+            with tracer.span("index_add", vectors=len(new_entries)):
+                builder.add_batches(iter_embedding_batches(
+                    [e["content"] for e in new_entries], args.model, args.backend))
+            metadata.extend(new_entries)
+        with tracer.span("save_index_and_metadata"):
+            save_index_and_metadata(index, metadata)
+        if dedup is not None:
+            dedup.save(DEDUP_FILE)
+            print(f"[Saved] Dedup state -> {DEDUP_FILE}")
+        if os.path.exists(LEXICAL_INDEX_FILE):
+            # Only kept in sync once a lexical/hybrid search has built it
+            with tracer.span("lexical_index_update"):
+                lexical = load_lexical_index(metadata, args.model)
+
+    if args.compression and index is not None:
+        with tracer.span("convert_index"):
+            converted = convert_index(index, args.compression, VECTORS_FILE)
+        if converted is not index:
+            index = converted
+            with tracer.span("save_index_and_metadata"):
+                save_index_and_metadata(index, metadata)
 
     # Search
     if args.query:
@@ -164,28 +437,58 @@ def main():
             print("[Error] No data in index to search.")
             return
         print(f"[Query] {args.query}")
-        query_embedding = get_embedding(args.query, model=args.model)
-        distances, indices = search_faiss(
-            index, query_embedding, k=args.top_k * 2)  # search wider, filter later
-
-        results = []
-        for rank, idx in enumerate(indices):
-            if idx < len(metadata):
-                entry = metadata[idx]
-                if args.filter_category and entry["category"] != args.filter_category:
-                    continue
-                if args.filter_doc_id and entry["doc_id"] != args.filter_doc_id:
-                    continue
-                results.append((entry, distances[rank]))
-            if len(results) >= args.top_k:
-                break
+
+        lexical_hits = []
+        if args.search_mode in ("lexical", "hybrid"):
+            if lexical is None:
+                with tracer.span("load_lexical_index"):
+                    lexical = load_lexical_index(metadata, args.model)
+            with tracer.span("lexical_search"):
+                lexical_hits = lexical.search(
+                    args.query, args.top_k * 2,
+                    allowed=lambda position: matches_filters(
+                        metadata[position], args.filter_category, args.filter_doc_id))
+
+        vector_hits = []
+        if args.search_mode in ("vector", "hybrid"):
+            with tracer.span("embed_query"):
+                query_cache = QueryEmbeddingCache(
+                    path=None if args.no_cache else args.cache_file, namespace=args.backend)
+                query_embedding = query_cache.get_or_embed(
+                    args.query, args.model,
+                    lambda text, model: get_embedding(text, model=model, backend=args.backend))
+                query_cache.save()
+            distances, indices = search_faiss(
+                index, query_embedding, k=args.top_k * 2,  # search wider, filter later
+                rerank_factor=args.rerank_factor)
+
+            with tracer.span("metadata_filter"):
+                for rank, idx in enumerate(indices):
+                    if 0 <= idx < len(metadata) and matches_filters(
+                            metadata[idx], args.filter_category, args.filter_doc_id):
+                        vector_hits.append((int(idx), float(distances[rank])))
+
+        if args.search_mode == "vector":
+            hits, label = vector_hits, "Distance"
+        elif args.search_mode == "lexical":
+            hits, label = lexical_hits, "BM25"
+        else:
+            with tracer.span("rank_fusion"):
+                hits = reciprocal_rank_fusion([[position for position, _ in lexical_hits],
+                                               [position for position, _ in vector_hits]])
+            label = "RRF score"
+        results = [(metadata[position], score) for position, score in hits[:args.top_k]]
 
         print("\n[Results]")
-        for rank, (entry, dist) in enumerate(results):
+        for rank, (entry, score) in enumerate(results):
             print(
                 f"{rank+1}. [{entry['category']}] {entry['title']} (doc_id={entry['doc_id']})")
+            if "parent_doc_id" in entry:
+                print(f"    Chunk {entry['chunk_index']} of parent_doc_id={entry['parent_doc_id']}")
             print(f"    Content: {entry['content']}")
-            print(f"    Distance: {dist:.4f}")
+            for duplicate in entry.get("duplicates", []):
+                print(f"    Duplicate: {duplicate['title']} (doc_id={duplicate['doc_id']})")
+            print(f"    {label}: {score:.4f}")
 
 
 if __name__ == "__main__":
@@ -259,6 +562,13 @@ if __name__ == "__main__":
 
 # ---
 
+# # 8️⃣ Keyword-only search (BM25, no embedding call)
+# ```bash
+# python a6_embeddings.py - -query "SKU-4471" - -search_mode lexical
+# ```
+
+# ---
+
 # # Benefits of `a6_embeddings.py`:
 # ✅ Persistent FAISS index
 # ✅ Metadata(title, category, doc_id, content)
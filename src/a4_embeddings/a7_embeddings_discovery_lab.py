@@ -13,9 +13,10 @@ continuous semantic spaces where meaning becomes measurable.
     - Visualize semantic clustering patterns
 
 🔬 Discovery Features:
-    - Interactive similarity analysis
-    - Vector arithmetic exploration
-    - Semantic clustering visualization
+    - Corpus-wide embedding statistics and degenerate-vector checks
+    - Interactive similarity analysis (batched for large pair lists)
+    - Vector arithmetic exploration (batched analogies over a vocabulary matrix)
+    - Semantic clustering visualization (streaming k-means for large inputs)
     - Context-dependent embedding comparison
 
 📋 Prerequisites:
@@ -26,13 +27,31 @@ continuous semantic spaces where meaning becomes measurable.
 
 import os
 import numpy as np
-import matplotlib.pyplot as plt
 from typing import List, Dict, Tuple, Optional
-from sklearn.cluster import KMeans
-from sklearn.decomposition import PCA
-from sklearn.metrics.pairwise import cosine_similarity
 import tiktoken
-from openai import OpenAI
+from embedding_backends import get_backend
+from embedding_analytics import (
+    FIT_SAMPLE, EmbeddingVocabulary, analogy_targets, cluster_embeddings,
+    corpus_statistics, fit_projection_2d, normalize_rows, pair_metrics, project_2d,
+    similarity_matrix)
+
+# Texts per embedding request when embedding in bulk (OpenAI accepts up to 2048)
+EMBED_BATCH_SIZE = 1024
+
+# Clustering: switch to sampled PCA + streaming k-means above this many words
+SCALABLE_THRESHOLD = 10_000
+RENDER_MAX_POINTS = 20_000   # scatter plots are downsampled beyond this
+ANNOTATE_MAX_POINTS = 200    # word labels are only drawn for small plots
+CLUSTER_PLOT_FILE = 'semantic_clusters_visualization.png'
+
+# Small teaching vocabulary used for analogies until a real one is built or loaded
+DEFAULT_ANALOGY_VOCABULARY = [
+    "queen", "woman", "king", "man", "royal", "crown",
+    "water", "swimming", "snow", "skiing", "ice", "cold",
+    "Paris", "Rome", "France", "Italy", "capital", "city",
+    "teacher", "student", "doctor", "patient", "nurse", "hospital",
+    "book", "reading", "movie", "watching", "music", "listening"
+]
 
 # Load API key securely
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
@@ -47,40 +66,80 @@ class EmbeddingDiscoveryLab:
     Designed to reveal how semantic meaning emerges from vector mathematics.
     """
 
-    def __init__(self, model: str = "text-embedding-3-small"):
-        """Initialize the discovery lab with specified embedding model."""
+    def __init__(self, model: str = "text-embedding-3-small", backend: Optional[str] = None):
+        """
+        Initialize the discovery lab with specified embedding model.
+        Without an API key the lab falls back to the offline hashing backend (demo mode).
+        """
         self.model = model
-        self.client = OpenAI(
-            api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
+        if backend is None:
+            backend = "openai" if OPENAI_API_KEY else "hashing"
+        self.backend = get_backend(backend, model)
+        if self.backend.name == "hashing":
+            print("🔧 Demo mode: deterministic offline embeddings (feature hashing, no API calls)")
         self.embedding_cache = {}
+        self.vocabulary: Optional[EmbeddingVocabulary] = None
         self.tokenizer = tiktoken.get_encoding("cl100k_base")
 
     def get_embedding(self, text: str) -> Optional[np.ndarray]:
         """
         Generate embedding vector for text with educational caching.
-        Returns None if API is not available.
+        Returns None if the embedding backend request fails.
         """
-        if not self.client:
-            print(f"🔧 Demo mode: Simulating embedding for '{text[:30]}...'")
-            # Generate deterministic pseudo-embedding for demo
-            np.random.seed(hash(text) % (2**32))
-            return np.random.normal(0, 1, 1536)
-
         if text in self.embedding_cache:
             return self.embedding_cache[text]
 
         try:
-            response = self.client.embeddings.create(
-                model=self.model,
-                input=text
-            )
-            embedding = np.array(response.data[0].embedding)
+            embedding = self.backend.embed(text)
             self.embedding_cache[text] = embedding
             return embedding
         except Exception as e:
             print(f"❌ Error generating embedding: {e}")
             return None
 
+    def get_embeddings(self, texts: List[str]) -> Optional[np.ndarray]:
+        """
+        Embed many texts as one float32 matrix (rows follow input order).
+        Only uncached unique texts are sent, EMBED_BATCH_SIZE per request.
+        Returns None if the embedding backend request fails.
+        """
+        missing = [t for t in dict.fromkeys(texts) if t not in self.embedding_cache]
+        try:
+            for start in range(0, len(missing), EMBED_BATCH_SIZE):
+                chunk = missing[start:start + EMBED_BATCH_SIZE]
+                for text, embedding in zip(chunk, self.backend.embed_batch(chunk)):
+                    self.embedding_cache[text] = embedding
+        except Exception as e:
+            print(f"❌ Error generating embeddings: {e}")
+            return None
+
+        if not texts:
+            return np.zeros((0, 0), dtype="float32")
+        return np.stack([self.embedding_cache[t] for t in texts]).astype("float32", copy=False)
+
+    def compute_pair_similarities(self, text_pairs: List[Tuple[str, str]]) -> Dict[str, np.ndarray]:
+        """
+        Cosine similarity, Euclidean distance and dot product for every pair.
+        Each unique text is embedded once; the metrics come from a few matrix
+        operations over the stacked embeddings instead of a loop over pairs.
+        """
+        unique_texts = list(dict.fromkeys(t for pair in text_pairs for t in pair))
+        matrix = self.get_embeddings(unique_texts)
+        if matrix is None:
+            return {}
+        position = {text: i for i, text in enumerate(unique_texts)}
+        left = [position[text1] for text1, _ in text_pairs]
+        right = [position[text2] for _, text2 in text_pairs]
+        return pair_metrics(matrix, left, right)
+
+    def compute_similarity_matrix(self, texts: List[str], metric: str = "cosine",
+                                  out: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        """N x N similarity matrix for texts, computed in row blocks (see embedding_analytics)."""
+        matrix = self.get_embeddings(texts)
+        if matrix is None:
+            return None
+        return similarity_matrix(matrix, metric=metric, out=out)
+
     def analyze_embedding_properties(self, text: str) -> Dict:
         """
         Educational analysis of embedding vector properties.
@@ -111,28 +170,49 @@ class EmbeddingDiscoveryLab:
 
         return analysis
 
-    def explore_semantic_similarity(self, text_pairs: List[Tuple[str, str]]) -> Dict:
+    def analyze_corpus_properties(self, matrix: np.ndarray, per_row: bool = True) -> Dict:
+        """
+        Corpus-level version of analyze_embedding_properties for an (N, d)
+        matrix or np.memmap. Statistics are streamed in chunks (see
+        embedding_analytics.corpus_statistics) and degenerate vectors reported.
+        """
+        print(f"\n📚 CORPUS EMBEDDING STATISTICS")
+        print("=" * 40)
+
+        stats = corpus_statistics(matrix, per_row=per_row)
+        per_dimension = stats['per_dimension']
+        print(f"   📦 Embeddings: {stats['rows']:,} x {stats['dimensions']}")
+        if per_row and stats['rows']:
+            norms = stats['per_row']['norm']
+            print(f"   📏 Magnitude: min {np.nanmin(norms):.3f} | mean {np.nanmean(norms):.3f} | max {np.nanmax(norms):.3f}")
+        print(f"   ⚖️ Mean of dimension means: {per_dimension['mean'].mean():.4f}")
+        print(f"   📈 Dimension std range: {per_dimension['std'].min():.4f} - {per_dimension['std'].max():.4f}")
+        print(f"   🕳️ Zero vectors: {len(stats['zero_rows']):,}")
+        print(f"   ⚠️ Vectors with NaN/inf: {len(stats['nonfinite_rows']):,}")
+        if len(stats['zero_rows']) or len(stats['nonfinite_rows']):
+            print(f"   💡 Degenerate rows (first 10): "
+                  f"{np.concatenate([stats['zero_rows'], stats['nonfinite_rows']])[:10].tolist()}")
+        return stats
+
+    def explore_semantic_similarity(self, text_pairs: List[Tuple[str, str]],
+                                    verbose: bool = True) -> Dict:
         """
         Educational exploration of semantic similarity between text pairs.
         Demonstrates how vector mathematics captures meaning relationships.
+        Set verbose=False to skip the per-pair printout for large pair lists.
         """
         print(f"🔍 SEMANTIC SIMILARITY EXPLORATION")
         print("=" * 50)
 
         results = {}
+        metrics = self.compute_pair_similarities(text_pairs)
+        if not metrics:
+            return results
 
         for i, (text1, text2) in enumerate(text_pairs, 1):
-            embedding1 = self.get_embedding(text1)
-            embedding2 = self.get_embedding(text2)
-
-            if embedding1 is None or embedding2 is None:
-                continue
-
-            # Calculate similarity metrics
-            cosine_sim = float(cosine_similarity(
-                [embedding1], [embedding2])[0][0])
-            euclidean_dist = float(np.linalg.norm(embedding1 - embedding2))
-            dot_product = float(np.dot(embedding1, embedding2))
+            cosine_sim = float(metrics['cosine_similarity'][i - 1])
+            euclidean_dist = float(metrics['euclidean_distance'][i - 1])
+            dot_product = float(metrics['dot_product'][i - 1])
 
             results[f"pair_{i}"] = {
                 'text1': text1,
@@ -141,6 +221,8 @@ class EmbeddingDiscoveryLab:
                 'euclidean_distance': euclidean_dist,
                 'dot_product': dot_product
             }
+            if not verbose:
+                continue
 
             # Educational output
             print(f"\n📝 Pair {i}: '{text1}' vs '{text2}'")
@@ -169,24 +251,11 @@ class EmbeddingDiscoveryLab:
         print("=" * 40)
 
         results = {}
+        # Calculate analogy: A is to B as C is to ?  (vector arithmetic: B - A + C)
+        predictions = self.solve_analogies(analogies)
 
-        for i, (word_a, word_b, word_c) in enumerate(analogies, 1):
-            # Get embeddings for analogy components
-            emb_a = self.get_embedding(word_a)
-            emb_b = self.get_embedding(word_b)
-            emb_c = self.get_embedding(word_c)
-
-            if any(emb is None for emb in [emb_a, emb_b, emb_c]):
-                continue
-
-            # Calculate analogy: A is to B as C is to ?
-            # Vector arithmetic: B - A + C = ?
-            target_vector = emb_b - emb_a + emb_c
-
-            # Find closest match from a set of candidate words
-            candidates = self._get_analogy_candidates(word_a, word_b, word_c)
-            best_match, best_similarity = self._find_closest_word(
-                target_vector, candidates)
+        for i, ((word_a, word_b, word_c), top) in enumerate(zip(analogies, predictions), 1):
+            best_match, best_similarity = top[0] if top else ("unknown", -1.0)
 
             results[f"analogy_{i}"] = {
                 'word_a': word_a,
@@ -206,58 +275,190 @@ class EmbeddingDiscoveryLab:
 
         return results
 
-    def visualize_semantic_clusters(self, word_groups: Dict[str, List[str]]) -> Dict:
+    def build_vocabulary(self, words: List[str], use_faiss: bool = False) -> Optional[EmbeddingVocabulary]:
+        """
+        Embed a candidate vocabulary once and keep it as a normalized matrix for analogy search.
+        Batches are normalized straight into one preallocated matrix; vocabulary
+        words bypass embedding_cache, so the vectors are held only once.
+        """
+        words = list(dict.fromkeys(words))
+        matrix = None
+        try:
+            for start in range(0, len(words), EMBED_BATCH_SIZE):
+                batch = self.backend.embed_batch(words[start:start + EMBED_BATCH_SIZE])
+                if matrix is None:
+                    matrix = np.empty((len(words), batch.shape[1]), dtype="float32")
+                matrix[start:start + len(batch)] = normalize_rows(batch)
+        except Exception as e:
+            print(f"❌ Error generating embeddings: {e}")
+            return None
+        if matrix is None:
+            return None
+        self.vocabulary = EmbeddingVocabulary(words, matrix, normalized=True)
+        if use_faiss:
+            self.vocabulary.build_faiss_index()
+        return self.vocabulary
+
+    def load_vocabulary(self, path: str, use_faiss: bool = False) -> EmbeddingVocabulary:
+        """Reuse a vocabulary saved with EmbeddingVocabulary.save() (memory-mapped)."""
+        self.vocabulary = EmbeddingVocabulary.load(path)
+        if use_faiss:
+            self.vocabulary.build_faiss_index()
+        return self.vocabulary
+
+    def solve_analogies(self, analogies: List[Tuple[str, str, str]],
+                        k: int = 1) -> List[List[Tuple[str, float]]]:
+        """
+        Top-k completions for a batch of analogies "A is to B as C is to ?".
+        All A/B/C words are embedded in one batch, the B - A + C targets are
+        scored against the vocabulary in one matrix multiply, and the three
+        input words are excluded from each answer.
+        """
+        if not analogies:
+            return []
+        if self.vocabulary is None and self.build_vocabulary(DEFAULT_ANALOGY_VOCABULARY) is None:
+            return [[] for _ in analogies]
+
+        terms = list(dict.fromkeys(word for analogy in analogies for word in analogy))
+        matrix = self.get_embeddings(terms)
+        if matrix is None:
+            return [[] for _ in analogies]
+        position = {word: i for i, word in enumerate(terms)}
+        rows_a, rows_b, rows_c = (
+            [position[analogy[slot]] for analogy in analogies] for slot in range(3))
+
+        targets = analogy_targets(matrix[rows_a], matrix[rows_b], matrix[rows_c])
+        scores, rows = self.vocabulary.nearest(targets, k=k, exclude=analogies)
+        return [[(self.vocabulary.words[row], float(score))
+                 for score, row in zip(query_scores, query_rows) if row >= 0]
+                for query_scores, query_rows in zip(scores, rows)]
+
+    def evaluate_analogies(self, questions: List[Tuple[str, str, str, str]], k: int = 1) -> Dict:
+        """
+        Accuracy on an analogy benchmark given as (A, B, C, expected D) rows,
+        e.g. the Google analogy set against a 100k-word vocabulary.
+        """
+        predictions = self.solve_analogies([question[:3] for question in questions], k=k)
+        correct = sum(
+            any(word == question[3] for word, _ in top)
+            for question, top in zip(questions, predictions))
+        total = len(questions)
+        return {
+            'questions': total,
+            'correct': correct,
+            f'accuracy_at_{k}': correct / total if total else 0.0,
+        }
+
+    def visualize_semantic_clusters(self, word_groups: Dict[str, List[str]],
+                                    scalable: Optional[bool] = None, method: str = "minibatch",
+                                    render: bool = True,
+                                    max_plot_points: int = RENDER_MAX_POINTS) -> Dict:
         """
         Educational visualization of semantic clustering in embedding space.
         Demonstrates how related concepts cluster together geometrically.
+
+        Inputs above SCALABLE_THRESHOLD words switch to the scalable mode
+        (randomized PCA on a sample, MiniBatchKMeans or FAISS k-means); pass
+        scalable=True/False to force it. Large plots are downsampled to
+        max_plot_points, and render=False skips matplotlib entirely.
         """
         print(f"\n🎨 SEMANTIC CLUSTERING VISUALIZATION")
         print("=" * 45)
 
-        # Collect all words and their embeddings
-        all_words = []
-        all_embeddings = []
-        group_labels = []
-
-        for group_name, words in word_groups.items():
-            for word in words:
-                embedding = self.get_embedding(word)
-                if embedding is not None:
-                    all_words.append(word)
-                    all_embeddings.append(embedding)
-                    group_labels.append(group_name)
+        # Collect all words and embed them in batches
+        all_words = [word for words in word_groups.values() for word in words]
+        group_labels = [group for group, words in word_groups.items() for _ in words]
+        embeddings_matrix = self.get_embeddings(all_words)
 
-        if len(all_embeddings) < 2:
+        if embeddings_matrix is None or len(all_words) < 2:
             print("❌ Insufficient embeddings for clustering analysis")
             return {}
 
-        # Convert to numpy array
-        embeddings_matrix = np.array(all_embeddings)
+        clustering = self.cluster_embedding_matrix(
+            embeddings_matrix, n_clusters=len(word_groups), scalable=scalable, method=method)
+        cluster_labels = clustering['labels']
+        embeddings_2d = clustering['points_2d']
 
-        # Dimensionality reduction for visualization
-        pca = PCA(n_components=2)
-        embeddings_2d = pca.fit_transform(embeddings_matrix)
+        saved_to = None
+        if render:
+            saved_to = self._render_clusters(
+                all_words, group_labels, list(word_groups), embeddings_2d,
+                clustering['centers_2d'], max_plot_points)
 
-        # K-means clustering
-        n_clusters = len(word_groups)
-        kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
-        cluster_labels = kmeans.fit_predict(embeddings_matrix)
+        # Educational analysis
+        results = {
+            'total_words': len(all_words),
+            'total_groups': len(word_groups),
+            'clustering_method': clustering['method'],
+            'pca_explained_variance': clustering['explained_variance'],
+            'cluster_assignments': {word: int(cluster_labels[i]) for i, word in enumerate(all_words)},
+            'visualization_saved': saved_to
+        }
 
-        # Visualization
-        plt.figure(figsize=(12, 8))
-        colors = plt.cm.Set3(np.linspace(0, 1, len(word_groups)))
-        group_to_color = {group: colors[i]
-                          for i, group in enumerate(word_groups.keys())}
+        print(f"📊 Clustering Results:")
+        print(f"   Words analyzed: {len(all_words)}")
+        print(f"   Semantic groups: {len(word_groups)}")
+        print(f"   Clustering method: {clustering['method']}")
+        print(
+            f"   PCA variance explained: {sum(clustering['explained_variance']):.1%}")
+        if saved_to:
+            print(f"   📁 Visualization saved: {saved_to}")
+
+        return results
+
+    def cluster_embedding_matrix(self, matrix: np.ndarray, n_clusters: int,
+                                 scalable: Optional[bool] = None,
+                                 method: str = "minibatch") -> Dict:
+        """
+        Cluster an (N, d) embedding matrix (may be a np.memmap) and project it
+        to 2D. Small inputs use exact PCA + KMeans(n_init=10); large ones fit
+        the projection on a sample and stream k-means over row chunks, so
+        memory stays bounded even for a million embeddings.
+        """
+        if scalable is None:
+            scalable = len(matrix) > SCALABLE_THRESHOLD
+        if not scalable:
+            method = "full"
+
+        pca = fit_projection_2d(matrix, sample_size=len(matrix) if method == "full" else FIT_SAMPLE)
+        points_2d = project_2d(pca, matrix)
+        labels, centers = cluster_embeddings(matrix, n_clusters, method=method)
+        return {
+            'method': method,
+            'labels': labels,
+            'centers': centers,
+            'points_2d': points_2d,
+            'centers_2d': pca.transform(centers),
+            'explained_variance': pca.explained_variance_ratio_.tolist(),
+        }
+
+    def _render_clusters(self, words: List[str], group_labels: List[str], groups: List[str],
+                         points_2d: np.ndarray, centers_2d: np.ndarray,
+                         max_plot_points: int) -> str:
+        """Scatter plot of the 2D projection; big inputs are randomly downsampled."""
+        # Plotting is slow to import, so load it on first use
+        import matplotlib.pyplot as plt
 
-        for i, word in enumerate(all_words):
-            x, y = embeddings_2d[i]
-            color = group_to_color[group_labels[i]]
-            plt.scatter(x, y, c=[color], s=100, alpha=0.7)
-            plt.annotate(word, (x, y), xytext=(5, 5), textcoords='offset points',
-                         fontsize=9, ha='left')
+        shown = np.arange(len(words))
+        if len(shown) > max_plot_points:
+            shown = np.sort(np.random.default_rng(42).choice(
+                len(words), max_plot_points, replace=False))
+            print(f"   🔽 Plotting a sample of {max_plot_points:,} of {len(words):,} points")
+        shown_groups = np.array(group_labels, dtype=object)[shown]
+
+        plt.figure(figsize=(12, 8))
+        colors = plt.cm.Set3(np.linspace(0, 1, len(groups)))
+        for color, group in zip(colors, groups):
+            in_group = shown[shown_groups == group]
+            plt.scatter(points_2d[in_group, 0], points_2d[in_group, 1],
+                        c=[color], s=100 if len(shown) <= ANNOTATE_MAX_POINTS else 4,
+                        alpha=0.7, label=group)
+        if len(shown) <= ANNOTATE_MAX_POINTS:
+            for i in shown:
+                plt.annotate(words[i], tuple(points_2d[i]), xytext=(5, 5),
+                             textcoords='offset points', fontsize=9, ha='left')
 
         # Add cluster centers
-        centers_2d = pca.transform(kmeans.cluster_centers_)
         plt.scatter(centers_2d[:, 0], centers_2d[:, 1],
                     marker='x', s=300, linewidths=3, color='black', label='Cluster Centers')
 
@@ -270,58 +471,9 @@ class EmbeddingDiscoveryLab:
         plt.tight_layout()
 
         # Save visualization
-        plt.savefig('semantic_clusters_visualization.png',
-                    dpi=300, bbox_inches='tight')
+        plt.savefig(CLUSTER_PLOT_FILE, dpi=300, bbox_inches='tight')
         plt.show()
-
-        # Educational analysis
-        results = {
-            'total_words': len(all_words),
-            'total_groups': len(word_groups),
-            'pca_explained_variance': pca.explained_variance_ratio_.tolist(),
-            'cluster_assignments': {word: int(cluster_labels[i]) for i, word in enumerate(all_words)},
-            'visualization_saved': 'semantic_clusters_visualization.png'
-        }
-
-        print(f"📊 Clustering Results:")
-        print(f"   Words analyzed: {len(all_words)}")
-        print(f"   Semantic groups: {len(word_groups)}")
-        print(
-            f"   PCA variance explained: {sum(pca.explained_variance_ratio_):.1%}")
-        print(f"   📁 Visualization saved: semantic_clusters_visualization.png")
-
-        return results
-
-    def _get_analogy_candidates(self, word_a: str, word_b: str, word_c: str) -> List[str]:
-        """Generate candidate words for analogy completion."""
-        # Educational example candidates - in practice, this would be a larger vocabulary
-        candidates = [
-            "queen", "woman", "king", "man", "royal", "crown",
-            "water", "swimming", "snow", "skiing", "ice", "cold",
-            "Paris", "Rome", "France", "Italy", "capital", "city",
-            "teacher", "student", "doctor", "patient", "nurse", "hospital",
-            "book", "reading", "movie", "watching", "music", "listening"
-        ]
-        # Remove input words from candidates
-        candidates = [c for c in candidates if c not in [
-            word_a, word_b, word_c]]
-        return candidates
-
-    def _find_closest_word(self, target_vector: np.ndarray, candidates: List[str]) -> Tuple[str, float]:
-        """Find the candidate word closest to the target vector."""
-        best_word = None
-        best_similarity = -1
-
-        for candidate in candidates:
-            candidate_embedding = self.get_embedding(candidate)
-            if candidate_embedding is not None:
-                similarity = float(cosine_similarity(
-                    [target_vector], [candidate_embedding])[0][0])
-                if similarity > best_similarity:
-                    best_similarity = similarity
-                    best_word = candidate
-
-        return best_word or "unknown", best_similarity
+        return CLUSTER_PLOT_FILE
 
 
 def demonstrate_embedding_intelligence():
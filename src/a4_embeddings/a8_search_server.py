@@ -0,0 +1,481 @@
+"""
+a8_search_server.py
+
+Resident FAISS Search Server:
+- Loads the a6 FAISS index + metadata once and keeps them in memory
+- Serves /search, /add, /delete and /stats over a small asyncio HTTP server
+- /add chunks and deduplicates content exactly like `a6_embeddings.py --add`
+- Micro-batches concurrent /search requests into a single index.search call
+- Caches query embeddings and coalesces concurrent ones into one API request
+- Reports p50/p99 request latency per endpoint
+"""
+
+import asyncio
+import argparse
+import json
+import threading
+import time
+import uuid
+from collections import deque
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import faiss
+
+from a6_embeddings import (
+    DEDUP_FILE,
+    QUERY_CACHE_FILE,
+    VECTORS_FILE,
+    chunk_entries,
+    deduplicate_entries,
+    get_embeddings,
+    iter_embedding_batches,
+    load_deduplicator,
+    load_index_and_metadata,
+    matches_filters,
+    save_index_and_metadata,
+)
+from embedding_backends import BACKENDS, default_backend_name
+from embedding_client import close_clients
+from query_cache import EmbeddingCoalescer, QueryEmbeddingCache
+from vector_quantization import add_to_index, remove_from_index, search_index
+
+# ==============================
+#  Configuration
+# ==============================
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+BATCH_WINDOW_MS = 2.0      # how long the batcher waits for more queries
+COALESCE_WINDOW_MS = 5.0   # how long query embeddings wait to share a request
+MAX_BATCH_SIZE = 64        # queries per index.search call
+LATENCY_WINDOW = 10_000    # latency samples kept per endpoint
+
+
+# ==============================
+#  Latency Tracking
+# ==============================
+class LatencyTracker:
+    """Keeps a rolling window of request latencies per endpoint."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.window = window
+        self.samples: Dict[str, deque] = {}
+
+    def record(self, endpoint: str, elapsed_ms: float):
+        self.samples.setdefault(
+            endpoint, deque(maxlen=self.window)).append(elapsed_ms)
+
+    def summary(self) -> Dict[str, Dict]:
+        report = {}
+        for endpoint, values in self.samples.items():
+            data = np.fromiter(values, dtype="float64")
+            report[endpoint] = {
+                "count": int(data.size),
+                "p50_ms": float(np.percentile(data, 50)),
+                "p99_ms": float(np.percentile(data, 99)),
+            }
+        return report
+
+
+# ==============================
+#  Resident Vector Store
+# ==============================
+class VectorStore:
+    """
+    In-memory view of the a6 store. Every FAISS call goes through one lock,
+    so searches never see a half-applied add or delete. Adds and deletes are
+    serialized by a second lock that also covers saving to disk, so the
+    rewrite of the stored files never holds up searches.
+    """
+
+    def __init__(self, dim: int = 1536):
+        index, metadata = load_index_and_metadata()
+        if index is None:
+            index = faiss.IndexFlatL2(dim)
+            print("[Info] Created new FAISS index.")
+        self.index = index
+        self.metadata: List[Dict] = metadata
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.dedup = None  # loaded on the first add
+
+    def search(self, query_matrix: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray, Dict[int, Dict]]:
+        with self.lock:
+            distances, indices = search_index(self.index, query_matrix, k, VECTORS_FILE)
+            # Only the hit rows, taken under the lock so they match this search
+            rows = {position: self.metadata[position]
+                    for position in np.unique(indices).tolist() if position >= 0}
+            return distances, indices, rows
+
+    def add(self, entries: List[Dict], vectors: np.ndarray):
+        with self.write_lock:
+            with self.lock:
+                add_to_index(self.index, vectors, VECTORS_FILE)
+                self.metadata.extend(entries)
+            # Searches only read the index and metadata, so they can run during the save
+            save_index_and_metadata(self.index, self.metadata)
+
+    def ingest(self, entries: List[Dict], model: str, backend: str) -> List[Dict]:
+        """
+        The a6 --add path: chunk long content, drop duplicates, embed what is
+        left and store it. Returns the entries that were stored.
+        """
+        entries = chunk_entries(entries, model)
+        with self.write_lock:
+            try:
+                if self.dedup is None:
+                    self.dedup = load_deduplicator(self.metadata, model)
+                entries = deduplicate_entries(self.dedup, self.metadata, entries)
+                if entries:
+                    vectors = np.vstack(list(iter_embedding_batches(
+                        [e["content"] for e in entries], model, backend)))
+                    with self.lock:
+                        add_to_index(self.index, vectors, VECTORS_FILE)
+                        self.metadata.extend(entries)
+            except Exception:
+                self.dedup = None  # may hold keys that were never stored; reload next time
+                raise
+            save_index_and_metadata(self.index, self.metadata)
+            self.dedup.save(DEDUP_FILE)
+            return entries
+
+    def delete(self, doc_id: str) -> int:
+        """Remove a document, or every chunk of one (matched by parent_doc_id)."""
+        with self.write_lock:
+            with self.lock:
+                positions = [i for i, entry in enumerate(self.metadata)
+                             if doc_id in (entry["doc_id"], entry.get("parent_doc_id"))]
+                if not positions:
+                    return 0
+                # Flat and quantized indexes compact on removal, so metadata positions stay aligned
+                remove_from_index(self.index, np.array(positions, dtype="int64"), VECTORS_FILE)
+                for position in reversed(positions):
+                    del self.metadata[position]
+            self.dedup = None  # stored keys changed: rebuilt on the next add
+            save_index_and_metadata(self.index, self.metadata)
+            return len(positions)
+
+    def __len__(self) -> int:
+        return len(self.metadata)
+
+
+# ==============================
+#  Search Micro-Batcher
+# ==============================
+class SearchBatcher:
+    """
+    Collects queries that arrive within a short window and answers them
+    with one index.search call over the stacked query matrix.
+    """
+
+    def __init__(self, store: VectorStore, window_ms: float = BATCH_WINDOW_MS,
+                 max_batch: int = MAX_BATCH_SIZE):
+        self.store = store
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.batches = 0
+        self.batched_queries = 0
+
+    async def search(self, query_vector: np.ndarray, k: int):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((query_vector, k, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self.queue.get()]
+            deadline = loop.time() + self.window
+            while len(pending) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    pending.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            query_matrix = np.stack([vector for vector, _, _ in pending])
+            k = min(max(k for _, k, _ in pending), max(len(self.store), 1))
+            try:
+                distances, indices, metadata = await loop.run_in_executor(
+                    None, self.store.search, query_matrix, k)
+            except Exception as e:
+                for _, _, future in pending:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.batched_queries += len(pending)
+            for row, (_, _, future) in enumerate(pending):
+                if not future.done():
+                    future.set_result((distances[row], indices[row], metadata))
+
+    def stats(self) -> Dict:
+        return {
+            "batches": self.batches,
+            "queries": self.batched_queries,
+            "avg_batch_size": self.batched_queries / self.batches if self.batches else 0.0,
+        }
+
+
+# ==============================
+#  Request Handlers
+# ==============================
+def positive_int(body: Dict, key: str, default: int) -> int:
+    value = body.get(key, default)
+    if isinstance(value, bool) or not isinstance(value, int) or value <= 0:
+        raise ValueError(f"'{key}' must be a positive integer")
+    return value
+
+
+def is_text(value: Any) -> bool:
+    return isinstance(value, str) and bool(value.strip())
+
+
+class SearchService:
+    def __init__(self, store: VectorStore, batcher: SearchBatcher,
+                 coalescer: EmbeddingCoalescer, model: str, backend: str):
+        self.store = store
+        self.batcher = batcher
+        self.coalescer = coalescer
+        self.model = model
+        self.backend = backend
+        self.latency = LatencyTracker()
+
+    async def handle_search(self, body: Dict) -> Dict:
+        query = body.get("query")
+        if not is_text(query):
+            raise ValueError("'query' is required")
+        top_k = positive_int(body, "top_k", 3)
+        filter_category = body.get("filter_category")
+        filter_doc_id = body.get("filter_doc_id")
+        if not all(value is None or isinstance(value, str) for value in (filter_category, filter_doc_id)):
+            raise ValueError("filters must be strings")
+        if len(self.store) == 0:
+            return {"results": []}
+
+        query_vector = await self.coalescer.embed(query)
+        # search wider, filter later (same policy as a6)
+        distances, indices, metadata = await self.batcher.search(query_vector, top_k * 2)
+
+        results = []
+        for dist, idx in zip(distances, indices):
+            entry = metadata.get(int(idx))
+            # Same filter as the a6 CLI: chunks match their parent_doc_id, kept entries their duplicates
+            if entry is not None and matches_filters(entry, filter_category, filter_doc_id):
+                results.append({**entry, "distance": float(dist)})
+            if len(results) >= top_k:
+                break
+        return {"results": results}
+
+    async def handle_add(self, body: Dict) -> Dict:
+        entries = body.get("entries", [body])
+        if not isinstance(entries, list) or not entries:
+            raise ValueError("'entries' must be a non-empty list")
+        new_entries = []
+        for entry in entries:
+            if not isinstance(entry, dict) or not all(
+                    is_text(entry.get(k)) for k in ("title", "category", "content")):
+                raise ValueError("each entry needs title, category and content strings")
+            # Chunk fields are assigned here, never taken from the client
+            fields = {key: value for key, value in entry.items()
+                      if key not in ("parent_doc_id", "chunk_index", "duplicates")}
+            new_entries.append({**fields, "doc_id": str(uuid.uuid4())})
+
+        loop = asyncio.get_running_loop()
+        stored = await loop.run_in_executor(
+            None, self.store.ingest, new_entries, self.model, self.backend)
+        # doc_ids are per submitted entry; chunks and duplicates are found through them
+        return {"added": len(stored), "doc_ids": [e["doc_id"] for e in new_entries]}
+
+    async def handle_delete(self, body: Dict) -> Dict:
+        doc_id = body.get("doc_id")
+        if not is_text(doc_id):
+            raise ValueError("'doc_id' is required")
+        loop = asyncio.get_running_loop()
+        deleted = await loop.run_in_executor(None, self.store.delete, doc_id)
+        return {"deleted": deleted}
+
+    async def handle_stats(self, body: Dict) -> Dict:
+        return {
+            "entries": len(self.store),
+            "latency": self.latency.summary(),
+            "search_batches": self.batcher.stats(),
+            "query_embeddings": self.coalescer.stats(),
+            "query_cache": self.coalescer.cache.stats() if self.coalescer.cache else None,
+        }
+
+    async def dispatch(self, method: str, path: str, body: Dict) -> Tuple[int, Dict]:
+        routes = {
+            ("POST", "/search"): self.handle_search,
+            ("POST", "/add"): self.handle_add,
+            ("POST", "/delete"): self.handle_delete,
+            ("GET", "/stats"): self.handle_stats,
+        }
+        handler = routes.get((method, path))
+        if handler is None:
+            return 404, {"error": f"no route for {method} {path}"}
+
+        start = time.perf_counter()
+        try:
+            if not isinstance(body, dict):
+                raise ValueError("request body must be a JSON object")
+            status, payload = 200, await handler(body)
+        except ValueError as e:
+            status, payload = 400, {"error": str(e)}
+        except Exception as e:
+            status, payload = 500, {"error": str(e)}
+        self.latency.record(path, (time.perf_counter() - start) * 1000.0)
+        return status, payload
+
+
+# ==============================
+#  Minimal HTTP/1.1 Layer
+# ==============================
+STATUS_TEXT = {200: "OK", 400: "Bad Request",
+               404: "Not Found", 500: "Internal Server Error"}
+
+
+async def read_request(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict, bool]]:
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    method, path, _ = request_line.decode("latin-1").split(" ", 2)
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    length = int(headers.get("content-length", 0))
+    raw_body = await reader.readexactly(length) if length else b""
+    body = json.loads(raw_body) if raw_body else {}
+    keep_alive = headers.get("connection", "").lower() != "close"
+    return method.upper(), path.split("?", 1)[0], body, keep_alive
+
+
+def make_handler(service: SearchService):
+    async def handle_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except (ValueError, json.JSONDecodeError):
+                    request = ("BAD", "", {}, False)
+                if request is None:
+                    break
+                method, path, body, keep_alive = request
+
+                if method == "BAD":
+                    status, payload = 400, {"error": "malformed request"}
+                else:
+                    status, payload = await service.dispatch(method, path, body)
+
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                    .encode("latin-1") + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    return handle_connection
+
+
+# ==============================
+#  Main Script
+# ==============================
+async def serve(args):
+    store = VectorStore()
+    batcher = SearchBatcher(store, window_ms=args.batch_window_ms,
+                            max_batch=args.max_batch)
+    query_cache = None if args.no_cache else QueryEmbeddingCache(
+        path=args.cache_file, namespace=args.backend)
+    coalescer = EmbeddingCoalescer(partial(get_embeddings, backend=args.backend),
+                                   args.model, cache=query_cache,
+                                   window_ms=args.coalesce_window_ms)
+    service = SearchService(store, batcher, coalescer, args.model, args.backend)
+
+    batch_task = asyncio.create_task(batcher.run())
+    server = await asyncio.start_server(make_handler(service), args.host, args.port)
+    print(f"[Serving] http://{args.host}:{args.port} with {len(store)} entries")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        batch_task.cancel()
+        if query_cache is not None:
+            query_cache.save()
+        close_clients()
+        print(f"[Latency] {json.dumps(service.latency.summary(), indent=2)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Long-running FAISS search server over the a6 store.")
+    parser.add_argument("--host", type=str, default=DEFAULT_HOST,
+                        help="Interface to bind.")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT,
+                        help="Port to listen on.")
+    parser.add_argument("--model", type=str, default="text-embedding-3-small",
+                        help="Embedding model to use.")
+    parser.add_argument("--backend", type=str, choices=sorted(BACKENDS),
+                        default=default_backend_name(),
+                        help="Embedding backend (default: $EMBEDDING_BACKEND or openai).")
+    parser.add_argument("--batch_window_ms", type=float, default=BATCH_WINDOW_MS,
+                        help="How long to gather concurrent queries into one search.")
+    parser.add_argument("--max_batch", type=int, default=MAX_BATCH_SIZE,
+                        help="Maximum queries per FAISS search call.")
+    parser.add_argument("--coalesce_window_ms", type=float, default=COALESCE_WINDOW_MS,
+                        help="How long to gather query embeddings into one API request.")
+    parser.add_argument("--cache_file", type=str, nargs="?", const=QUERY_CACHE_FILE,
+                        help=f"Persist the query cache across restarts (bare flag: {QUERY_CACHE_FILE}).")
+    parser.add_argument("--no_cache", action="store_true",
+                        help="Disable the in-memory query embedding cache (and --cache_file).")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        print("\n[Stopped] Search server shut down.")
+
+
+if __name__ == "__main__":
+    main()
+
+# ## **How to Use**
+
+# ### 1️⃣ Start the server next to your a6 store
+# ```bash
+# python a8_search_server.py --port 8765
+# ```
+
+# ### 2️⃣ Search
+# ```bash
+# curl -s -X POST localhost:8765/search -d '{"query": "France", "top_k": 3}'
+# curl -s -X POST localhost:8765/search -d '{"query": "AI", "filter_category": "technology"}'
+# ```
+
+# ### 3️⃣ Add and delete entries
+# ```bash
+# curl -s -X POST localhost:8765/add -d '{"title": "Rust", "category": "technology", "content": "Rust is a systems language."}'
+# curl -s -X POST localhost:8765/delete -d '{"doc_id": "your-doc-id-here"}'
+# ```
+
+# ### 4️⃣ Latency report
+# ```bash
+# curl -s localhost:8765/stats
+# ```
@@ -0,0 +1,223 @@
+"""
+dedup.py
+
+Duplicate detection for embedding ingest:
+- Exact duplicates: hash of the whitespace-normalized text
+- Near duplicates: MinHash signatures over token shingles from the tiktoken
+  encoding, bucketed with banded LSH and confirmed by estimated Jaccard similarity
+- Deduplicator: incremental, so a stored corpus can be seeded first and new
+  texts checked against it as they arrive; save()/load() persist the hashes,
+  signatures and LSH buckets next to an index so later runs only add new texts
+
+Each duplicate is mapped to the first text it matches (its canonical), which
+is embedded once and shared.
+
+Usage:
+    from dedup import Deduplicator
+
+    dedup = Deduplicator(encoding)
+    canonical = dedup.deduplicate(texts)   # canonical[i] == i for unique texts
+"""
+
+import hashlib
+import os
+import pickle
+from collections import defaultdict
+from typing import Dict, Hashable, List, Optional, Tuple
+import numpy as np
+import tiktoken
+
+# ==============================
+#  Configuration
+# ==============================
+NUM_PERMUTATIONS = 128
+LSH_BANDS = 32            # 32 bands x 4 rows: ~50% candidate rate at Jaccard 0.42, >99% at 0.8
+SHINGLE_TOKENS = 3       # tiktoken tokens are roughly words, so 3-token shingles ~ word trigrams
+NEAR_DUPLICATE_THRESHOLD = 0.8
+SEED = 1
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+_SHINGLE_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+def content_hash(text: str) -> str:
+    """SHA-1 of the text with whitespace runs collapsed."""
+    return hashlib.sha1(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+
+# ==============================
+#  MinHash
+# ==============================
+class MinHasher:
+    """MinHash signatures of token shingles with universal hashes (a*x + b) mod p."""
+
+    def __init__(self, encoding: tiktoken.Encoding, num_permutations: int = NUM_PERMUTATIONS,
+                 shingle_tokens: int = SHINGLE_TOKENS, seed: int = SEED):
+        self.encoding = encoding
+        self.shingle_tokens = shingle_tokens
+        rng = np.random.default_rng(seed)
+        # a, b < 2**32 and shingle hashes < 2**32 keep a*x + b inside uint64
+        self.a = rng.integers(1, 1 << 32, size=num_permutations, dtype="uint64")
+        self.b = rng.integers(0, 1 << 32, size=num_permutations, dtype="uint64")
+
+    def shingles(self, text: str) -> np.ndarray:
+        """Unique 32-bit hashes of the overlapping token n-grams of text."""
+        tokens = np.asarray(self.encoding.encode_ordinary(" ".join(text.lower().split())),
+                            dtype="uint64")
+        if len(tokens) == 0:
+            return tokens
+        width = min(self.shingle_tokens, len(tokens))
+        windows = np.lib.stride_tricks.sliding_window_view(tokens, width)
+        # Polynomial combination of the window; uint64 arithmetic wraps around
+        hashes = np.zeros(len(windows), dtype="uint64")
+        with np.errstate(over="ignore"):
+            for column in range(width):
+                hashes = hashes * _SHINGLE_MULTIPLIER + windows[:, column] + np.uint64(1)
+        return np.unique((hashes ^ (hashes >> np.uint64(32))) & _MAX_HASH)
+
+    def signature(self, text: str) -> np.ndarray:
+        shingles = self.shingles(text)
+        if len(shingles) == 0:
+            return np.full(len(self.a), _MAX_HASH, dtype="uint64")
+        hashed = (np.outer(shingles, self.a) + self.b) % _MERSENNE_PRIME & _MAX_HASH
+        return hashed.min(axis=0)
+
+
+def split_duplicates(canonical: List[int]) -> Tuple[List[int], Dict[int, List[int]]]:
+    """Positions to embed, and canonical position -> positions that reuse it."""
+    unique = [i for i, c in enumerate(canonical) if c == i]
+    duplicates: Dict[int, List[int]] = defaultdict(list)
+    for i, c in enumerate(canonical):
+        if c != i:
+            duplicates[c].append(i)
+    return unique, dict(duplicates)
+
+
+def estimated_jaccard(first: np.ndarray, second: np.ndarray) -> float:
+    return float(np.mean(first == second))
+
+
+# ==============================
+#  Deduplicator
+# ==============================
+class Deduplicator:
+    """
+    Maps each added text to the key of the first equivalent text seen.
+
+    add() returns None for a new text and the canonical key for an exact or
+    near duplicate (estimated Jaccard >= threshold).
+    """
+
+    def __init__(self, encoding: tiktoken.Encoding, threshold: float = NEAR_DUPLICATE_THRESHOLD,
+                 num_permutations: int = NUM_PERMUTATIONS, bands: int = LSH_BANDS,
+                 near_duplicates: bool = True):
+        if num_permutations % bands:
+            raise ValueError("num_permutations must be a multiple of bands.")
+        self.minhasher = MinHasher(encoding, num_permutations)
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_permutations // bands
+        self.near_duplicates = near_duplicates
+        self.exact: Dict[str, Hashable] = {}
+        self.signatures: Dict[Hashable, np.ndarray] = {}
+        self.buckets: List[Dict[bytes, List[Hashable]]] = [defaultdict(list) for _ in range(bands)]
+        # Keys of the stored texts this state covers, in store order. Kept by the
+        # caller (duplicates it drops are not stored) so a loaded state can tell
+        # which stored texts were added since it was saved.
+        self.keys: List[Hashable] = []
+        self.stats = {"exact": 0, "near": 0, "unique": 0}
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes()
+                for band in range(self.bands)]
+
+    def _find_near(self, signature: np.ndarray):
+        band_keys = self._band_keys(signature)
+        best_key, best_score = None, self.threshold
+        seen = set()
+        for band, band_key in enumerate(band_keys):
+            for candidate in self.buckets[band].get(band_key, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                score = estimated_jaccard(signature, self.signatures[candidate])
+                if score >= best_score:
+                    best_key, best_score = candidate, score
+        return best_key, band_keys
+
+    def add(self, text: str, key: Hashable) -> Optional[Hashable]:
+        digest = content_hash(text)
+        canonical = self.exact.get(digest)
+        if canonical is not None:
+            self.stats["exact"] += 1
+            return canonical
+
+        if self.near_duplicates:
+            signature = self.minhasher.signature(text)
+            canonical, band_keys = self._find_near(signature)
+            if canonical is not None:
+                self.exact[digest] = canonical
+                self.stats["near"] += 1
+                return canonical
+            self.signatures[key] = signature
+            for band, band_key in enumerate(band_keys):
+                self.buckets[band][band_key].append(key)
+
+        self.exact[digest] = key
+        self.stats["unique"] += 1
+        return None
+
+    def deduplicate(self, texts: List[str], start: int = 0) -> List[int]:
+        """
+        Add texts under keys start, start + 1, ...; return the canonical key
+        per text (equal to its own key when the text is new).
+        """
+        canonical = []
+        for offset, text in enumerate(texts):
+            key = start + offset
+            match = self.add(text, key)
+            canonical.append(key if match is None else match)
+        return canonical
+
+    def save(self, path: str):
+        with open(path, "wb") as f:
+            pickle.dump({"encoding": self.minhasher.encoding.name,
+                         "num_permutations": len(self.minhasher.a), "bands": self.bands,
+                         "shingle_tokens": self.minhasher.shingle_tokens,
+                         "near_duplicates": self.near_duplicates, "keys": self.keys,
+                         "exact": self.exact, "signatures": self.signatures,
+                         "buckets": [dict(bucket) for bucket in self.buckets]}, f)
+
+    @classmethod
+    def load(cls, path: str, encoding: tiktoken.Encoding,
+             threshold: float = NEAR_DUPLICATE_THRESHOLD, num_permutations: int = NUM_PERMUTATIONS,
+             bands: int = LSH_BANDS, near_duplicates: bool = True) -> Optional["Deduplicator"]:
+        """Load saved state, or None if it is missing or was built with other settings."""
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        dedup = cls(encoding, threshold, num_permutations, bands, near_duplicates)
+        if (state["encoding"], state["num_permutations"], state["bands"],
+                state["shingle_tokens"], state["near_duplicates"]) != (
+                encoding.name, num_permutations, bands,
+                dedup.minhasher.shingle_tokens, near_duplicates):
+            return None
+        dedup.keys = state["keys"]
+        dedup.exact = state["exact"]
+        dedup.signatures = state["signatures"]
+        for bucket, saved in zip(dedup.buckets, state["buckets"]):
+            bucket.update(saved)
+        return dedup
+
+    def reset_stats(self):
+        """Forget counts, e.g. after seeding with an already stored corpus."""
+        self.stats = dict.fromkeys(self.stats, 0)
+
+    def report(self) -> str:
+        total = sum(self.stats.values())
+        removed = self.stats["exact"] + self.stats["near"]
+        return (f"{total} texts -> {self.stats['unique']} unique "
+                f"({self.stats['exact']} exact, {self.stats['near']} near duplicates, "
+                f"{removed / total if total else 0.0:.1%} skipped)")
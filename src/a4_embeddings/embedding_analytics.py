@@ -0,0 +1,357 @@
+"""
+embedding_analytics.py
+
+Batched NumPy kernels behind the discovery lab (a7) for large embedding sets:
+- pair_metrics(): cosine, Euclidean and dot product for many index pairs at once
+- similarity_matrix(): full N x N cosine/dot matrix computed in row blocks
+- EmbeddingVocabulary: normalized vocabulary matrix with batched top-k lookups
+  (analogy completion), saved to disk and optionally FAISS-indexed
+- cluster_embeddings() / fit_projection_2d(): MiniBatchKMeans or FAISS k-means
+  and randomized PCA that stream over memory-mapped matrices
+- corpus_statistics(): chunked per-row / per-dimension statistics and
+  degenerate (zero or NaN) vector detection for whole stores
+
+All kernels take an (N, d) matrix of embeddings, one row per unique text, and
+work in float32 so tens of thousands of pairs cost a few matrix operations.
+"""
+
+import json
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+
+PAIR_BLOCK = 65_536   # pairs gathered per block in pair_metrics
+MATRIX_BLOCK = 2_048  # rows per block in similarity_matrix
+CHUNK_ROWS = 65_536   # rows streamed per step when projecting or labelling
+FIT_SAMPLE = 100_000  # rows sampled to fit the 2D projection
+MINIBATCH_ROWS = 8_192
+STATS_CHUNK_ROWS = 4_096  # float64 working copy stays ~50 MB at d=1536
+
+
+# ==============================
+#  Normalization
+# ==============================
+def row_norms(matrix: np.ndarray) -> np.ndarray:
+    """L2 norm of every row as float32."""
+    matrix = np.asarray(matrix, dtype="float32")
+    return np.sqrt(np.einsum("ij,ij->i", matrix, matrix))
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Unit-length float32 copy of matrix; all-zero rows stay zero."""
+    matrix = np.asarray(matrix, dtype="float32")
+    norms = row_norms(matrix)[:, None]
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+
+# ==============================
+#  Pairwise Similarity
+# ==============================
+def pair_metrics(matrix: np.ndarray, left: Sequence[int], right: Sequence[int],
+                 block_size: int = PAIR_BLOCK) -> Dict[str, np.ndarray]:
+    """
+    Metrics for the row pairs (left[i], right[i]). Dot products are gathered
+    block by block; cosine and Euclidean distance are derived from them and
+    the precomputed row norms, so no per-pair Python work is done.
+    """
+    matrix = np.asarray(matrix, dtype="float32")
+    left = np.asarray(left, dtype="int64")
+    right = np.asarray(right, dtype="int64")
+    norms = row_norms(matrix)
+
+    dot = np.empty(len(left), dtype="float32")
+    for start in range(0, len(left), block_size):
+        stop = start + block_size
+        dot[start:stop] = np.einsum(
+            "ij,ij->i", matrix[left[start:stop]], matrix[right[start:stop]])
+
+    norm_left, norm_right = norms[left], norms[right]
+    norm_product = norm_left * norm_right
+    cosine = np.divide(dot, norm_product, out=np.zeros_like(dot), where=norm_product > 0)
+    squared = np.maximum(norm_left * norm_left + norm_right * norm_right - 2.0 * dot, 0.0)
+    return {
+        "cosine_similarity": cosine,
+        "euclidean_distance": np.sqrt(squared),
+        "dot_product": dot,
+    }
+
+
+def similarity_blocks(matrix: np.ndarray, metric: str = "cosine",
+                      block_rows: int = MATRIX_BLOCK) -> Iterator[Tuple[int, np.ndarray]]:
+    """Yield (first_row, block) slices of the N x N similarity matrix."""
+    if metric not in ("cosine", "dot"):
+        raise ValueError(f"Unsupported metric '{metric}'. Use 'cosine' or 'dot'.")
+    matrix = normalize_rows(matrix) if metric == "cosine" else np.asarray(matrix, dtype="float32")
+    for start in range(0, len(matrix), block_rows):
+        yield start, matrix[start:start + block_rows] @ matrix.T
+
+
+def similarity_matrix(matrix: np.ndarray, metric: str = "cosine",
+                      block_rows: int = MATRIX_BLOCK,
+                      out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Full N x N similarity matrix. Pass a np.memmap as out to spill results to
+    disk; peak extra memory is then one block of block_rows x N.
+    """
+    size = len(matrix)
+    if out is None:
+        out = np.empty((size, size), dtype="float32")
+    for start, block in similarity_blocks(matrix, metric, block_rows):
+        out[start:start + len(block)] = block
+    return out
+
+
+# ==============================
+#  Vocabulary Nearest Neighbors
+# ==============================
+class EmbeddingVocabulary:
+    """
+    Normalized (V, d) vocabulary matrix for nearest-word lookups such as
+    analogy completion. Saved as <path>.npy + <path>.words.json so large
+    vocabularies can be reopened memory-mapped; build_faiss_index() swaps the
+    blocked matrix multiply for a FAISS inner-product index.
+    """
+
+    QUERY_BLOCK = 256  # queries scored per matrix multiply
+
+    def __init__(self, words: Sequence[str], matrix: np.ndarray, normalized: bool = False):
+        if len(words) != len(matrix):
+            raise ValueError(f"Got {len(words)} words for {len(matrix)} embedding rows.")
+        self.words = list(words)
+        self.matrix = matrix if normalized else normalize_rows(matrix)
+        self.row_of = {word: i for i, word in enumerate(self.words)}
+        self.faiss_index = None
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def save(self, path: str):
+        np.save(f"{path}.npy", np.asarray(self.matrix, dtype="float32"))
+        with open(f"{path}.words.json", "w", encoding="utf-8") as f:
+            json.dump(self.words, f, ensure_ascii=False)
+        print(f"[Saved] Vocabulary ({len(self.words)} words) -> {path}.npy")
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "EmbeddingVocabulary":
+        matrix = np.load(f"{path}.npy", mmap_mode="r" if mmap else None)
+        with open(f"{path}.words.json", "r", encoding="utf-8") as f:
+            words = json.load(f)
+        print(f"[Loaded] Vocabulary with {len(words)} words.")
+        return cls(words, matrix, normalized=True)
+
+    def build_faiss_index(self):
+        import faiss
+
+        self.faiss_index = faiss.IndexFlatIP(self.matrix.shape[1])
+        self.faiss_index.add(np.ascontiguousarray(self.matrix, dtype="float32"))
+        return self.faiss_index
+
+    def nearest(self, queries: np.ndarray, k: int = 1,
+                exclude: Optional[Sequence[Sequence[str]]] = None
+                ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k vocabulary rows by cosine similarity for each query row, skipping
+        the words listed in exclude[i] for query i. Returns (scores, rows),
+        both (Q, k); rows are -1 where fewer than k candidates remain.
+        """
+        queries = normalize_rows(np.atleast_2d(queries))
+        excluded = [[self.row_of[w] for w in words if w in self.row_of]
+                    for words in (exclude or [[]] * len(queries))]
+        extra = max((len(rows) for rows in excluded), default=0)
+        scores = np.full((len(queries), k), -np.inf, dtype="float32")
+        rows = np.full((len(queries), k), -1, dtype="int64")
+
+        for start in range(0, len(queries), self.QUERY_BLOCK):
+            block = queries[start:start + self.QUERY_BLOCK]
+            block_excluded = excluded[start:start + self.QUERY_BLOCK]
+            if self.faiss_index is not None:
+                # Over-fetch so that k results survive dropping the excluded words
+                block_scores, block_rows = self.faiss_index.search(
+                    block, min(k + extra, len(self.words)))
+                for offset, (found_scores, found_rows) in enumerate(zip(block_scores, block_rows)):
+                    keep = ~np.isin(found_rows, block_excluded[offset]) & (found_rows >= 0)
+                    found = found_rows[keep][:k]
+                    scores[start + offset, :len(found)] = found_scores[keep][:k]
+                    rows[start + offset, :len(found)] = found
+                continue
+
+            block_scores = block @ self.matrix.T
+            for offset, skip in enumerate(block_excluded):
+                block_scores[offset, skip] = -np.inf
+            top = min(k, len(self.words))
+            candidates = np.argpartition(-block_scores, top - 1, axis=1)[:, :top]
+            candidate_scores = np.take_along_axis(block_scores, candidates, axis=1)
+            order = np.argsort(-candidate_scores, axis=1)
+            best_rows = np.take_along_axis(candidates, order, axis=1)
+            best_scores = np.take_along_axis(candidate_scores, order, axis=1)
+            best_rows[~np.isfinite(best_scores)] = -1
+            scores[start:start + len(block), :top] = best_scores
+            rows[start:start + len(block), :top] = best_rows
+        return scores, rows
+
+
+def analogy_targets(emb_a: np.ndarray, emb_b: np.ndarray, emb_c: np.ndarray) -> np.ndarray:
+    """3CosAdd targets b - a + c for batches of analogies "a is to b as c is to ?"."""
+    return normalize_rows(emb_b) - normalize_rows(emb_a) + normalize_rows(emb_c)
+
+
+# ==============================
+#  Scalable Clustering
+# ==============================
+def sample_rows(matrix: np.ndarray, size: int, seed: int = 42) -> np.ndarray:
+    """Random rows (read in storage order, which keeps memmap access sequential)."""
+    if len(matrix) <= size:
+        return np.asarray(matrix, dtype="float32")
+    picks = np.sort(np.random.default_rng(seed).choice(len(matrix), size, replace=False))
+    return np.asarray(matrix[picks], dtype="float32")
+
+
+def iter_row_chunks(matrix: np.ndarray, chunk_rows: int = CHUNK_ROWS) -> Iterator[Tuple[int, np.ndarray]]:
+    for start in range(0, len(matrix), chunk_rows):
+        yield start, np.asarray(matrix[start:start + chunk_rows], dtype="float32")
+
+
+def fit_projection_2d(matrix: np.ndarray, sample_size: int = FIT_SAMPLE, seed: int = 42):
+    """Randomized PCA to 2D fitted on at most sample_size rows."""
+    from sklearn.decomposition import PCA
+
+    sample = sample_rows(matrix, sample_size, seed)
+    return PCA(n_components=2, svd_solver="randomized", random_state=seed).fit(sample)
+
+
+def project_2d(pca, matrix: np.ndarray, chunk_rows: int = CHUNK_ROWS) -> np.ndarray:
+    points = np.empty((len(matrix), 2), dtype="float32")
+    for start, chunk in iter_row_chunks(matrix, chunk_rows):
+        points[start:start + len(chunk)] = pca.transform(chunk)
+    return points
+
+
+def cluster_embeddings(matrix: np.ndarray, n_clusters: int, method: str = "minibatch",
+                       seed: int = 42, passes: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    K-means over a possibly memory-mapped (N, d) matrix with bounded memory.
+    Returns (labels, centers).
+
+    - "minibatch": sklearn MiniBatchKMeans fed MINIBATCH_ROWS rows per partial_fit
+    - "faiss":     faiss.Kmeans trained on a sample of about 256 rows per centroid
+    - "full":      exact sklearn KMeans(n_init=10); small inputs only
+
+    Labels are assigned chunk by chunk in every mode.
+    """
+    if len(matrix) < n_clusters:
+        raise ValueError(f"Need at least {n_clusters} embeddings, got {len(matrix)}.")
+    if method == "full":
+        from sklearn.cluster import KMeans
+
+        model = KMeans(n_clusters=n_clusters, random_state=seed, n_init=10)
+        labels = model.fit_predict(np.asarray(matrix, dtype="float32"))
+        return labels, model.cluster_centers_.astype("float32")
+
+    if method == "minibatch":
+        from sklearn.cluster import MiniBatchKMeans
+
+        model = MiniBatchKMeans(n_clusters=n_clusters, random_state=seed,
+                                batch_size=MINIBATCH_ROWS, n_init=3)
+        blocks = -(-len(matrix) // MINIBATCH_ROWS)
+        order = np.random.default_rng(seed).permutation(blocks)
+        for _ in range(passes):
+            # Visit blocks in shuffled order so sorted inputs do not bias the centroids
+            for block in order:
+                chunk = matrix[block * MINIBATCH_ROWS:(block + 1) * MINIBATCH_ROWS]
+                if len(chunk) >= n_clusters or blocks == 1:
+                    model.partial_fit(np.asarray(chunk, dtype="float32"))
+        centers = model.cluster_centers_.astype("float32")
+        assign = model.predict
+    elif method == "faiss":
+        import faiss
+
+        sample = sample_rows(matrix, n_clusters * 256, seed)
+        kmeans = faiss.Kmeans(sample.shape[1], n_clusters, niter=20, seed=seed,
+                              max_points_per_centroid=256)
+        kmeans.train(sample)
+        centers = kmeans.centroids.astype("float32")
+
+        def assign(chunk: np.ndarray) -> np.ndarray:
+            return kmeans.index.search(chunk, 1)[1][:, 0]
+    else:
+        raise ValueError(f"Unknown clustering method '{method}'. Use minibatch, faiss or full.")
+
+    labels = np.empty(len(matrix), dtype="int64")
+    for start, chunk in iter_row_chunks(matrix):
+        labels[start:start + len(chunk)] = assign(chunk)
+    return labels, centers
+
+
+# ==============================
+#  Corpus Statistics
+# ==============================
+def corpus_statistics(matrix: np.ndarray, chunk_rows: int = STATS_CHUNK_ROWS,
+                      zero_tol: float = 1e-12, per_row: bool = True) -> Dict:
+    """
+    Single streaming pass over an (N, d) matrix (np.memmap works) computing:
+    - per row: L2 norm, mean, std, min, max and zero/positive/negative counts
+    - per dimension: mean and std (merged Welford/Chan updates), min and max
+    - degenerate rows: near-zero norm or any NaN/inf component
+
+    Only one chunk is in memory at a time; per-row results are N-length
+    vectors (skip them with per_row=False for very large stores).
+    """
+    rows, dims = matrix.shape
+    count = 0
+    dim_mean = np.zeros(dims, dtype="float64")
+    dim_m2 = np.zeros(dims, dtype="float64")
+    dim_min = np.full(dims, np.inf, dtype="float64")
+    dim_max = np.full(dims, -np.inf, dtype="float64")
+    row_stats: Dict[str, np.ndarray] = {}
+    if per_row:
+        for name in ("norm", "mean", "std", "min", "max"):
+            row_stats[name] = np.empty(rows, dtype="float32")
+        for name in ("zero", "positive", "negative"):
+            row_stats[name] = np.empty(rows, dtype="int32")
+    zero_rows: List[np.ndarray] = []
+    nonfinite_rows: List[np.ndarray] = []
+
+    for start, chunk in iter_row_chunks(matrix, chunk_rows):
+        chunk64 = chunk.astype("float64")
+        finite = np.isfinite(chunk64).all(axis=1)
+        norms = np.sqrt(np.einsum("ij,ij->i", chunk64, chunk64))
+        nonfinite_rows.append(start + np.flatnonzero(~finite))
+        zero_rows.append(start + np.flatnonzero(finite & (norms <= zero_tol)))
+
+        if per_row:
+            stop = start + len(chunk)
+            row_stats["norm"][start:stop] = norms
+            row_stats["mean"][start:stop] = chunk64.mean(axis=1)
+            row_stats["std"][start:stop] = chunk64.std(axis=1)
+            row_stats["min"][start:stop] = chunk64.min(axis=1)
+            row_stats["max"][start:stop] = chunk64.max(axis=1)
+            row_stats["zero"][start:stop] = np.count_nonzero(chunk64 == 0, axis=1)
+            row_stats["positive"][start:stop] = np.count_nonzero(chunk64 > 0, axis=1)
+            row_stats["negative"][start:stop] = np.count_nonzero(chunk64 < 0, axis=1)
+
+        # Per-dimension statistics ignore rows with NaN/inf so one bad vector cannot poison them
+        good = chunk64[finite]
+        if len(good) == 0:
+            continue
+        chunk_mean = good.mean(axis=0)
+        chunk_m2 = ((good - chunk_mean) ** 2).sum(axis=0)
+        total = count + len(good)
+        delta = chunk_mean - dim_mean
+        dim_mean += delta * (len(good) / total)
+        dim_m2 += chunk_m2 + delta * delta * (count * len(good) / total)
+        count = total
+        np.minimum(dim_min, good.min(axis=0), out=dim_min)
+        np.maximum(dim_max, good.max(axis=0), out=dim_max)
+
+    return {
+        "rows": rows,
+        "dimensions": dims,
+        "per_row": row_stats,
+        "per_dimension": {
+            "mean": dim_mean.astype("float32"),
+            "std": np.sqrt(dim_m2 / count).astype("float32") if count else np.zeros(dims, "float32"),
+            "min": dim_min.astype("float32"),
+            "max": dim_max.astype("float32"),
+        },
+        "zero_rows": np.concatenate(zero_rows) if zero_rows else np.zeros(0, "int64"),
+        "nonfinite_rows": np.concatenate(nonfinite_rows) if nonfinite_rows else np.zeros(0, "int64"),
+    }
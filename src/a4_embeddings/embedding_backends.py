@@ -0,0 +1,204 @@
+"""
+embedding_backends.py
+
+Pluggable embedding backends shared by the a1-a8 embedding scripts:
+- EmbeddingBackend: common interface returning float32 matrices
+- OpenAIEmbeddingBackend: the OpenAI embeddings API through the shared pooled
+  client from embedding_client; embeddings arrive base64-encoded and are
+  decoded straight into one float32 matrix
+- HashingEmbeddingBackend: offline, deterministic feature hashing of word tokens
+
+Pick a backend with --backend on the CLIs or the EMBEDDING_BACKEND environment
+variable ("openai" by default, "hashing" for offline benchmarks and demos).
+"""
+
+import base64
+import hashlib
+import os
+import re
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Sequence, Tuple
+import numpy as np
+
+DEFAULT_MODEL = "text-embedding-3-small"
+DEFAULT_DIMENSIONS = 1536
+BACKEND_ENV_VAR = "EMBEDDING_BACKEND"
+RECORD_SEPARATOR = "\x00"
+
+
+# ==============================
+#  Backend Interface
+# ==============================
+class EmbeddingBackend(ABC):
+    """Turns a batch of texts into an (n, dimensions) float32 matrix."""
+
+    name = "base"
+
+    def __init__(self, model: str = DEFAULT_MODEL):
+        self.model = model
+
+    @abstractmethod
+    def embed_batch(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed texts; row i of the result belongs to texts[i]."""
+
+    def embed(self, text: str) -> np.ndarray:
+        return self.embed_batch([text])[0]
+
+
+# ==============================
+#  OpenAI API Backend
+# ==============================
+class OpenAIEmbeddingBackend(EmbeddingBackend):
+    name = "openai"
+
+    def __init__(self, model: str = DEFAULT_MODEL, client=None):
+        super().__init__(model)
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            # Process-wide pooled client shared by every backend instance
+            from embedding_client import get_openai_client
+            self._client = get_openai_client()
+        return self._client
+
+    def embed_batch(self, texts: Sequence[str]) -> np.ndarray:
+        # base64 skips the JSON float list and the per-value Python floats it would become
+        response = self.client.embeddings.create(model=self.model, input=list(texts),
+                                                 encoding_format="base64")
+        return decode_embeddings(response.data, len(texts))
+
+
+def decode_embeddings(rows, count: int) -> np.ndarray:
+    """
+    Decode API embedding rows into a preallocated (count, dims) float32 matrix.
+    Each base64 payload is viewed as little-endian float32 with np.frombuffer
+    and copied once, into its row (ordered by the row's index field).
+    """
+    matrix = None
+    for row in rows:
+        if isinstance(row.embedding, str):
+            vector = np.frombuffer(base64.b64decode(row.embedding), dtype="<f4")
+        else:  # float list from servers that ignore encoding_format
+            vector = np.asarray(row.embedding, dtype="float32")
+        if matrix is None:
+            matrix = np.empty((count, len(vector)), dtype="float32")
+        matrix[row.index] = vector
+    return matrix if matrix is not None else np.empty((0, 0), dtype="float32")
+
+
+# ==============================
+#  Offline Hashing Backend
+# ==============================
+class HashingEmbeddingBackend(EmbeddingBackend):
+    """
+    Feature hashing ("hashing trick"): every lowercase word token is hashed to a
+    fixed column and a +/-1 sign, counts are summed per text and each row is
+    L2-normalized. Stable across processes (blake2b, not Python's salted hash),
+    free of global RNG state, and texts sharing words land close together.
+    """
+
+    name = "hashing"
+    SCAN_PATTERN = re.compile(r"\w+|" + RECORD_SEPARATOR)
+    CHUNK_ROWS = 4096  # rows accumulated per bincount call
+    MAX_TOKEN_SLOTS = 1_000_000  # memoized token hashes kept before the memo is reset
+
+    def __init__(self, model: str = DEFAULT_MODEL, dimensions: int = DEFAULT_DIMENSIONS):
+        super().__init__(model)
+        self.dimensions = dimensions
+        self.token_slots: Dict[str, int] = {RECORD_SEPARATOR: 0}
+
+    def _slot(self, token: str) -> int:
+        """Signed column for a token: +(col + 1) or -(col + 1)."""
+        digest = int.from_bytes(hashlib.blake2b(
+            token.encode("utf-8"), digest_size=8).digest(), "little")
+        column = digest % self.dimensions
+        return column + 1 if (digest >> 63) == 0 else -(column + 1)
+
+    def _chunk_slots(self, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Row number and signed slot of every token in a chunk of texts."""
+        joined = RECORD_SEPARATOR.join(texts).lower()
+        if joined.count(RECORD_SEPARATOR) != len(texts) - 1:
+            # Some text contains the separator itself: blank it out so rows stay aligned
+            joined = RECORD_SEPARATOR.join(
+                t.replace(RECORD_SEPARATOR, " ") for t in texts).lower()
+
+        # One regex pass over the whole chunk; separators mark row boundaries
+        flat_tokens = self.SCAN_PATTERN.findall(joined)
+        # Shared instances run on several threads: this chunk keeps using the memo
+        # it started with even if another thread swaps in a fresh one meanwhile
+        memo = self.token_slots
+        new_tokens = set(flat_tokens).difference(memo)
+        if len(memo) + len(new_tokens) > self.MAX_TOKEN_SLOTS:
+            # Long-running servers see an open-ended vocabulary: start the memo over
+            memo = {RECORD_SEPARATOR: 0}
+            self.token_slots = memo
+            new_tokens = set(flat_tokens).difference(memo)
+        for token in new_tokens:
+            memo[token] = self._slot(token)
+
+        slots = np.fromiter(map(memo.__getitem__, flat_tokens),
+                            dtype="int64", count=len(flat_tokens))
+        is_separator = slots == 0
+        rows = np.cumsum(is_separator)
+        keep = ~is_separator
+        return rows[keep], slots[keep]
+
+    def embed_batch(self, texts: Sequence[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dimensions), dtype="float32")
+        for start in range(0, len(texts), self.CHUNK_ROWS):
+            rows, slots = self._chunk_slots(texts[start:start + self.CHUNK_ROWS])
+            if slots.size == 0:
+                continue
+            # Sum signed counts per (row, column) on the sparse entries only
+            flat_positions = (rows + start) * self.dimensions + (np.abs(slots) - 1)
+            positions, inverse = np.unique(flat_positions, return_inverse=True)
+            values = np.bincount(inverse, weights=np.sign(slots)).astype("float32")
+
+            value_rows = positions // self.dimensions
+            squared_norms = np.bincount(value_rows - start, weights=values * values)
+            norms = np.sqrt(squared_norms[value_rows - start]).astype("float32")
+            out.ravel()[positions] = np.divide(
+                values, norms, out=np.zeros_like(values), where=norms > 0)
+        return out
+
+
+# ==============================
+#  Backend Registry
+# ==============================
+BACKENDS = {
+    OpenAIEmbeddingBackend.name: OpenAIEmbeddingBackend,
+    HashingEmbeddingBackend.name: HashingEmbeddingBackend,
+}
+
+_backend_instances: Dict[Tuple[str, str], EmbeddingBackend] = {}
+
+
+def default_backend_name() -> str:
+    return os.getenv(BACKEND_ENV_VAR, OpenAIEmbeddingBackend.name)
+
+
+def get_backend(name: Optional[str] = None, model: str = DEFAULT_MODEL) -> EmbeddingBackend:
+    """Return the shared backend instance for (name, model)."""
+    name = name or default_backend_name()
+    if name not in BACKENDS:
+        raise ValueError(
+            f"Unknown embedding backend '{name}'. Choose from: {', '.join(sorted(BACKENDS))}")
+    key = (name, model)
+    if key not in _backend_instances:
+        _backend_instances[key] = BACKENDS[name](model=model)
+    return _backend_instances[key]
+
+
+if __name__ == "__main__":
+    import time
+
+    backend = get_backend("hashing")
+    sample_texts = [f"Sample document {i} about vector search and tokenization speed"
+                    for i in range(100_000)]
+    start = time.perf_counter()
+    matrix = backend.embed_batch(sample_texts)
+    elapsed = time.perf_counter() - start
+    print(f"Backend: {backend.name} | Shape: {matrix.shape} | dtype: {matrix.dtype}")
+    print(f"Throughput: {len(sample_texts) / elapsed:,.0f} texts/sec")
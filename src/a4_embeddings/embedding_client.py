@@ -0,0 +1,116 @@
+"""
+embedding_client.py
+
+Shared OpenAI client factory for the embedding scripts:
+- One client per configuration for the whole process, so every backend,
+  lab and server request reuses the same connection pool
+- Tuned httpx pool: keep-alive connections, bounded connection count and
+  HTTP/2 multiplexing (h2 is in requirements.txt; without it the client falls
+  back to HTTP/1.1 and says so once)
+- Explicit connect/read timeouts and SDK retry count
+
+Settings come from keyword arguments or OPENAI_* environment variables:
+    OPENAI_MAX_CONNECTIONS, OPENAI_MAX_KEEPALIVE, OPENAI_CONNECT_TIMEOUT,
+    OPENAI_READ_TIMEOUT, OPENAI_MAX_RETRIES, OPENAI_HTTP2 (set to 0 to disable)
+
+Usage:
+    from embedding_client import get_openai_client
+
+    client = get_openai_client()
+    client.embeddings.create(model="text-embedding-3-small", input=texts)
+
+HTTP/2 needs:  pip install "httpx[http2]"
+"""
+
+import importlib.util
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+# ==============================
+#  Configuration
+# ==============================
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_MAX_KEEPALIVE = 20
+KEEPALIVE_EXPIRY = 30.0  # seconds an idle connection stays in the pool
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_READ_TIMEOUT = 60.0
+DEFAULT_MAX_RETRIES = 3
+
+_clients: Dict[Tuple, object] = {}
+_lock = threading.Lock()
+_http2_warned = False
+
+
+def _env_number(name: str, default, cast=float):
+    value = os.getenv(name)
+    return cast(value) if value else default
+
+
+def http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+def client_settings(**overrides) -> Dict:
+    """Effective pool/timeout settings: keyword overrides, then env vars, then defaults."""
+    settings = {
+        "max_connections": _env_number("OPENAI_MAX_CONNECTIONS", DEFAULT_MAX_CONNECTIONS, int),
+        "max_keepalive": _env_number("OPENAI_MAX_KEEPALIVE", DEFAULT_MAX_KEEPALIVE, int),
+        "connect_timeout": _env_number("OPENAI_CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT),
+        "read_timeout": _env_number("OPENAI_READ_TIMEOUT", DEFAULT_READ_TIMEOUT),
+        "max_retries": _env_number("OPENAI_MAX_RETRIES", DEFAULT_MAX_RETRIES, int),
+        "http2": os.getenv("OPENAI_HTTP2", "1") != "0",
+    }
+    settings.update({key: value for key, value in overrides.items() if value is not None})
+    if settings["http2"] and not http2_available():
+        global _http2_warned
+        if not _http2_warned:
+            print("[Warning] HTTP/2 requested but the h2 package is not installed; "
+                  "using HTTP/1.1 (pip install \"httpx[http2]\" or set OPENAI_HTTP2=0).")
+            _http2_warned = True
+        settings["http2"] = False
+    return settings
+
+
+def make_http_client(settings: Dict):
+    import httpx
+
+    return httpx.Client(
+        http2=settings["http2"],
+        limits=httpx.Limits(max_connections=settings["max_connections"],
+                            max_keepalive_connections=settings["max_keepalive"],
+                            keepalive_expiry=KEEPALIVE_EXPIRY),
+        timeout=httpx.Timeout(settings["read_timeout"], connect=settings["connect_timeout"]),
+    )
+
+
+def get_openai_client(api_key: Optional[str] = None, base_url: Optional[str] = None,
+                      **overrides):
+    """Return the shared OpenAI client for this key, base URL and pool settings."""
+    api_key = api_key or os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError(
+            "Missing OpenAI API key. Please set the environment variable 'OPENAI_API_KEY'."
+        )
+    base_url = base_url or os.getenv("OPENAI_BASE_URL")
+    settings = client_settings(**overrides)
+    key = (api_key, base_url, tuple(sorted(settings.items())))
+
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            from openai import OpenAI
+
+            client = OpenAI(api_key=api_key, base_url=base_url,
+                            max_retries=settings["max_retries"],
+                            http_client=make_http_client(settings))
+            _clients[key] = client
+    return client
+
+
+def close_clients():
+    """Close every pooled connection (e.g. before a long-running server exits)."""
+    with _lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
@@ -0,0 +1,180 @@
+"""
+index_builder.py
+
+Streaming FAISS index construction:
+- IndexBuilder.add_batches() consumes any iterator of float32 batches (e.g.
+  embedding API responses) and adds them in fixed-size chunks, so no Python
+  list of all vectors and no full-size cast copy ever exist
+- Chunks are added on a background thread while the next batches are being
+  produced; indexes that need training (int8, PQ) are trained there on the
+  first train_rows vectors, overlapping with ingest
+- faiss.omp_set_num_threads() sets the parallelism of train/add
+- Reports vectors/sec
+
+Peak memory is the index itself plus at most max_pending chunks (and, for
+untrained indexes, the training sample until training is queued).
+
+Usage:
+    python index_builder.py --vectors vectors.npy --output faiss_index.bin --compression pq --threads 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Deque, Dict, Iterable, List, Optional
+import numpy as np
+from vector_quantization import COMPRESSION_MODES, PQ_SUBQUANTIZERS, add_to_index, make_index
+
+if TYPE_CHECKING:
+    import faiss
+
+# ==============================
+#  Configuration
+# ==============================
+CHUNK_ROWS = 65_536
+TRAIN_ROWS = 100_000  # vectors sampled from the start of the stream for training
+MAX_PENDING = 2       # chunks queued behind the one being added
+
+
+# ==============================
+#  Index Builder
+# ==============================
+class IndexBuilder:
+    """
+    Adds batches of vectors to an index chunk by chunk. One worker thread
+    runs training and adds in submission order; the caller blocks only when
+    max_pending chunks are already waiting.
+    """
+
+    def __init__(self, index: faiss.Index, chunk_rows: int = CHUNK_ROWS,
+                 threads: Optional[int] = None, vectors_path: Optional[str] = None,
+                 train_rows: int = TRAIN_ROWS, max_pending: int = MAX_PENDING):
+        import faiss
+
+        if threads:
+            faiss.omp_set_num_threads(threads)
+        self.index = index
+        self.chunk_rows = chunk_rows
+        self.vectors_path = vectors_path
+        self.train_rows = train_rows
+        self.max_pending = max_pending
+        self.threads = faiss.omp_get_max_threads()
+
+    def _add(self, chunk: np.ndarray):
+        if self.vectors_path:
+            add_to_index(self.index, chunk, self.vectors_path)
+        else:
+            self.index.add(chunk)
+
+    def add_batches(self, batches: Iterable[np.ndarray]) -> Dict:
+        start = time.perf_counter()
+        added = 0
+        pending: Deque[Future] = deque()
+        # Chunks held back until the training sample is complete
+        untrained: List[np.ndarray] = [] if not self.index.is_trained else None
+
+        with ThreadPoolExecutor(max_workers=1) as worker:
+            def submit(task, *args):
+                pending.append(worker.submit(task, *args))
+                while len(pending) > self.max_pending:
+                    pending.popleft().result()
+
+            def flush(chunk: np.ndarray):
+                nonlocal untrained
+                if untrained is None:
+                    submit(self._add, chunk)
+                    return
+                untrained.append(chunk)
+                if sum(len(c) for c in untrained) >= self.train_rows:
+                    self._start_training(untrained, submit)
+                    untrained = None
+
+            buffer = np.empty((self.chunk_rows, self.index.d), dtype="float32")
+            filled = 0
+            for batch in batches:
+                batch = np.asarray(batch, dtype="float32")  # no copy for float32 input
+                offset = 0
+                while offset < len(batch):
+                    take = min(len(batch) - offset, self.chunk_rows - filled)
+                    buffer[filled:filled + take] = batch[offset:offset + take]
+                    filled += take
+                    offset += take
+                    if filled == self.chunk_rows:
+                        flush(buffer)
+                        added += filled
+                        # The full buffer now belongs to the worker; start a fresh one
+                        buffer = np.empty_like(buffer)
+                        filled = 0
+            if filled:
+                flush(buffer[:filled])
+                added += filled
+            if untrained:
+                self._start_training(untrained, submit)
+            while pending:
+                pending.popleft().result()
+
+        elapsed = time.perf_counter() - start
+        stats = {
+            "vectors": added,
+            "seconds": elapsed,
+            "vectors_per_second": added / elapsed if elapsed > 0 else 0.0,
+            "threads": self.threads,
+        }
+        print(f"[Info] Added {added:,} vectors in {elapsed:.2f}s "
+              f"({stats['vectors_per_second']:,.0f} vectors/s, {self.threads} threads)")
+        return stats
+
+    def _start_training(self, chunks: List[np.ndarray], submit):
+        sample = np.concatenate(chunks)[:self.train_rows]
+        submit(self.index.train, sample)
+        for chunk in chunks:
+            submit(self._add, chunk)
+
+
+def iter_array_batches(vectors: np.ndarray, batch_rows: int = CHUNK_ROWS) -> Iterable[np.ndarray]:
+    """Slices of a (possibly memory-mapped) matrix; only one slice is resident at a time."""
+    for start in range(0, len(vectors), batch_rows):
+        yield vectors[start:start + batch_rows]
+
+
+# ==============================
+#  Main Script
+# ==============================
+def main():
+    import faiss
+
+    parser = argparse.ArgumentParser(
+        description="Build a FAISS index from a .npy vector file in streamed chunks.")
+    parser.add_argument("--vectors", type=str, required=True,
+                        help="float32 .npy matrix (memory-mapped, never loaded whole).")
+    parser.add_argument("--output", type=str, default="faiss_index.bin",
+                        help="Where to write the index.")
+    parser.add_argument("--compression", type=str, choices=COMPRESSION_MODES, default="none",
+                        help="Index type: none (float32), fp16, int8 or pq.")
+    parser.add_argument("--pq_subquantizers", type=int, default=PQ_SUBQUANTIZERS,
+                        help="PQ bytes per vector (must divide the dimension).")
+    parser.add_argument("--vectors_file", type=str,
+                        help="Also write float32 originals for re-ranking (compressed modes).")
+    parser.add_argument("--chunk_rows", type=int, default=CHUNK_ROWS,
+                        help="Vectors per index.add call.")
+    parser.add_argument("--train_rows", type=int, default=TRAIN_ROWS,
+                        help="Vectors used to train int8/PQ indexes.")
+    parser.add_argument("--threads", type=int,
+                        help="FAISS OpenMP threads (default: all cores).")
+    args = parser.parse_args()
+
+    vectors = np.load(args.vectors, mmap_mode="r")
+    print(f"[Info] {vectors.shape[0]:,} x {vectors.shape[1]} vectors from {args.vectors}")
+    index = make_index(vectors.shape[1], args.compression, args.pq_subquantizers)
+    builder = IndexBuilder(index, chunk_rows=args.chunk_rows, threads=args.threads,
+                           vectors_path=args.vectors_file, train_rows=args.train_rows)
+    builder.add_batches(iter_array_batches(vectors, args.chunk_rows))
+    faiss.write_index(index, args.output)
+    print(f"[Saved] Index -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+lexical_index.py
+
+In-process BM25 keyword search for the a6 store:
+- BM25Index: inverted index over tiktoken token IDs (the same tokenizer the
+  embedding scripts count with), persisted next to the FAISS index
+- reciprocal_rank_fusion(): merges lexical and vector rankings into one list
+
+Exact-term queries (product codes, names) rank well lexically, and a
+lexical-only search never calls the embedding API.
+
+Usage:
+    from lexical_index import BM25Index, reciprocal_rank_fusion
+
+    lexical = BM25Index(encoding)
+    lexical.add([entry["content"] for entry in metadata], [entry["doc_id"] for entry in metadata])
+    ranked = lexical.search("SKU-4471", k=5)   # [(position, score), ...]
+"""
+
+import os
+import pickle
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import tiktoken
+
+# ==============================
+#  Configuration
+# ==============================
+BM25_K1 = 1.5
+BM25_B = 0.75
+RRF_K = 60  # standard reciprocal-rank-fusion damping constant
+
+
+# ==============================
+#  BM25 Inverted Index
+# ==============================
+class BM25Index:
+    """
+    Okapi BM25 over token IDs. Documents are addressed by position, which
+    matches the row of the FAISS index and of the metadata list; doc_ids
+    are kept so a caller can check the index still lines up with its store.
+    """
+
+    def __init__(self, encoding: tiktoken.Encoding, k1: float = BM25_K1, b: float = BM25_B):
+        self.encoding = encoding
+        self.k1 = k1
+        self.b = b
+        self.doc_lengths: List[int] = []
+        self.doc_ids: List[str] = []
+        # term -> (positions, term frequencies), appended in position order
+        self.postings: Dict[int, Tuple[List[int], List[int]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def terms(self, text: str) -> List[int]:
+        # Lowercase and give every word a leading space so "Paris", " paris"
+        # and "paris," at the start of a text map to the same token
+        return self.encoding.encode_ordinary(" " + " ".join(text.lower().split()))
+
+    def add(self, texts: Sequence[str], doc_ids: Optional[Sequence[str]] = None):
+        for offset, text in enumerate(texts):
+            position = len(self.doc_lengths)
+            self.doc_ids.append(doc_ids[offset] if doc_ids is not None else str(position))
+            terms = self.terms(text)
+            self.doc_lengths.append(len(terms))
+            for term, frequency in Counter(terms).items():
+                positions, frequencies = self.postings.setdefault(term, ([], []))
+                positions.append(position)
+                frequencies.append(frequency)
+
+    def search(self, query: str, k: int,
+               allowed: Optional[Callable[[int], bool]] = None) -> List[Tuple[int, float]]:
+        """Top-k (position, score) pairs; allowed() can drop positions (metadata filters)."""
+        if not self.doc_lengths:
+            return []
+        lengths = np.asarray(self.doc_lengths, dtype="float32")
+        length_norm = self.k1 * (1.0 - self.b + self.b * lengths / max(lengths.mean(), 1.0))
+        scores = np.zeros(len(lengths), dtype="float32")
+        for term in set(self.terms(query)):
+            if term not in self.postings:
+                continue
+            positions, frequencies = (np.asarray(column) for column in self.postings[term])
+            idf = np.log(1.0 + (len(lengths) - len(positions) + 0.5) / (len(positions) + 0.5))
+            scores[positions] += idf * frequencies * (self.k1 + 1.0) / (frequencies + length_norm[positions])
+
+        matched = np.flatnonzero(scores)
+        ranked = matched[np.argsort(-scores[matched], kind="stable")]
+        results = []
+        for position in ranked.tolist():
+            if allowed is None or allowed(position):
+                results.append((position, float(scores[position])))
+                if len(results) >= k:
+                    break
+        return results
+
+    def save(self, path: str):
+        with open(path, "wb") as f:
+            pickle.dump({"encoding": self.encoding.name, "k1": self.k1, "b": self.b,
+                         "doc_lengths": self.doc_lengths, "doc_ids": self.doc_ids,
+                         "postings": self.postings}, f)
+
+    @classmethod
+    def load(cls, path: str, encoding: tiktoken.Encoding) -> Optional["BM25Index"]:
+        """Load a saved index, or None if it is missing or built with another encoding."""
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        if state["encoding"] != encoding.name:
+            return None
+        index = cls(encoding, state["k1"], state["b"])
+        index.doc_lengths = state["doc_lengths"]
+        index.doc_ids = state["doc_ids"]
+        index.postings = state["postings"]
+        return index
+
+
+# ==============================
+#  Rank Fusion
+# ==============================
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], k: int = RRF_K) -> List[Tuple[int, float]]:
+    """Fuse ranked position lists: score = sum of 1 / (k + rank) over the lists."""
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, position in enumerate(ranking, start=1):
+            fused[position] = fused.get(position, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: -item[1])
@@ -0,0 +1,196 @@
+"""
+query_cache.py
+
+Query-side embedding reuse for the a4-a8 search tools:
+- QueryEmbeddingCache: bounded LRU of query embeddings, optionally persisted to disk
+- EmbeddingCoalescer: merges concurrent query embeddings into one API request
+"""
+
+from __future__ import annotations
+
+import os
+import pickle
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+if TYPE_CHECKING:
+    import asyncio
+
+DEFAULT_MAX_ENTRIES = 10_000
+
+EmbedFn = Callable[[str, str], Sequence[float]]
+EmbedBatchFn = Callable[[List[str], str], Sequence[Sequence[float]]]
+
+
+# ==============================
+#  LRU Query Cache
+# ==============================
+class QueryEmbeddingCache:
+    """
+    Bounded LRU of float32 query embeddings keyed by (namespace, model, text),
+    where the namespace is the embedding backend name so offline and API
+    vectors never mix. When a path is given, the cache is loaded on start and
+    written back by save() whenever put() added something since the last save.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, path: Optional[str] = None,
+                 namespace: str = "openai"):
+        self.max_entries = max_entries
+        self.path = path
+        self.namespace = namespace
+        self.entries: "OrderedDict[Tuple[str, str, str], np.ndarray]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.dirty = False
+        if path and os.path.exists(path):
+            self._load()
+
+    def get(self, text: str, model: str) -> Optional[np.ndarray]:
+        key = (self.namespace, model, text)
+        embedding = self.entries.get(key)
+        if embedding is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return embedding
+
+    def put(self, text: str, model: str, embedding: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype="float32")
+        key = (self.namespace, model, text)
+        self.entries[key] = vector
+        self.entries.move_to_end(key)
+        self.dirty = True
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return vector
+
+    def get_or_embed(self, text: str, model: str, embed_fn: EmbedFn) -> np.ndarray:
+        """Return the cached embedding, calling embed_fn(text, model) only on a miss."""
+        embedding = self.get(text, model)
+        if embedding is None:
+            embedding = self.put(text, model, embed_fn(text, model))
+        return embedding
+
+    def get_or_embed_many(self, texts: List[str], model: str,
+                          embed_batch_fn: EmbedBatchFn) -> List[np.ndarray]:
+        """Batch variant: all misses are embedded with a single embed_batch_fn call."""
+        found = {text: self.get(text, model) for text in dict.fromkeys(texts)}
+        missing = [text for text, embedding in found.items() if embedding is None]
+        if missing:
+            for text, embedding in zip(missing, embed_batch_fn(missing, model)):
+                found[text] = self.put(text, model, embedding)
+        return [found[text] for text in texts]
+
+    def save(self):
+        # Hits only reorder the LRU; not worth rewriting the whole file for
+        if not self.path or not self.dirty:
+            return
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "wb") as f:
+            pickle.dump(list(self.entries.items()), f)
+        os.replace(temp_path, self.path)
+        self.dirty = False
+
+    def _load(self):
+        with open(self.path, "rb") as f:
+            for key, vector in pickle.load(f)[-self.max_entries:]:
+                self.entries[key] = vector
+        print(f"[Loaded] Query cache with {len(self.entries)} entries.")
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+# ==============================
+#  Request Coalescing
+# ==============================
+class EmbeddingCoalescer:
+    """
+    Async front-end for server mode. Queries that arrive within window_ms are
+    embedded together in one embed_batch_fn call; identical in-flight texts
+    share a single result, and finished embeddings land in the cache.
+    """
+
+    def __init__(self, embed_batch_fn: EmbedBatchFn, model: str,
+                 cache: Optional[QueryEmbeddingCache] = None,
+                 window_ms: float = 5.0, max_batch: int = 256):
+        self.embed_batch_fn = embed_batch_fn
+        self.model = model
+        self.cache = cache
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self.pending: Dict[str, asyncio.Future] = {}
+        self.flush_handle: Optional[asyncio.TimerHandle] = None
+        self.requests = 0
+        self.api_calls = 0
+
+    async def embed(self, text: str) -> np.ndarray:
+        if self.cache is not None:
+            cached = self.cache.get(text, self.model)
+            if cached is not None:
+                return cached
+
+        import asyncio  # only server mode coalesces; the CLIs skip this import
+
+        future = self.pending.get(text)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self.pending[text] = future
+            self.requests += 1
+            if len(self.pending) >= self.max_batch:
+                self._schedule_flush(loop, delay=0)
+            elif self.flush_handle is None:
+                self._schedule_flush(loop, delay=self.window)
+        return await asyncio.shield(future)
+
+    def _schedule_flush(self, loop: asyncio.AbstractEventLoop, delay: float):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+        self.flush_handle = loop.call_later(
+            delay, lambda: loop.create_task(self._flush()))
+
+    async def _flush(self):
+        self.flush_handle = None
+        batch, self.pending = self.pending, {}
+        if not batch:
+            return
+        import asyncio
+
+        texts = list(batch)
+        loop = asyncio.get_running_loop()
+        try:
+            embeddings = await loop.run_in_executor(
+                None, self.embed_batch_fn, texts, self.model)
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.api_calls += 1
+        for text, embedding in zip(texts, embeddings):
+            if self.cache is not None:
+                vector = self.cache.put(text, self.model, embedding)
+            else:
+                vector = np.asarray(embedding, dtype="float32")
+            if not batch[text].done():
+                batch[text].set_result(vector)
+
+    def stats(self) -> Dict:
+        return {
+            "requests": self.requests,
+            "api_calls": self.api_calls,
+            "avg_batch_size": self.requests / self.api_calls if self.api_calls else 0.0,
+        }
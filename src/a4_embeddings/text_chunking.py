@@ -0,0 +1,131 @@
+"""
+text_chunking.py
+
+Token-bounded chunking of long documents before embedding:
+- chunk_text(): one streaming pass that yields chunks of at most max_tokens
+  tokens, optionally overlapping, cut on token boundaries that do not split
+  a multi-byte UTF-8 character
+- iter_file_blocks(): feed chunk_text() from a file without reading it whole
+
+Text is encoded in whitespace-aligned segments of a few KB, so every character
+is tokenized once and a huge document never sits in memory as one token list.
+
+Usage:
+    from text_chunking import chunk_text
+
+    for chunk in chunk_text(long_text, encoding, max_tokens=512, overlap=64):
+        print(chunk["chunk_index"], chunk["token_count"], chunk["text"][:40])
+
+    python text_chunking.py   # round-trip check on mixed-script sample text
+"""
+
+from typing import Dict, Iterable, Iterator, List, Union
+import tiktoken
+
+# ==============================
+#  Configuration
+# ==============================
+EMBEDDING_TOKEN_LIMIT = 8191  # input limit of the OpenAI embedding models
+SEGMENT_CHARS = 4096
+BLOCK_CHARS = 1 << 20
+
+
+def iter_file_blocks(path: str, block_chars: int = BLOCK_CHARS) -> Iterator[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        while True:
+            block = f.read(block_chars)
+            if not block:
+                return
+            yield block
+
+
+def _iter_segments(pieces: Iterable[str], segment_chars: int = SEGMENT_CHARS) -> Iterator[str]:
+    """Regroup text pieces into segments that end right before whitespace."""
+    carry = ""
+    for piece in pieces:
+        carry += piece
+        while len(carry) > segment_chars:
+            # tiktoken attaches a leading space to the following word, so cutting
+            # before whitespace keeps segment tokens identical to whole-text tokens
+            cut = max(carry.rfind(" ", 1, segment_chars + 1),
+                      carry.rfind("\n", 1, segment_chars + 1),
+                      carry.rfind("\t", 1, segment_chars + 1))
+            if cut <= 0:
+                cut = segment_chars  # no whitespace at all: hard cut
+            yield carry[:cut]
+            carry = carry[cut:]
+    if carry:
+        yield carry
+
+
+def _clean_cut(encoding: tiktoken.Encoding, tokens: List[int], position: int) -> int:
+    """
+    Move a cut back until tokens[position] does not start with a UTF-8
+    continuation byte: byte-level BPE tokens can hold part of a character
+    (CJK, emoji), and decoding half of one gives U+FFFD.
+    """
+    cut = position
+    while 0 < cut < len(tokens) and 0x80 <= encoding.decode_single_token_bytes(tokens[cut])[0] < 0xC0:
+        cut -= 1
+    return cut
+
+
+def chunk_text(text: Union[str, Iterable[str]], encoding: tiktoken.Encoding,
+               max_tokens: int = EMBEDDING_TOKEN_LIMIT, overlap: int = 0) -> Iterator[Dict]:
+    """
+    Yield {"chunk_index", "text", "token_count", "token_start"} dicts.
+
+    text may be a string or any iterable of string pieces (e.g.
+    iter_file_blocks()). Each chunk holds at most max_tokens tokens and
+    repeats the last `overlap` tokens of the chunk before it. Cuts that would
+    split a character move back to the previous character boundary, so a
+    chunk can be a few tokens shorter and an overlap a few tokens longer.
+    """
+    if max_tokens <= 0 or not 0 <= overlap < max_tokens:
+        raise ValueError("Need max_tokens > 0 and 0 <= overlap < max_tokens.")
+    pieces = [text] if isinstance(text, str) else text
+
+    buffer = []
+    chunk_index = 0
+    token_start = 0
+    emitted = 0  # leading buffer tokens already part of an emitted chunk
+
+    def make_chunk(tokens):
+        return {
+            "chunk_index": chunk_index,
+            "text": encoding.decode(tokens),
+            "token_count": len(tokens),
+            "token_start": token_start,
+        }
+
+    for segment in _iter_segments(pieces):
+        buffer.extend(encoding.encode_ordinary(segment))
+        while len(buffer) > max_tokens:
+            end = _clean_cut(encoding, buffer, max_tokens) or max_tokens
+            yield make_chunk(buffer[:end])
+            start = _clean_cut(encoding, buffer, end - overlap)
+            if start <= 0:
+                start = end  # overlap would not advance: drop it for this chunk
+            del buffer[:start]
+            emitted = end - start
+            chunk_index += 1
+            token_start += start
+
+    # The tail is only new text if it goes beyond the overlap already emitted
+    if buffer and (chunk_index == 0 or len(buffer) > emitted):
+        yield make_chunk(buffer)
+
+
+if __name__ == "__main__":
+    sample = ("Tokenizers split text into subword units. "
+              "素早い茶色の狐がのろまな犬を飛び越える。 "
+              "Быстрая коричневая лиса прыгает через ленивую собаку. "
+              "🦊🐶 emoji travel as several byte-level tokens. ") * 200
+    encoding = tiktoken.get_encoding("cl100k_base")
+    for max_tokens, overlap in ((7, 0), (16, 4), (512, 64)):
+        chunks = list(chunk_text(sample, encoding, max_tokens, overlap))
+        assert all("\ufffd" not in chunk["text"] for chunk in chunks), "chunk split a character"
+        assert all(chunk["token_count"] <= max_tokens for chunk in chunks)
+        if overlap == 0:
+            assert "".join(chunk["text"] for chunk in chunks) == sample, "round trip lost text"
+        print(f"[Info] max_tokens={max_tokens} overlap={overlap}: {len(chunks)} chunks, round trip OK")
@@ -0,0 +1,123 @@
+"""
+tracing.py
+
+Lightweight timing spans for the tokenize -> embed -> index -> search path:
+- tracer.span("stage"): context manager that records one timed span
+- summary() / print_profile(): per-stage count, total and p50/p95/max latency
+- export_json(): Chrome trace-event JSON (open in chrome://tracing or Perfetto)
+- export_prometheus(): Prometheus text format via prometheus_client histograms
+
+Usage:
+    from tracing import tracer
+
+    with tracer.span("index_search", k=5):
+        distances, indices = index.search(query_vector, 5)
+    tracer.print_profile()
+"""
+
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, List
+
+# Histogram buckets in seconds: 0.1 ms .. 10 s
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Tracer:
+    """Collects spans in memory; durations are aggregated per stage name."""
+
+    def __init__(self, keep_events: bool = True):
+        self.keep_events = keep_events
+        self.origin = time.perf_counter()
+        self.durations: Dict[str, List[float]] = defaultdict(list)
+        self.events: List[Dict] = []
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter(), **attributes)
+
+    def record(self, name: str, start: float, end: float, **attributes):
+        """Add a span measured elsewhere (e.g. module import time)."""
+        with self.lock:
+            self.durations[name].append(end - start)
+            if self.keep_events:
+                self.events.append({
+                    "name": name,
+                    "ph": "X",
+                    "ts": (start - self.origin) * 1e6,
+                    "dur": (end - start) * 1e6,
+                    "pid": os.getpid(),
+                    "tid": threading.get_ident(),
+                    "args": attributes,
+                })
+
+    def summary(self) -> Dict[str, Dict]:
+        report = {}
+        for name, values in self.durations.items():
+            ordered = sorted(values)
+            report[name] = {
+                "count": len(ordered),
+                "total_ms": sum(ordered) * 1000.0,
+                "p50_ms": _percentile(ordered, 50) * 1000.0,
+                "p95_ms": _percentile(ordered, 95) * 1000.0,
+                "max_ms": ordered[-1] * 1000.0,
+            }
+        return report
+
+    def print_profile(self):
+        report = self.summary()
+        # Spans can nest (tokenize sits inside embed_query), so shares are of wall time
+        wall_ms = (time.perf_counter() - self.origin) * 1000.0
+        print(f"\n[Profile] Per-stage breakdown ({wall_ms:.2f} ms wall)")
+        print(f"{'Stage':<26} | {'Calls':>5} | {'Total ms':>10} | {'Wall':>6} | {'p50 ms':>9} | {'Max ms':>9}")
+        print("-" * 80)
+        for name, stage in sorted(report.items(), key=lambda item: -item[1]["total_ms"]):
+            print(f"{name:<26} | {stage['count']:>5} | {stage['total_ms']:>10.2f} | "
+                  f"{stage['total_ms'] / wall_ms:>6.1%} | {stage['p50_ms']:>9.3f} | {stage['max_ms']:>9.3f}")
+
+    def export_json(self, path: str):
+        with self.lock:
+            trace = {"traceEvents": list(self.events), "summary": self.summary()}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(trace, f, indent=2)
+        print(f"[Saved] Trace -> {path}")
+
+    def export_prometheus(self, path: str):
+        from prometheus_client import CollectorRegistry, Histogram, write_to_textfile
+
+        registry = CollectorRegistry()
+        histogram = Histogram("pipeline_stage_seconds", "Duration of pipeline stages",
+                              ["stage"], registry=registry, buckets=LATENCY_BUCKETS)
+        with self.lock:
+            for name, values in self.durations.items():
+                for value in values:
+                    histogram.labels(stage=name).observe(value)
+        write_to_textfile(path, registry)
+        print(f"[Saved] Prometheus metrics -> {path}")
+
+    def reset(self):
+        with self.lock:
+            self.durations.clear()
+            self.events.clear()
+
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    rank = max(int(round(pct / 100.0 * len(ordered))) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+# Shared process-wide tracer used by the a4-a8 scripts
+tracer = Tracer()
@@ -0,0 +1,352 @@
+"""
+vector_quantization.py
+
+Compressed FAISS indexes for the persistent a5/a6 stores:
+- Modes: "none" (IndexFlatL2, float32), "fp16" and "int8" (IndexScalarQuantizer)
+  and "pq" (IndexPQ, product quantization)
+- The original float32 vectors of a compressed index live in a raw file on
+  disk next to it; searches fetch k * rerank_factor candidates from the
+  compressed index and re-rank only those rows exactly via a memory map
+- compression_report(): memory per vector vs recall@k, with and without re-ranking
+
+At 1536 dimensions a float32 vector is 6 KB; fp16 halves it, int8 quarters it
+and PQ with 96 sub-quantizers stores 96 bytes (64x smaller).
+
+Usage:
+    python vector_quantization.py --index_file faiss_index.bin --vectors_file faiss_vectors.f32
+    python vector_quantization.py --synthetic 20000 --dim 1536
+"""
+
+from __future__ import annotations
+
+import os
+import argparse
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+import numpy as np
+
+if TYPE_CHECKING:
+    import faiss
+
+# ==============================
+#  Configuration
+# ==============================
+COMPRESSION_MODES = ("none", "fp16", "int8", "pq")
+PQ_SUBQUANTIZERS = 96   # bytes per vector; must divide the dimension
+PQ_BITS = 8
+PQ_MIN_TRAIN = 1 << PQ_BITS  # k-means needs at least one point per centroid
+RERANK_FACTOR = 10
+REPORT_QUERIES = 200
+REPORT_K = 10
+COPY_CHUNK_BYTES = 1 << 24  # streamed copy size when rows are removed from the vector file
+
+
+# ==============================
+#  Index Construction
+# ==============================
+def make_index(dim: int, mode: str, pq_subquantizers: int = PQ_SUBQUANTIZERS) -> faiss.Index:
+    import faiss
+
+    if mode == "none":
+        return faiss.IndexFlatL2(dim)
+    if mode == "fp16":
+        return faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_L2)
+    if mode == "int8":
+        return faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_L2)
+    if mode == "pq":
+        if dim % pq_subquantizers:
+            raise ValueError(f"PQ sub-quantizers ({pq_subquantizers}) must divide dimension {dim}.")
+        return faiss.IndexPQ(dim, pq_subquantizers, PQ_BITS, faiss.METRIC_L2)
+    raise ValueError(f"Unknown compression mode '{mode}'. Choose from {COMPRESSION_MODES}.")
+
+
+def index_mode(index: faiss.Index) -> str:
+    import faiss
+
+    if isinstance(index, faiss.IndexPQ):
+        return "pq"
+    if isinstance(index, faiss.IndexScalarQuantizer):
+        return "fp16" if index.sq.qtype == faiss.ScalarQuantizer.QT_fp16 else "int8"
+    return "none"
+
+
+def can_train(mode: str, count: int) -> bool:
+    return mode != "pq" or count >= PQ_MIN_TRAIN
+
+
+def build_index(vectors: np.ndarray, mode: str,
+                pq_subquantizers: int = PQ_SUBQUANTIZERS) -> faiss.Index:
+    index = make_index(vectors.shape[1], mode, pq_subquantizers)
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    return index
+
+
+# ==============================
+#  Original Vectors On Disk
+# ==============================
+def load_vectors(path: str, dim: int) -> Optional[np.ndarray]:
+    """Memory-map the raw float32 vector file as an (n, dim) array."""
+    rows = os.path.getsize(path) // (dim * 4) if os.path.exists(path) else 0
+    if rows == 0:
+        return None
+    return np.memmap(path, dtype="float32", mode="r", shape=(rows, dim))
+
+
+def append_vectors(path: str, vectors: np.ndarray):
+    with open(path, "ab") as f:
+        f.write(np.ascontiguousarray(vectors, dtype="float32").tobytes())
+
+
+def write_vectors(path: str, vectors: np.ndarray):
+    temp_path = f"{path}.tmp-{os.getpid()}"
+    with open(temp_path, "wb") as f:
+        f.write(np.ascontiguousarray(vectors, dtype="float32").tobytes())
+    os.replace(temp_path, path)
+
+
+def sync_vectors(index: faiss.Index, path: str):
+    """
+    Truncate a vector file that runs past the index. Rows are appended before
+    the index is written, so an interrupted save leaves a longer file whose
+    first index.ntotal rows still match the index.
+    """
+    if index_mode(index) == "none" or not os.path.exists(path):
+        return
+    expected = index.ntotal * index.d * 4
+    size = os.path.getsize(path)
+    if size > expected:
+        print(f"[Warning] {path} has {(size - expected) / (index.d * 4):g} rows the index does not; "
+              "truncating.")
+        os.truncate(path, expected)
+
+
+def _copy_bytes(src, dst, count: int):
+    while count > 0:
+        chunk = src.read(min(count, COPY_CHUNK_BYTES))
+        if not chunk:
+            return
+        dst.write(chunk)
+        count -= len(chunk)
+
+
+def original_vectors(index: faiss.Index, vectors_path: str) -> np.ndarray:
+    """Full-precision vectors of an index: its own data if flat, else the vector file."""
+    if index_mode(index) == "none":
+        return index.reconstruct_n(0, index.ntotal)
+    vectors = load_vectors(vectors_path, index.d)
+    if vectors is None or len(vectors) < index.ntotal:
+        raise ValueError(f"{vectors_path} does not match the compressed index; cannot recover vectors.")
+    return np.asarray(vectors[:index.ntotal])
+
+
+def add_to_index(index: faiss.Index, vectors: np.ndarray, vectors_path: str):
+    """Add vectors; compressed indexes also keep the originals for re-ranking."""
+    index.add(vectors)
+    if index_mode(index) != "none":
+        append_vectors(vectors_path, vectors)
+
+
+def remove_from_index(index: faiss.Index, positions: np.ndarray, vectors_path: str):
+    """
+    Remove rows by position (indexes compact), keeping the vector file aligned.
+    The file is rewritten by streaming the runs between removed rows, never
+    loaded whole.
+    """
+    positions = np.unique(np.asarray(positions, dtype="int64"))
+    rows = index.ntotal
+    index.remove_ids(positions)
+    if index_mode(index) == "none" or not os.path.exists(vectors_path):
+        return
+    row_bytes = index.d * 4
+    temp_path = f"{vectors_path}.tmp-{os.getpid()}"
+    with open(vectors_path, "rb") as src, open(temp_path, "wb") as dst:
+        previous = 0
+        for position in positions[(positions >= 0) & (positions < rows)].tolist() + [rows]:
+            _copy_bytes(src, dst, (position - previous) * row_bytes)
+            src.seek((position + 1) * row_bytes)
+            previous = position + 1
+    os.replace(temp_path, vectors_path)
+
+
+def convert_index(index: faiss.Index, mode: str, vectors_path: str,
+                  pq_subquantizers: int = PQ_SUBQUANTIZERS) -> faiss.Index:
+    """Rebuild index under another compression mode from the original vectors."""
+    if index_mode(index) == mode:
+        return index
+    if not can_train(mode, index.ntotal):
+        print(f"[Warning] '{mode}' needs at least {PQ_MIN_TRAIN} vectors to train; "
+              f"keeping '{index_mode(index)}' for now ({index.ntotal} stored).")
+        return index
+
+    vectors = original_vectors(index, vectors_path)
+    converted = build_index(vectors, mode, pq_subquantizers)
+    if mode == "none":
+        if os.path.exists(vectors_path):
+            os.remove(vectors_path)
+    else:
+        write_vectors(vectors_path, vectors)
+    print(f"[Info] Converted index '{index_mode(index)}' -> '{mode}' "
+          f"({bytes_per_vector(index)} -> {bytes_per_vector(converted)} bytes/vector).")
+    return converted
+
+
+# ==============================
+#  Search With Exact Re-ranking
+# ==============================
+def bytes_per_vector(index: faiss.Index) -> int:
+    return index.sa_code_size()
+
+
+def rerank(vectors: np.ndarray, query_matrix: np.ndarray, candidates: np.ndarray,
+           k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Exact squared-L2 re-ranking of candidate IDs (-1 = empty slot) per query."""
+    distances = np.full((len(query_matrix), k), np.inf, dtype="float32")
+    indices = np.full((len(query_matrix), k), -1, dtype="int64")
+    for row, (query, ids) in enumerate(zip(query_matrix, candidates)):
+        ids = ids[ids >= 0]
+        if len(ids) == 0:
+            continue
+        order = np.argsort(ids)  # sorted reads are kinder to the memory map
+        exact = ((np.asarray(vectors[ids[order]]) - query) ** 2).sum(axis=1)
+        best = np.argsort(exact, kind="stable")[:k]
+        distances[row, :len(best)] = exact[best]
+        indices[row, :len(best)] = ids[order][best]
+    return distances, indices
+
+
+def search_index(index: faiss.Index, query_matrix: np.ndarray, k: int,
+                 vectors_path: Optional[str] = None,
+                 rerank_factor: int = RERANK_FACTOR) -> Tuple[np.ndarray, np.ndarray]:
+    """index.search, plus exact re-ranking of a wider candidate set for compressed indexes."""
+    query_matrix = np.ascontiguousarray(query_matrix, dtype="float32")
+    if index_mode(index) == "none" or rerank_factor <= 1 or not vectors_path:
+        return index.search(query_matrix, k)
+    vectors = load_vectors(vectors_path, index.d)
+    if vectors is None or len(vectors) < index.ntotal:
+        print(f"[Warning] {vectors_path} is out of sync with the index; skipping re-ranking.")
+        return index.search(query_matrix, k)
+    _, candidates = index.search(query_matrix, min(k * rerank_factor, index.ntotal))
+    return rerank(vectors, query_matrix, candidates, k)
+
+
+# ==============================
+#  Memory vs Recall Report
+# ==============================
+def recall_at_k(truth: np.ndarray, found: np.ndarray) -> float:
+    hits = sum(len(np.intersect1d(t[t >= 0], f[f >= 0])) for t, f in zip(truth, found))
+    return hits / max(int((truth >= 0).sum()), 1)
+
+
+def compression_report(vectors: np.ndarray, queries: np.ndarray, k: int = REPORT_K,
+                       modes=COMPRESSION_MODES, pq_subquantizers: int = PQ_SUBQUANTIZERS,
+                       rerank_factor: int = RERANK_FACTOR) -> List[Dict]:
+    """Per mode: bytes/vector, index size, recall@k raw and re-ranked against exact search."""
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    queries = np.ascontiguousarray(queries, dtype="float32")
+    exact = make_index(vectors.shape[1], "none")
+    exact.add(vectors)
+    _, truth = exact.search(queries, k)
+
+    report = []
+    for mode in modes:
+        if not can_train(mode, len(vectors)):
+            print(f"[Warning] Skipping '{mode}': needs at least {PQ_MIN_TRAIN} vectors.")
+            continue
+        start = time.perf_counter()
+        index = build_index(vectors, mode, pq_subquantizers)
+        build_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        _, raw = index.search(queries, k)
+        raw_ms = (time.perf_counter() - start) * 1000.0 / len(queries)
+
+        start = time.perf_counter()
+        if mode == "none":
+            reranked = raw
+        else:
+            _, candidates = index.search(queries, min(k * rerank_factor, index.ntotal))
+            reranked = rerank(vectors, queries, candidates, k)[1]
+        rerank_ms = (time.perf_counter() - start) * 1000.0 / len(queries)
+
+        size = bytes_per_vector(index)
+        report.append({
+            "mode": mode,
+            "bytes_per_vector": size,
+            "index_mb": size * len(vectors) / 1e6,
+            "compression": vectors.shape[1] * 4 / size,
+            "recall": recall_at_k(truth, raw),
+            "recall_reranked": recall_at_k(truth, reranked),
+            "build_s": build_s,
+            "query_ms": raw_ms,
+            "reranked_query_ms": rerank_ms,
+        })
+    return report
+
+
+def print_compression_report(report: List[Dict], k: int):
+    print(f"\n[Report] Memory vs recall@{k} (re-ranked = exact distances over the candidates)")
+    print(f"{'Mode':<6} | {'B/vec':>6} | {'Index MB':>9} | {'Ratio':>6} | {'Recall':>7} | "
+          f"{'Re-ranked':>9} | {'ms/query':>8} | {'Build s':>7}")
+    print("-" * 80)
+    for row in report:
+        print(f"{row['mode']:<6} | {row['bytes_per_vector']:>6} | {row['index_mb']:>9.2f} | "
+              f"{row['compression']:>5.0f}x | {row['recall']:>7.3f} | {row['recall_reranked']:>9.3f} | "
+              f"{row['reranked_query_ms']:>8.3f} | {row['build_s']:>7.2f}")
+
+
+# ==============================
+#  Main Script
+# ==============================
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare FAISS compression modes: memory saved vs recall lost.")
+    parser.add_argument("--index_file", type=str,
+                        help="Stored FAISS index (a5/a6 faiss_index.bin).")
+    parser.add_argument("--vectors_file", type=str,
+                        help="Raw float32 vectors kept next to a compressed index.")
+    parser.add_argument("--synthetic", type=int,
+                        help="Benchmark this many clustered random vectors instead of a store.")
+    parser.add_argument("--dim", type=int, default=1536,
+                        help="Vector dimension (synthetic data / raw vector files).")
+    parser.add_argument("--queries", type=int, default=REPORT_QUERIES,
+                        help="Number of queries (perturbed stored vectors).")
+    parser.add_argument("--k", type=int, default=REPORT_K,
+                        help="Neighbours per query for recall@k.")
+    parser.add_argument("--pq_subquantizers", type=int, default=PQ_SUBQUANTIZERS,
+                        help="PQ bytes per vector (must divide the dimension).")
+    parser.add_argument("--rerank_factor", type=int, default=RERANK_FACTOR,
+                        help="Candidates fetched per result before exact re-ranking.")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    if args.synthetic:
+        centers = rng.standard_normal((max(args.synthetic // 100, 1), args.dim)).astype("float32")
+        vectors = centers[rng.integers(0, len(centers), args.synthetic)]
+        vectors += 0.5 * rng.standard_normal(vectors.shape).astype("float32")
+    elif args.index_file:
+        import faiss
+
+        index = faiss.read_index(args.index_file)
+        vectors = original_vectors(index, args.vectors_file or "")
+    elif args.vectors_file:
+        vectors = load_vectors(args.vectors_file, args.dim)
+        if vectors is None:
+            raise FileNotFoundError(f"No vectors in {args.vectors_file}")
+    else:
+        parser.error("Provide --index_file, --vectors_file or --synthetic.")
+
+    vectors = np.array(vectors, dtype="float32")  # writable copy, never the memory map
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    picks = rng.choice(len(vectors), size=min(args.queries, len(vectors)), replace=False)
+    queries = vectors[picks] + 0.05 * rng.standard_normal((len(picks), vectors.shape[1])).astype("float32")
+    print(f"[Info] {len(vectors):,} vectors x {vectors.shape[1]} dims, {len(queries)} queries")
+
+    report = compression_report(vectors, queries, args.k, pq_subquantizers=args.pq_subquantizers,
+                                rerank_factor=args.rerank_factor)
+    print_compression_report(report, args.k)
+
+
+if __name__ == "__main__":
+    main()